@@ -4,5 +4,20 @@ from .auth import AuthManager
 from .logger import ActionLogger
 from .config_manager import ConfigManager
 from .dicom_loader import DICOMLoader
+from .volume_pyramid import VolumePyramid
+from .mpr import ObliqueReslicer
+from .slab import SlabProjector
+from .volume_renderer import VolumeRenderer
+from .resampling import AspectResampler
+from .overlay import OverlayCompositor, OverlayLayer
+from .perf import PerfMonitor, perf_monitor
+from .compute import CancellationToken, ComputeCancelled, ComputeJob, submit_compute
+from .analysis_context import AnalysisContext
+from .lung_segmentation import segment_lungs
 
-__all__ = ['AuthManager', 'ActionLogger', 'ConfigManager', 'DICOMLoader']
\ No newline at end of file
+__all__ = ['AuthManager', 'ActionLogger', 'ConfigManager', 'DICOMLoader',
+           'VolumePyramid', 'ObliqueReslicer', 'SlabProjector', 'VolumeRenderer',
+           'AspectResampler', 'OverlayCompositor', 'OverlayLayer',
+           'PerfMonitor', 'perf_monitor',
+           'CancellationToken', 'ComputeCancelled', 'ComputeJob', 'submit_compute',
+           'AnalysisContext', 'segment_lungs']
\ No newline at end of file
@@ -0,0 +1,228 @@
+"""
+Общий кэш производных данных для модулей (гистограммы, маски).
+Продукт вычисляется один раз по запросу и переиспользуется всеми
+модулями; ключ - серия, имя продукта и параметры. При превышении
+бюджета памяти вытесняются давно не использованные продукты.
+"""
+
+from collections import OrderedDict
+import threading
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+from core.hu_statistics import HUHistogram, SliceAggregates, compute_slice_aggregates
+from core.lung_segmentation import segment_lungs
+from core.perf import perf_monitor
+
+
+LUNG_THRESHOLD = -500
+
+
+def _nbytes(value) -> int:
+    """Оценка занимаемой памяти продукта"""
+    if isinstance(value, (np.ndarray, HUHistogram, SliceAggregates)):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(_nbytes(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_nbytes(item) for item in value)
+    return 64
+
+
+def compute_aggregates(volume: np.ndarray, context, token=None, progress=None) -> SliceAggregates:
+    """Агрегаты по срезам (один проход по объему)"""
+    return compute_slice_aggregates(volume, token, progress)
+
+
+def compute_histogram(volume: np.ndarray, context, token=None, progress=None) -> HUHistogram:
+    """Гистограмма целых HU со сводной статистикой всего объема"""
+    return context.get('slice_aggregates', token=token, progress=progress).range_histogram()
+
+
+def compute_lung_labels(volume: np.ndarray, context, threshold: int = LUNG_THRESHOLD,
+                        token=None, progress=None) -> np.ndarray:
+    """
+    Метки легких по умолчанию (пока сегментация не запускалась):
+    сегментация всего объема - RIGHT_LUNG/LEFT_LUNG; воздух вне тела,
+    трахея за пределами двух крупнейших компонентов и т.п. не размечаются
+    """
+    return segment_lungs(volume, threshold=threshold, token=token, progress=progress)
+
+
+def compute_lung_mask(volume: np.ndarray, context, token=None, progress=None) -> np.ndarray:
+    """Маска легких (оба легких) по меткам"""
+    return context.get('lung_labels', token=token, progress=progress) > 0
+
+
+class AnalysisContext:
+    """
+    Кэш производных данных текущей серии
+
+    - get(product, **params) - продукт по запросу (вычисляется один раз,
+      параллельные запросы того же продукта ждут первый расчет);
+    - register_product() - новые виды продуктов;
+    - put() - готовый продукт извне (например, результат сегментации),
+      версия продукта увеличивается;
+    - потокобезопасен, вызывается в т.ч. из фоновых расчетов модулей.
+    """
+
+    MEMORY_BUDGET_BYTES = 1024 * 1024 * 1024
+
+    def __init__(self, memory_budget_bytes: int = None):
+        self.memory_budget_bytes = memory_budget_bytes or self.MEMORY_BUDGET_BYTES
+
+        self._lock = threading.Lock()
+        self._products: Dict[str, Callable] = {}
+        # {(серия, продукт, параметры): (значение, размер)} в порядке использования
+        self._cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._cache_bytes = 0
+        # Идущие расчеты: {ключ: threading.Event}
+        self._inflight: Dict[tuple, threading.Event] = {}
+        self._versions: Dict[str, int] = {}
+
+        self.series_uid = None
+        self.volume = None
+
+        self.register_product('slice_aggregates', compute_aggregates)
+        self.register_product('histogram', compute_histogram)
+        self.register_product('lung_labels', compute_lung_labels)
+        self.register_product('lung_mask', compute_lung_mask)
+
+    def register_product(self, name: str, func: Callable):
+        """
+        Регистрирует вид продукта
+
+        Args:
+            func: func(volume, context, token=None, progress=None, **params) -> значение
+                  (token и progress - от вызвавшего get(), в ключ не входят)
+        """
+        self._products[name] = func
+
+    def set_data_loader(self, data_loader):
+        """Новые данные: продукты прежней серии удаляются"""
+        volume = data_loader.get_volume()
+        series = getattr(data_loader, 'current_series', None)
+
+        with self._lock:
+            if volume is self.volume:
+                return
+            self.volume = volume
+            self.series_uid = series.series_uid if series is not None else None
+            self._cache.clear()
+            self._cache_bytes = 0
+            for name in self._versions:
+                self._versions[name] += 1
+
+    # === ДОСТУП К ПРОДУКТАМ ===
+
+    def _key(self, name: str, params: dict) -> tuple:
+        return self.series_uid, name, tuple(sorted(params.items()))
+
+    def get(self, name: str, token=None, progress=None, **params) -> Any:
+        """
+        Продукт текущей серии (вычисляется при первом запросе)
+
+        Args:
+            token: CancellationToken фонового расчета
+            progress: Обработчик прогресса (если продукт считается в этом вызове)
+
+        Raises:
+            KeyError: Неизвестный продукт
+            ValueError: Данные не загружены
+        """
+        if name not in self._products:
+            raise KeyError(f"Неизвестный продукт анализа: {name}")
+
+        while True:
+            with self._lock:
+                if self.volume is None:
+                    raise ValueError("Данные не загружены")
+                key = self._key(name, params)
+                volume = self.volume
+
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    return self._cache[key][0]
+
+                event = self._inflight.get(key)
+                if event is None:
+                    event = threading.Event()
+                    self._inflight[key] = event
+                    break
+
+            # Продукт уже считается в другом потоке - ждем и читаем из кэша
+            event.wait()
+
+        try:
+            with perf_monitor.stage(f'analysis.{name}'):
+                value = self._products[name](volume, self, token=token, progress=progress, **params)
+        except BaseException:
+            with self._lock:
+                del self._inflight[key]
+            event.set()
+            raise
+
+        # Значение попадает в кэш до снятия отметки о расчете: ожидающий
+        # поток после пробуждения находит его в кэше и не считает повторно
+        size = _nbytes(value)
+        with self._lock:
+            self._insert(key, value, size, volume)
+            del self._inflight[key]
+        event.set()
+        return value
+
+    def peek(self, name: str, **params) -> Optional[Any]:
+        """Продукт из кэша без вычисления (None, если его нет)"""
+        with self._lock:
+            entry = self._cache.get(self._key(name, params))
+            return entry[0] if entry is not None else None
+
+    def put(self, name: str, value, **params):
+        """Сохраняет готовый продукт (заменяет прежний) и увеличивает его версию"""
+        with self._lock:
+            if self.volume is None:
+                return
+            volume = self.volume
+            self._versions[name] = self._versions.get(name, 0) + 1
+        self._store(self._key(name, params), value, volume)
+
+    def version(self, name: str) -> int:
+        """Версия продукта (растет при put() и смене серии)"""
+        with self._lock:
+            return self._versions.get(name, 0)
+
+    def invalidate(self, name: str = None):
+        """Удаляет из кэша продукт (или все продукты)"""
+        with self._lock:
+            for key in [key for key in self._cache if name is None or key[1] == name]:
+                self._cache_bytes -= self._cache.pop(key)[1]
+            for product in ([name] if name else list(self._versions)):
+                self._versions[product] = self._versions.get(product, 0) + 1
+
+    def _store(self, key: tuple, value, volume):
+        """Кладет продукт в кэш и вытесняет старые сверх бюджета"""
+        size = _nbytes(value)
+        with self._lock:
+            self._insert(key, value, size, volume)
+
+    def _insert(self, key: tuple, value, size: int, volume):
+        """Вставка в кэш (вызывается под self._lock)"""
+        # Серия сменилась во время расчета - результат не нужен
+        if volume is not self.volume:
+            return
+        if key in self._cache:
+            self._cache_bytes -= self._cache.pop(key)[1]
+        if size > self.memory_budget_bytes:
+            return
+
+        self._cache[key] = (value, size)
+        self._cache_bytes += size
+
+        while self._cache_bytes > self.memory_budget_bytes:
+            _, (_, evicted_size) = self._cache.popitem(last=False)
+            self._cache_bytes -= evicted_size
+
+    @property
+    def cache_bytes(self) -> int:
+        return self._cache_bytes
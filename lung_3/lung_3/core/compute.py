@@ -0,0 +1,94 @@
+"""
+Фоновые вычисления модулей.
+Общий пул потоков для тяжелых расчетов и токен отмены, которым
+задачу можно остановить (например, при загрузке новой серии).
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+import os
+import threading
+from typing import Callable, Optional
+
+
+class ComputeCancelled(Exception):
+    """Задача отменена через CancellationToken"""
+
+
+class CancellationToken:
+    """
+    Флаг отмены фоновой задачи
+
+    Задача периодически вызывает raise_if_cancelled() (или проверяет
+    is_cancelled) между этапами расчета.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise ComputeCancelled()
+
+
+class ComputeJob:
+    """Запущенная задача: токен отмены и Future с результатом"""
+
+    def __init__(self, token: CancellationToken, future: Future):
+        self.token = token
+        self.future = future
+
+    def cancel(self):
+        """Отменяет задачу (еще не начатая - не запустится)"""
+        self.token.cancel()
+        self.future.cancel()
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self.token.is_cancelled
+
+
+# Один поток оставляем GUI и рендерингу
+COMPUTE_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_compute_pool() -> ThreadPoolExecutor:
+    """Общий пул потоков для расчетов модулей (создается при первом обращении)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=COMPUTE_WORKERS, thread_name_prefix="compute")
+        return _pool
+
+
+def submit_compute(func: Callable, *args, progress: Callable[[float], None] = None,
+                   token: CancellationToken = None, **kwargs) -> ComputeJob:
+    """
+    Запускает func(*args, token=..., progress=..., **kwargs) в общем пуле
+
+    Args:
+        func: Функция расчета; принимает token и progress (доля 0..1)
+        progress: Обработчик прогресса (вызывается из рабочего потока)
+        token: Токен отмены (по умолчанию - новый)
+
+    Returns:
+        ComputeJob
+    """
+    token = token or CancellationToken()
+
+    def report(fraction: float):
+        token.raise_if_cancelled()
+        if progress is not None:
+            progress(min(max(float(fraction), 0.0), 1.0))
+
+    future = get_compute_pool().submit(func, *args, token=token, progress=report, **kwargs)
+    return ComputeJob(token, future)
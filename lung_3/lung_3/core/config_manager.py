@@ -1,16 +1,25 @@
 """
 Менеджер конфигурации для управления режимами обработки,
 видимостью модулей и компоновкой интерфейса.
+Изменения сохраняются с задержкой (несколько изменений - одна запись),
+файл записывается атомарно и только если содержимое изменилось.
 """
 
+import atexit
+from contextlib import contextmanager
 import json
+import os
 from pathlib import Path
-from typing import Dict, List, Any
+import threading
+from typing import Callable, Dict, List, Any, Optional
 
 
 class ConfigManager:
     """Управление глобальной конфигурацией приложения"""
     
+    # Задержка записи после последнего изменения (секунды)
+    SAVE_DELAY = 0.5
+    
     DEFAULT_CONFIG = {
         "processing_modes": [
             {
@@ -48,14 +57,27 @@ class ConfigManager:
             }
         },
         "ui_layout": {
-            "projection_order": ["axial", "sagittal", "coronal"],
+            "projection_order": ["axial", "sagittal", "coronal", "oblique"],
             "toolbar_order": ["load", "save", "reset"]
         }
     }
     
     def __init__(self, config_path: str = "config.json"):
         self.config_path = Path(config_path)
+        
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        self._dirty = False
+        self._pending_text = None
+        self._save_timer = None
+        # Последнее записанное (или прочитанное) содержимое файла
+        self._written_text = None
+        
+        # Подписчики на изменения, прочитанные с диска: callback(diff)
+        self._listeners: List[Callable[[dict], None]] = []
+        
         self.config = self._load_or_create_config()
+        atexit.register(self.flush)
     
     def _load_or_create_config(self) -> dict:
         """Загружает или создает конфигурацию по умолчанию"""
@@ -66,25 +88,164 @@ class ConfigManager:
         
         try:
             with open(self.config_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+                config = json.load(f)
+            self._written_text = self._serialize(config)
+            return config
         except Exception as e:
             print(f"⚠️ Ошибка загрузки конфигурации: {e}")
             return self.DEFAULT_CONFIG.copy()
     
+    @staticmethod
+    def _serialize(config: dict) -> str:
+        return json.dumps(config, indent=2, ensure_ascii=False)
+    
     def _save_config(self, config: dict = None):
-        """Сохраняет конфигурацию в файл"""
+        """Немедленно сохраняет конфигурацию в файл"""
         if config is None:
             config = self.config
+        self._write_text(self._serialize(config))
+    
+    def _write_text(self, text: str):
+        """Атомарная запись: временный файл и замена (только при изменении)"""
+        with self._lock:
+            if text == self._written_text:
+                return
+            
+            temp_path = self.config_path.with_name(self.config_path.name + ".tmp")
+            try:
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    f.write(text)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, self.config_path)
+                self._written_text = text
+            except Exception as e:
+                print(f"⚠️ Ошибка сохранения конфигурации: {e}")
+    
+    def save(self):
+        """
+        Сохраняет текущую конфигурацию (с задержкой SAVE_DELAY)
+        
+        Внутри batch() только отмечает изменение - запись будет
+        одна, после выхода из внешнего batch().
+        """
+        with self._lock:
+            if self._batch_depth > 0:
+                self._dirty = True
+                return
+            
+            # Снимок делается сразу - таймер пишет готовый текст
+            self._pending_text = self._serialize(self.config)
+            self._dirty = False
+            
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+            self._save_timer = threading.Timer(self.SAVE_DELAY, self._write_pending)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+    
+    def _write_pending(self):
+        """Записывает отложенный снимок конфигурации"""
+        with self._lock:
+            text, self._pending_text = self._pending_text, None
+            self._save_timer = None
+            if text is not None:
+                self._write_text(text)
+    
+    @contextmanager
+    def batch(self):
+        """
+        Группирует изменения в одну запись
         
+        Пример:
+            with config_manager.batch():
+                config_manager.register_module(...)
+                config_manager.set_module_visibility(...)
+        """
+        with self._lock:
+            self._batch_depth += 1
         try:
-            with open(self.config_path, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            print(f"⚠️ Ошибка сохранения конфигурации: {e}")
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                if self._batch_depth == 0 and self._dirty:
+                    self.save()
     
-    def save(self):
-        """Сохраняет текущую конфигурацию"""
-        self._save_config()
+    def flush(self):
+        """Немедленно записывает отложенные изменения"""
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+            if self._batch_depth == 0 and self._dirty:
+                self._pending_text = self._serialize(self.config)
+                self._dirty = False
+            self._write_pending()
+    
+    # === ГОРЯЧАЯ ПЕРЕЗАГРУЗКА ===
+    
+    def add_listener(self, callback: Callable[[dict], None]):
+        """Подписка на изменения конфигурации, сделанные извне (в файле)"""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+    
+    def remove_listener(self, callback: Callable[[dict], None]):
+        """Отписка от изменений конфигурации"""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+    
+    def reload_from_disk(self) -> Optional[dict]:
+        """
+        Перечитывает файл, если его изменили извне, и уведомляет подписчиков
+        
+        Собственные записи (и файл, совпадающий с текущей конфигурацией)
+        игнорируются. Несохраненные локальные изменения (ожидающие
+        отложенной записи) не теряются: они объединяются с содержимым
+        файла (см. merge_config) и записываются заново.
+        
+        Returns:
+            Структурные различия (см. diff_config) или None
+        """
+        try:
+            with open(self.config_path, 'r', encoding='utf-8') as f:
+                new_config = json.load(f)
+        except Exception as e:
+            # Файл может быть в процессе записи другим процессом
+            print(f"⚠️ Не удалось перечитать конфигурацию: {e}")
+            return None
+        
+        with self._lock:
+            text = self._serialize(new_config)
+            if text == self._written_text or text == self._serialize(self.config):
+                return None
+            
+            # Изменения, еще не записанные в файл (таймер или batch())
+            has_local = self._pending_text is not None or self._dirty
+            if has_local:
+                base = json.loads(self._written_text) if self._written_text else {}
+                merged = merge_config(base, self.config, new_config)
+            else:
+                merged = new_config
+            
+            diff = diff_config(self.config, merged)
+            self.config = merged
+            self._written_text = text
+            # Отложенный снимок устарел: при необходимости пишется объединенная версия
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            self._pending_text = None
+            self._dirty = False
+            if has_local and self._serialize(merged) != text:
+                self.save()
+        
+        print(f"✓ Конфигурация перечитана: {', '.join(diff) or 'без изменений'}")
+        for callback in list(self._listeners):
+            try:
+                callback(diff)
+            except Exception as e:
+                print(f"⚠️ Ошибка применения конфигурации: {e}")
+        return diff
     
     # === УПРАВЛЕНИЕ РЕЖИМАМИ ОБРАБОТКИ (CRUD) ===
     
@@ -164,6 +325,14 @@ class ConfigManager:
             return True
         return False
     
+    def set_module_expanded(self, module_id: str, expanded: bool):
+        """Запоминает, развернута ли панель модуля"""
+        if module_id in self.config["modules"]:
+            self.config["modules"][module_id]["expanded"] = expanded
+            self.save()
+            return True
+        return False
+    
     def register_module(self, module_id: str, config: Dict[str, Any]):
         """Регистрирует новый модуль в конфигурации"""
         if module_id not in self.config["modules"]:
@@ -194,4 +363,88 @@ class ConfigManager:
         if "ui_layout" not in self.config:
             self.config["ui_layout"] = {}
         self.config["ui_layout"]["projection_order"] = order
-        self.save()
\ No newline at end of file
+        self.save()
+
+
+_MISSING = object()
+
+
+def merge_config(base: dict, local: dict, external: dict) -> dict:
+    """
+    Трехстороннее объединение конфигураций
+    
+    Args:
+        base: Последнее записанное (прочитанное) содержимое файла
+        local: Текущая конфигурация с несохраненными изменениями
+        external: Новое содержимое файла
+    
+    Ключи, измененные только локально, берутся из local, остальные - из
+    external. Если ключ изменен с обеих сторон, словари объединяются
+    рекурсивно, иначе приоритет у локального изменения.
+    """
+    merged = {}
+    for key in list(external) + [key for key in local if key not in external]:
+        base_value = base.get(key, _MISSING)
+        local_value = local.get(key, _MISSING)
+        external_value = external.get(key, _MISSING)
+        
+        if local_value == base_value:
+            value = external_value
+        elif external_value == base_value:
+            value = local_value
+        elif isinstance(local_value, dict) and isinstance(external_value, dict):
+            value = merge_config(base_value if isinstance(base_value, dict) else {},
+                                 local_value, external_value)
+        else:
+            value = local_value
+        
+        if value is not _MISSING:
+            merged[key] = value
+    return merged
+
+
+def diff_config(old: dict, new: dict) -> dict:
+    """
+    Структурные различия двух конфигураций
+    
+    Returns:
+        {
+            'modules': {module_id: {ключ: (было, стало)}},  # None - модуль удален/добавлен целиком
+            'processing_modes': True,
+            'ui_layout': {ключ: (было, стало)},
+            '<другой раздел>': True
+        }
+        Разделы без изменений отсутствуют.
+    """
+    diff = {}
+    
+    old_modules, new_modules = old.get("modules", {}), new.get("modules", {})
+    modules_diff = {}
+    for module_id in set(old_modules) | set(new_modules):
+        old_module, new_module = old_modules.get(module_id), new_modules.get(module_id)
+        if old_module is None or new_module is None:
+            modules_diff[module_id] = None
+            continue
+        changed = {key: (old_module.get(key), new_module.get(key))
+                   for key in set(old_module) | set(new_module)
+                   if old_module.get(key) != new_module.get(key)}
+        if changed:
+            modules_diff[module_id] = changed
+    if modules_diff:
+        diff["modules"] = modules_diff
+    
+    if old.get("processing_modes") != new.get("processing_modes"):
+        diff["processing_modes"] = True
+    
+    old_layout, new_layout = old.get("ui_layout", {}), new.get("ui_layout", {})
+    layout_diff = {key: (old_layout.get(key), new_layout.get(key))
+                   for key in set(old_layout) | set(new_layout)
+                   if old_layout.get(key) != new_layout.get(key)}
+    if layout_diff:
+        diff["ui_layout"] = layout_diff
+    
+    for key in set(old) | set(new):
+        if key not in ("modules", "processing_modes", "ui_layout") and old.get(key) != new.get(key):
+            diff[key] = True
+    
+    return diff
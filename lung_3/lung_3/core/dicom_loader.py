@@ -11,6 +11,8 @@ from typing import List, Dict, Optional
 from collections import defaultdict
 import numpy as np
 
+from core.perf import perf_monitor
+
 
 class DICOMSeries:
     """Представление серии DICOM-снимков"""
@@ -38,7 +40,7 @@ class DICOMLoader:
     
     def scan_directory(self, path: Path, recursive: bool = True) -> Dict[str, DICOMSeries]:
         """
-        Сканирует директорию на наличие DICOM-файлов
+        Сканирует директорию на наличие DICOM-файлов (с замером времени)
         
         Args:
             path: Путь к директории
@@ -47,6 +49,11 @@ class DICOMLoader:
         Returns:
             Словарь серий {series_uid: DICOMSeries}
         """
+        with perf_monitor.stage('dicom.scan_directory'):
+            return self._scan_directory(path, recursive)
+    
+    def _scan_directory(self, path: Path, recursive: bool) -> Dict[str, DICOMSeries]:
+        """Поиск файлов и группировка по сериям"""
         self.series_dict.clear()
         dicom_files = self._find_dicom_files(path, recursive)
         
@@ -103,7 +110,7 @@ class DICOMLoader:
     
     def load_series(self, series_uid: str) -> bool:
         """
-        Загружает серию в память и строит 3D-объем
+        Загружает серию в память и строит 3D-объем (с замером времени)
         
         Args:
             series_uid: UID серии для загрузки
@@ -111,6 +118,11 @@ class DICOMLoader:
         Returns:
             True при успешной загрузке
         """
+        with perf_monitor.stage('dicom.load_series'):
+            return self._load_series(series_uid)
+    
+    def _load_series(self, series_uid: str) -> bool:
+        """Чтение срезов серии и построение объема"""
         if series_uid not in self.series_dict:
             print(f"⚠️ Серия {series_uid} не найдена")
             return False
@@ -167,6 +179,22 @@ class DICOMLoader:
         """Возвращает загруженный 3D-объем"""
         return self.volume_data
     
+    def get_spacing(self) -> tuple:
+        """Возвращает размер вокселя (dz, dy, dx) в мм"""
+        if self.volume_data is None:
+            return (1.0, 1.0, 1.0)
+        
+        try:
+            row_spacing, col_spacing = [float(v) for v in self.pixel_spacing]
+            slice_spacing = float(self.slice_thickness)
+        except (TypeError, ValueError):
+            return (1.0, 1.0, 1.0)
+        
+        if min(row_spacing, col_spacing, slice_spacing) <= 0:
+            return (1.0, 1.0, 1.0)
+        
+        return (slice_spacing, row_spacing, col_spacing)
+    
     def get_slice(self, index: int, orientation: str = 'axial') -> Optional[np.ndarray]:
         """
         Возвращает срез в заданной ориентации
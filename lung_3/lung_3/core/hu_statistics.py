@@ -0,0 +1,266 @@
+"""
+Статистика HU за один проход по объему.
+Объем обрабатывается блоками срезов: для каждого блока считаются
+min/max, сумма, сумма квадратов отклонений и гистограмма целых HU
+(bincount). Медиана и перцентили берутся из гистограммы, память
+ограничена размером блока и числом корзин.
+SliceAggregates хранит те же данные по срезам с префиксными суммами -
+статистика любого диапазона срезов без повторного прохода по объему.
+"""
+
+from typing import Callable, Optional
+
+import numpy as np
+
+
+# Срезов в блоке (512x512 float64 - около 16 МБ)
+CHUNK_SLICES = 8
+
+
+class HUHistogram:
+    """
+    Гистограмма целых HU со сводной статистикой
+
+    counts[i] - число вокселей со значением offset + i (после округления).
+    min/max/mean/std считаются по исходным значениям, медиана и
+    перцентили - по гистограмме (точны для целочисленных HU).
+    """
+
+    def __init__(self):
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.offset = 0
+        self.count = 0
+        self.min = None
+        self.max = None
+        self.mean = 0.0
+        # Сумма квадратов отклонений от среднего
+        self._m2 = 0.0
+
+    @property
+    def nbytes(self) -> int:
+        return self.counts.nbytes
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self._m2 / self.count)) if self.count else 0.0
+
+    def add(self, values: np.ndarray):
+        """Добавляет блок значений"""
+        if values.size == 0:
+            return
+
+        block_min = float(values.min())
+        block_max = float(values.max())
+        block_mean = float(values.mean(dtype=np.float64))
+        block_m2 = float(np.square(values - block_mean, dtype=np.float64).sum())
+        self._merge_moments(values.size, block_mean, block_m2)
+
+        self.min = block_min if self.min is None else min(self.min, block_min)
+        self.max = block_max if self.max is None else max(self.max, block_max)
+
+        if np.issubdtype(values.dtype, np.integer):
+            low = int(block_min)
+            indices = (values - low).astype(np.int64, copy=False)
+        else:
+            low = int(np.rint(block_min))
+            indices = np.rint(values).astype(np.int64) - low
+        self._add_counts(np.bincount(indices.ravel()), low)
+
+    def merge(self, other: 'HUHistogram'):
+        """Объединяет с другой гистограммой"""
+        if other.count == 0:
+            return
+        self._merge_moments(other.count, other.mean, other._m2)
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self._add_counts(other.counts, other.offset)
+
+    def _merge_moments(self, count: int, mean: float, m2: float):
+        """Объединение среднего и суммы квадратов отклонений (формула Чана)"""
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self._m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    def _add_counts(self, counts: np.ndarray, offset: int):
+        """Добавляет корзины (с расширением диапазона при необходимости)"""
+        if self.counts.size == 0:
+            self.counts = counts.astype(np.int64)
+            self.offset = offset
+            return
+
+        low = min(self.offset, offset)
+        high = max(self.offset + self.counts.size, offset + counts.size)
+        if low != self.offset or high != self.offset + self.counts.size:
+            grown = np.zeros(high - low, dtype=np.int64)
+            grown[self.offset - low:self.offset - low + self.counts.size] = self.counts
+            self.counts = grown
+            self.offset = low
+        self.counts[offset - self.offset:offset - self.offset + counts.size] += counts
+
+    # === ПЕРЦЕНТИЛИ ===
+
+    def percentile(self, q) -> float:
+        """
+        Перцентиль (0..100) с линейной интерполяцией, как np.percentile
+
+        Args:
+            q: Число или последовательность чисел
+        """
+        return percentile_from_counts(self.counts, self.offset, q)
+
+    @property
+    def median(self) -> float:
+        return self.percentile(50)
+
+    def summary(self) -> dict:
+        """Сводка: min, max, mean, std, median, число вокселей"""
+        return {
+            'min_hu': self.min,
+            'max_hu': self.max,
+            'mean_hu': self.mean,
+            'std_hu': self.std,
+            'median_hu': self.median,
+            'total_voxels': self.count,
+        }
+
+
+def percentile_from_counts(counts: np.ndarray, offset: int, q):
+    """
+    Перцентиль по гистограмме целых значений
+
+    Для позиции q/100 * (n - 1) в отсортированных данных находится
+    значение по накопленной сумме; дробная позиция - линейная
+    интерполяция между соседними значениями.
+    """
+    cumulative = np.cumsum(counts)
+    total = int(cumulative[-1]) if cumulative.size else 0
+    scalar = np.ndim(q) == 0
+    q = np.atleast_1d(np.asarray(q, dtype=np.float64))
+
+    if total == 0:
+        result = np.full(q.shape, np.nan)
+        return float(result[0]) if scalar else result
+
+    position = np.clip(q, 0, 100) / 100.0 * (total - 1)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, total - 1)
+
+    # Значение k-го элемента (с нуля) - первая корзина с накопленной суммой > k
+    lower_value = np.searchsorted(cumulative, lower, side='right') + offset
+    upper_value = np.searchsorted(cumulative, upper, side='right') + offset
+    result = lower_value + (upper_value - lower_value) * (position - lower)
+
+    return float(result[0]) if scalar else result
+
+
+class SliceAggregates:
+    """
+    Агрегаты по аксиальным срезам с накопленными (префиксными) суммами
+
+    Для каждого среза - число вокселей, сумма, сумма квадратов, min/max
+    и гистограмма целых HU. Статистика любого диапазона срезов
+    [start, end] считается разностью префиксов за O(числа корзин).
+    """
+
+    def __init__(self, counts: np.ndarray, sums: np.ndarray, sums_sq: np.ndarray,
+                 mins: np.ndarray, maxs: np.ndarray, histograms: list, slice_shape: tuple = ()):
+        """
+        Args:
+            counts, sums, sums_sq, mins, maxs: Массивы длины depth
+            histograms: [(offset, counts)] по срезам
+            slice_shape: Размер среза (строки, столбцы)
+        """
+        self.depth = len(counts)
+        self.slice_shape = tuple(slice_shape)
+        self.mins = mins
+        self.maxs = maxs
+
+        self._count_prefix = np.concatenate(([0], np.cumsum(counts)))
+        self._sum_prefix = np.concatenate(([0.0], np.cumsum(sums)))
+        self._sum_sq_prefix = np.concatenate(([0.0], np.cumsum(sums_sq)))
+
+        # Общий диапазон корзин всех срезов
+        self.offset = min(offset for offset, _ in histograms)
+        bins = max(offset + len(hist) for offset, hist in histograms) - self.offset
+        dtype = np.int32 if self._count_prefix[-1] < np.iinfo(np.int32).max else np.int64
+
+        self._hist_prefix = np.zeros((self.depth + 1, bins), dtype=dtype)
+        for index, (offset, hist) in enumerate(histograms):
+            row = self._hist_prefix[index + 1]
+            row[offset - self.offset:offset - self.offset + len(hist)] = hist
+        np.cumsum(self._hist_prefix, axis=0, out=self._hist_prefix)
+
+    @property
+    def nbytes(self) -> int:
+        return self._hist_prefix.nbytes + 3 * self._count_prefix.nbytes
+
+    def clip_range(self, start: int, end: int) -> tuple:
+        """Диапазон срезов в границах объема (start <= end)"""
+        start = min(max(int(start), 0), self.depth - 1)
+        end = min(max(int(end), start), self.depth - 1)
+        return start, end
+
+    def range_histogram(self, start: int = 0, end: int = None) -> HUHistogram:
+        """Гистограмма и сводная статистика срезов start..end (включительно)"""
+        start, end = self.clip_range(start, self.depth - 1 if end is None else end)
+
+        histogram = HUHistogram()
+        histogram.counts = (self._hist_prefix[end + 1] - self._hist_prefix[start]).astype(np.int64)
+        histogram.offset = self.offset
+        histogram.count = int(self._count_prefix[end + 1] - self._count_prefix[start])
+        histogram.min = float(self.mins[start:end + 1].min())
+        histogram.max = float(self.maxs[start:end + 1].max())
+
+        total = self._sum_prefix[end + 1] - self._sum_prefix[start]
+        total_sq = self._sum_sq_prefix[end + 1] - self._sum_sq_prefix[start]
+        histogram.mean = total / histogram.count
+        histogram._m2 = max(0.0, total_sq - total * total / histogram.count)
+
+        return histogram
+
+
+def compute_slice_aggregates(volume: np.ndarray, token=None,
+                             progress: Optional[Callable[[float], None]] = None,
+                             chunk_slices: int = CHUNK_SLICES) -> SliceAggregates:
+    """
+    Агрегаты по срезам за один проход блоками
+
+    Args:
+        token: CancellationToken (проверяется между блоками)
+        progress: Обработчик прогресса (доля 0..1)
+    """
+    depth = volume.shape[0]
+    voxels = int(np.prod(volume.shape[1:]))
+    integer = np.issubdtype(volume.dtype, np.integer)
+
+    sums = np.zeros(depth)
+    sums_sq = np.zeros(depth)
+    mins = np.zeros(depth)
+    maxs = np.zeros(depth)
+    histograms = []
+
+    for start in range(0, depth, chunk_slices):
+        if token is not None:
+            token.raise_if_cancelled()
+
+        block = volume[start:start + chunk_slices]
+        stop = start + len(block)
+        flat = block.reshape(len(block), -1)
+
+        sums[start:stop] = flat.sum(axis=1, dtype=np.float64)
+        sums_sq[start:stop] = np.einsum('ij,ij->i', flat, flat, dtype=np.float64)
+        mins[start:stop] = flat.min(axis=1)
+        maxs[start:stop] = flat.max(axis=1)
+
+        rounded = flat if integer else np.rint(flat)
+        for row, low in zip(rounded, mins[start:stop]):
+            low = int(np.rint(low))
+            histograms.append((low, np.bincount((row - low).astype(np.int64, copy=False))))
+
+        if progress is not None:
+            progress(stop / depth)
+
+    return SliceAggregates(np.full(depth, voxels), sums, sums_sq, mins, maxs, histograms,
+                           volume.shape[1:])
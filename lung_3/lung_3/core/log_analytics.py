@@ -0,0 +1,351 @@
+"""
+Аналитика журналов действий.
+Журналы по дням потоково сворачиваются в компактный колоночный индекс
+(numpy), который дополняется только новыми строками. Запросы по типу
+действия, роли, датам и сессии не требуют повторного разбора файлов.
+
+Запуск из командной строки:
+    python -m core.log_analytics --logs logs --action load_dicom --group-by day
+"""
+
+import argparse
+import json
+import os
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.logger import SESSION_RECORD, read_log_records
+from core.log_rotation import (list_log_files, logical_log_name, open_log_stream,
+                               gzip_uncompressed_size, COMPRESSED_SUFFIX)
+
+
+class LogIndex:
+    """
+    Колоночный индекс журналов действий.
+
+    Хранится в logs/index: index.npz (столбцы) и manifest.json (словари
+    значений и смещения в файлах журналов). Файлы учитываются по
+    логическому имени (без .gz), поэтому сжатие дня в архив не приводит
+    к повторной индексации. Для .jsonl запоминается смещение последней
+    целой строки - при обновлении читаются только дописанные строки.
+    Старые .json переиндексируются целиком только при изменении файла.
+    Строки удаленных ротацией архивов остаются в индексе.
+    """
+
+    # Столбцы индекса и их типы
+    COLUMNS = {
+        'day': np.int32,        # date.toordinal()
+        'time': np.float64,     # секунды от эпохи
+        'action': np.int32,     # код в словаре действий
+        'role': np.int16,       # код в словаре ролей
+        'session': np.int32,    # код в словаре сессий
+        'detail': np.int32,     # код уточнения (режим, формат...), -1 - нет
+        'count': np.int32,      # число событий (сводные записи > 1)
+        'source': np.int16,     # код файла журнала
+    }
+
+    # Поля действия, значение которых индексируется как уточнение
+    DETAIL_FIELDS = ('mode', 'admin_action', 'format')
+
+    GROUP_BY = ('day', 'action', 'role', 'session', 'detail')
+
+    def __init__(self, logs_dir="logs", index_dir=None):
+        self.logs_dir = Path(logs_dir)
+        self.index_dir = Path(index_dir) if index_dir else self.logs_dir / "index"
+
+        self.dictionaries: Dict[str, List[str]] = {
+            'action': [], 'role': [], 'session': [], 'detail': [], 'source': []
+        }
+        self._codes: Dict[str, Dict[str, int]] = {name: {} for name in self.dictionaries}
+        self.files: Dict[str, dict] = {}
+        self.columns: Dict[str, np.ndarray] = {
+            name: np.empty(0, dtype=dtype) for name, dtype in self.COLUMNS.items()
+        }
+
+        self._load()
+
+    # === ХРАНЕНИЕ ===
+
+    @property
+    def num_rows(self) -> int:
+        return len(self.columns['day'])
+
+    def _manifest_path(self) -> Path:
+        return self.index_dir / "manifest.json"
+
+    def _columns_path(self) -> Path:
+        return self.index_dir / "index.npz"
+
+    def _load(self):
+        """Загружает сохраненный индекс (при ошибке индекс строится заново)"""
+        if not self._manifest_path().exists() or not self._columns_path().exists():
+            return
+
+        try:
+            with open(self._manifest_path(), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            with np.load(self._columns_path()) as data:
+                columns = {name: data[name].astype(dtype, copy=False)
+                           for name, dtype in self.COLUMNS.items()}
+        except Exception as e:
+            print(f"⚠️ Индекс журналов поврежден, будет построен заново: {e}")
+            return
+
+        self.dictionaries = manifest['dictionaries']
+        self._codes = {name: {value: code for code, value in enumerate(values)}
+                       for name, values in self.dictionaries.items()}
+        self.files = manifest['files']
+        self.columns = columns
+
+    def save(self):
+        """Сохраняет индекс (через временные файлы)"""
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+
+        columns_tmp = self.index_dir / "index.tmp.npz"
+        np.savez(columns_tmp, **self.columns)
+
+        manifest_tmp = self.index_dir / "manifest.json.tmp"
+        with open(manifest_tmp, 'w', encoding='utf-8') as f:
+            json.dump({'dictionaries': self.dictionaries, 'files': self.files},
+                      f, ensure_ascii=False)
+
+        os.replace(columns_tmp, self._columns_path())
+        os.replace(manifest_tmp, self._manifest_path())
+
+    # === ОБНОВЛЕНИЕ ===
+
+    def _code(self, dictionary: str, value) -> int:
+        """Код значения в словаре (новые значения добавляются)"""
+        if value is None:
+            return -1
+        value = str(value)
+        codes = self._codes[dictionary]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self.dictionaries[dictionary])
+            self.dictionaries[dictionary].append(value)
+        return code
+
+    def update(self) -> int:
+        """
+        Дополняет индекс новыми данными журналов
+
+        Returns:
+            Число добавленных строк
+        """
+        added = 0
+        for path in list_log_files(self.logs_dir):
+            added += self._update_file(path)
+
+        if added or not self._manifest_path().exists():
+            self.save()
+        return added
+
+    def _update_file(self, path: Path) -> int:
+        """Индексирует новые строки одного файла"""
+        name = logical_log_name(path)
+        compressed = path.name.endswith(COMPRESSED_SUFFIX)
+        is_jsonl = name.endswith(".jsonl")
+        stat = path.stat()
+        state = self.files.get(name)
+
+        if state is not None:
+            if state['size'] == stat.st_size and state['mtime'] == stat.st_mtime:
+                return 0
+
+            if compressed:
+                # Архив дня - тот же журнал, дописанный до конца
+                size = gzip_uncompressed_size(path)
+                appended = is_jsonl and size >= state['offset']
+                if appended and size == state['offset']:
+                    state.update(size=stat.st_size, mtime=stat.st_mtime)
+                    return 0
+            else:
+                appended = is_jsonl and stat.st_size >= state['offset']
+
+            if not appended:
+                # Файл переписан - индексируем заново
+                self._drop_file(name)
+                state = None
+
+        offset = state['offset'] if state else 0
+        if is_jsonl:
+            records, offset = _read_appended_lines(path, offset)
+        else:
+            records, offset = read_log_records(path), 0
+
+        rows = self._build_rows(records, self._code('source', name))
+        self._append_rows(rows)
+
+        self.files[name] = {
+            'offset': offset,
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'rows': (state['rows'] if state else 0) + len(rows['day']),
+        }
+        return len(rows['day'])
+
+    def _build_rows(self, records, file_code: int) -> Dict[str, np.ndarray]:
+        """Переводит записи в столбцы"""
+        rows = {name: [] for name in self.COLUMNS}
+
+        for record in records:
+            if record.get('record') == SESSION_RECORD or 'action' not in record:
+                continue
+            try:
+                timestamp = datetime.fromisoformat(record['timestamp'])
+            except (KeyError, TypeError, ValueError):
+                continue
+
+            detail = None
+            for field in self.DETAIL_FIELDS:
+                if record.get(field) is not None:
+                    detail = record[field]
+                    break
+
+            rows['day'].append(timestamp.date().toordinal())
+            rows['time'].append(timestamp.timestamp())
+            rows['action'].append(self._code('action', record['action']))
+            rows['role'].append(self._code('role', record.get('user_role')))
+            rows['session'].append(self._code('session', record.get('session_id')))
+            rows['detail'].append(self._code('detail', detail))
+            rows['count'].append(int(record.get('count', 1)))
+            rows['source'].append(file_code)
+
+        return {name: np.asarray(values, dtype=self.COLUMNS[name]) for name, values in rows.items()}
+
+    def _append_rows(self, rows: Dict[str, np.ndarray]):
+        if len(rows['day']):
+            for name in self.COLUMNS:
+                self.columns[name] = np.concatenate([self.columns[name], rows[name]])
+
+    def _drop_file(self, file_name: str):
+        """Удаляет из индекса строки файла"""
+        code = self._codes['source'].get(file_name)
+        if code is not None:
+            keep = self.columns['source'] != code
+            self.columns = {name: column[keep] for name, column in self.columns.items()}
+        self.files.pop(file_name, None)
+
+    # === ЗАПРОСЫ ===
+
+    def _filter(self, action: str = None, role: str = None, session: str = None,
+                detail: str = None, date_from: date = None, date_to: date = None) -> np.ndarray:
+        """Маска строк по условиям (None - без условия)"""
+        mask = np.ones(self.num_rows, dtype=bool)
+
+        for column, value in (('action', action), ('role', role),
+                              ('session', session), ('detail', detail)):
+            if value is not None:
+                mask &= self.columns[column] == self._codes[column].get(str(value), -2)
+
+        if date_from is not None:
+            mask &= self.columns['day'] >= date_from.toordinal()
+        if date_to is not None:
+            mask &= self.columns['day'] <= date_to.toordinal()
+
+        return mask
+
+    def query(self, group_by: Optional[str] = 'day', weighted: bool = True,
+              **filters) -> Dict[str, int]:
+        """
+        Число действий с группировкой
+
+        Args:
+            group_by: 'day', 'action', 'role', 'session', 'detail' или None (итог)
+            weighted: Учитывать число событий в сводных записях
+            **filters: action, role, session, detail, date_from, date_to
+
+        Returns:
+            {значение группы: число}; для group_by=None - {'total': число}
+        """
+        mask = self._filter(**filters)
+        weights = self.columns['count'][mask] if weighted else None
+
+        if group_by is None:
+            total = int(weights.sum()) if weighted else int(mask.sum())
+            return {'total': total}
+
+        if group_by not in self.GROUP_BY:
+            raise ValueError(f"Неподдерживаемая группировка: {group_by}")
+
+        keys = self.columns[group_by][mask].astype(np.int64)
+        if group_by == 'day':
+            if len(keys) == 0:
+                return {}
+            base = keys.min()
+            counts = np.bincount(keys - base, weights=weights)
+            return {date.fromordinal(int(base + offset)).isoformat(): int(count)
+                    for offset, count in enumerate(counts) if count}
+
+        # Строки без значения (код -1) группируются под ключом ''
+        counts = np.bincount(keys + 1, weights=weights)
+        values = [''] + self.dictionaries[group_by]
+        return {values[code]: int(count) for code, count in enumerate(counts) if count}
+
+    def distinct(self, column: str) -> List[str]:
+        """Значения словаря столбца (для фильтров в интерфейсе)"""
+        return list(self.dictionaries.get(column, []))
+
+
+def _read_appended_lines(path: Path, offset: int) -> Tuple[List[dict], int]:
+    """
+    Читает целые строки JSONL начиная со смещения
+
+    Недописанная последняя строка не читается - ее прочитает
+    следующее обновление индекса.
+
+    Returns:
+        (записи, смещение после последней целой строки)
+    """
+    records = []
+    with open_log_stream(path, 'rb') as f:
+        try:
+            # Для архива .gz перемотка распаковывает данные потоково
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(record, dict):
+                    records.append(record)
+        except EOFError:
+            print(f"⚠️ Архив журнала поврежден: {path}")
+    return records, offset
+
+
+def main(argv=None):
+    """Командная строка: обновление индекса и запрос"""
+    parser = argparse.ArgumentParser(description="Аналитика журналов действий")
+    parser.add_argument('--logs', default="logs", help="Папка журналов")
+    parser.add_argument('--action', help="Тип действия (например, load_dicom)")
+    parser.add_argument('--role', help="Роль (User/Admin)")
+    parser.add_argument('--session', help="ID сессии")
+    parser.add_argument('--detail', help="Уточнение (например, имя режима обработки)")
+    parser.add_argument('--from', dest='date_from', type=date.fromisoformat, help="Дата с (YYYY-MM-DD)")
+    parser.add_argument('--to', dest='date_to', type=date.fromisoformat, help="Дата по (YYYY-MM-DD)")
+    parser.add_argument('--group-by', default='day', choices=LogIndex.GROUP_BY + ('none',))
+    args = parser.parse_args(argv)
+
+    index = LogIndex(args.logs)
+    added = index.update()
+    print(f"✓ Индекс: {index.num_rows} записей (новых: {added})")
+
+    result = index.query(
+        group_by=None if args.group_by == 'none' else args.group_by,
+        action=args.action, role=args.role, session=args.session, detail=args.detail,
+        date_from=args.date_from, date_to=args.date_to
+    )
+    for key, count in result.items():
+        print(f"{key or '-'}\t{count}")
+
+
+if __name__ == "__main__":
+    main()
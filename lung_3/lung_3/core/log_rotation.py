@@ -0,0 +1,208 @@
+"""
+Ротация журналов действий.
+Закрытые дни и переполненные файлы сжимаются (gzip) в logs/archive,
+при превышении бюджета диска удаляются самые старые архивы.
+Чтение сжатых и обычных журналов - через open_log_stream.
+"""
+
+import gzip
+import os
+import re
+import shutil
+import threading
+from datetime import date, timedelta
+from pathlib import Path
+from typing import List, Optional
+
+ARCHIVE_DIR_NAME = "archive"
+COMPRESSED_SUFFIX = ".gz"
+
+# Имя журнала: YYYY-MM-DD[.partN].json(l)
+_LOG_NAME_RE = re.compile(r"^(\d{4}-\d{2}-\d{2})(?:\.part(\d+))?\.(json|jsonl)$")
+
+
+def logical_log_name(path) -> str:
+    """Имя журнала без суффикса сжатия (2025-10-23.jsonl.gz -> 2025-10-23.jsonl)"""
+    name = Path(path).name
+    return name[:-len(COMPRESSED_SUFFIX)] if name.endswith(COMPRESSED_SUFFIX) else name
+
+
+def parse_log_name(path) -> Optional[tuple]:
+    """
+    Разбор имени журнала
+
+    Returns:
+        (дата 'YYYY-MM-DD', номер части или None, 'json'/'jsonl') или None
+    """
+    match = _LOG_NAME_RE.match(logical_log_name(path))
+    if match is None:
+        return None
+    day, part, kind = match.groups()
+    return day, (int(part) if part else None), kind
+
+
+def open_log_stream(path, mode: str = 'rt'):
+    """
+    Открывает журнал на чтение (архив .gz - с потоковой распаковкой)
+
+    Args:
+        mode: 'rt' - текст, 'rb' - байты
+    """
+    path = Path(path)
+    if path.name.endswith(COMPRESSED_SUFFIX):
+        if 'b' in mode:
+            return gzip.open(path, mode)
+        return gzip.open(path, mode, encoding='utf-8', errors='replace')
+    if 'b' in mode:
+        return open(path, mode)
+    return open(path, mode, encoding='utf-8', errors='replace')
+
+
+def gzip_uncompressed_size(path) -> int:
+    """Размер распакованных данных по заголовку gzip (по модулю 2^32)"""
+    with open(path, 'rb') as f:
+        f.seek(-4, os.SEEK_END)
+        return int.from_bytes(f.read(4), 'little')
+
+
+def _log_order(path) -> tuple:
+    """Порядок внутри дня: старый .json, части по номеру, затем основной файл"""
+    day, part, kind = parse_log_name(path)
+    return day, kind == 'jsonl', part is None, part or 0
+
+
+def list_log_files(logs_dir) -> List[Path]:
+    """
+    Все журналы: текущие в logs_dir и сжатые в logs_dir/archive
+
+    Порядок: по дате, внутри дня - старый .json, части по номеру,
+    затем основной файл дня.
+    """
+    logs_dir = Path(logs_dir)
+    paths = [path for path in logs_dir.iterdir() if path.is_file()] if logs_dir.exists() else []
+    archive_dir = logs_dir / ARCHIVE_DIR_NAME
+    if archive_dir.exists():
+        paths += [path for path in archive_dir.iterdir() if path.is_file()]
+
+    return sorted((path for path in paths if parse_log_name(path) is not None), key=_log_order)
+
+
+class LogRotator:
+    """
+    Ротация журналов.
+
+    - файлы прошлых дней и отрезанные по размеру части сжимаются в архив;
+    - архивы старше max_age_days удаляются;
+    - при превышении бюджета диска удаляются самые старые архивы.
+
+    Текущий файл дня не трогается - его пишет ActionLogger.
+    """
+
+    MAX_FILE_BYTES = 20 * 1024 * 1024
+    MAX_AGE_DAYS = 365
+    DISK_BUDGET_BYTES = 500 * 1024 * 1024
+
+    def __init__(self, logs_dir, max_file_bytes: int = None, max_age_days: int = None,
+                 disk_budget_bytes: int = None):
+        self.logs_dir = Path(logs_dir)
+        self.archive_dir = self.logs_dir / ARCHIVE_DIR_NAME
+        self.max_file_bytes = max_file_bytes or self.MAX_FILE_BYTES
+        self.max_age_days = max_age_days or self.MAX_AGE_DAYS
+        self.disk_budget_bytes = disk_budget_bytes or self.DISK_BUDGET_BYTES
+
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def next_part_path(self, day: str) -> Path:
+        """Свободное имя части дня (для отрезания переполненного файла)"""
+        part = 1
+        while True:
+            name = f"{day}.part{part}.jsonl"
+            if not (self.logs_dir / name).exists() and \
+                    not (self.archive_dir / (name + COMPRESSED_SUFFIX)).exists():
+                return self.logs_dir / name
+            part += 1
+
+    def rotate_async(self):
+        """Запускает ротацию в фоновом потоке (если она еще не идет)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self.rotate, name="log-rotation", daemon=True)
+        self._thread.start()
+
+    def rotate(self):
+        """Сжатие закрытых журналов, удаление устаревших и сверх бюджета"""
+        with self._lock:
+            try:
+                self._archive_closed()
+                self._prune()
+            except Exception as e:
+                print(f"⚠️ Ошибка ротации журналов: {e}")
+
+    def _archive_closed(self):
+        """Сжимает журналы прошлых дней и отрезанные части"""
+        today = date.today().isoformat()
+
+        for path in list(self.logs_dir.iterdir()):
+            parsed = parse_log_name(path) if path.is_file() else None
+            if parsed is None or path.name.endswith(COMPRESSED_SUFFIX):
+                continue
+            day, part, _ = parsed
+            if day >= today and part is None:
+                continue
+            self._compress(path)
+
+    def _archive_target(self, name: str) -> Path:
+        """Имя архива без перезаписи существующего"""
+        target = self.archive_dir / (name + COMPRESSED_SUFFIX)
+        if not target.exists():
+            return target
+
+        day, _, kind = parse_log_name(name)
+        part = 1
+        while True:
+            target = self.archive_dir / f"{day}.part{part}.{kind}{COMPRESSED_SUFFIX}"
+            if not target.exists() and not (self.logs_dir / logical_log_name(target)).exists():
+                return target
+            part += 1
+
+    def _compress(self, path: Path):
+        """Сжимает файл в архив (через временный файл) и удаляет исходный"""
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        target = self._archive_target(path.name)
+        temp = target.with_name(target.name + ".tmp")
+
+        with open(path, 'rb') as source, gzip.open(temp, 'wb') as compressed:
+            shutil.copyfileobj(source, compressed, 1024 * 1024)
+        with open(temp, 'rb') as f:
+            os.fsync(f.fileno())
+
+        os.replace(temp, target)
+        path.unlink()
+        print(f"✓ Журнал сжат: {path.name} -> {ARCHIVE_DIR_NAME}/{target.name}")
+
+    def _prune(self):
+        """Удаляет устаревшие архивы и самые старые сверх бюджета диска"""
+        if not self.archive_dir.exists():
+            return
+
+        oldest_day = (date.today() - timedelta(days=self.max_age_days)).isoformat()
+        archives = sorted((path for path in self.archive_dir.iterdir()
+                           if path.is_file() and parse_log_name(path) is not None), key=_log_order)
+
+        for path in list(archives):
+            if parse_log_name(path)[0] < oldest_day:
+                path.unlink()
+                archives.remove(path)
+                print(f"✓ Удален устаревший архив журнала: {path.name}")
+
+        live_size = sum(path.stat().st_size for path in self.logs_dir.iterdir()
+                        if path.is_file() and parse_log_name(path) is not None)
+        total = live_size + sum(path.stat().st_size for path in archives)
+
+        for path in archives:
+            if total <= self.disk_budget_bytes:
+                break
+            total -= path.stat().st_size
+            path.unlink()
+            print(f"✓ Удален архив журнала (бюджет диска): {path.name}")
@@ -1,17 +1,49 @@
 """
-Система логирования действий в JSON-формате.
-Группирует действия по сессиям и датам.
+Система логирования действий.
+Действия дописываются построчно (JSONL) в файл за день фоновым потоком;
+вложенное представление по сессиям строится по запросу.
 """
 
+import atexit
 import json
+import os
+import queue
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List, Optional
 import uuid
 
+from core.log_rotation import LogRotator, list_log_files, logical_log_name, open_log_stream, parse_log_name
+
+
+# Тип служебной записи-заголовка сессии в JSONL
+SESSION_RECORD = "session"
+
 
 class ActionLogger:
-    """Логгер действий пользователя в JSON-формате"""
+    """
+    Логгер действий пользователя.
+    
+    Каждое действие - одна строка JSON в logs/YYYY-MM-DD.jsonl. Запись
+    выполняет фоновый поток: накопившиеся действия пишутся пачкой,
+    fsync выполняется не чаще FSYNC_INTERVAL. GUI-поток только ставит
+    действие в очередь. Файл больше LogRotator.MAX_FILE_BYTES отрезается
+    в отдельную часть дня, закрытые файлы сжимаются в logs/archive.
+    
+    Частые действия (прокрутка срезов, шаги диапазона) сворачиваются:
+    серия одинаковых действий записывается одной сводной записью, когда
+    взаимодействие затихает на COALESCE_IDLE секунд или приходит другое
+    действие.
+    """
+    
+    FSYNC_INTERVAL = 2.0
+    # Ожидание новых действий фоновым потоком (секунды)
+    IDLE_TIMEOUT = 0.5
+    # Пауза, после которой серия частых действий считается завершенной
+    COALESCE_IDLE = 1.0
+    COALESCED_ACTIONS = ('interaction_slice_change', 'set_slice_range')
     
     def __init__(self, logs_dir: str = "logs"):
         self.logs_dir = Path(logs_dir)
@@ -20,7 +52,27 @@ class ActionLogger:
         self.session_id = str(uuid.uuid4())
         self.session_start = datetime.now().isoformat()
         self.current_role = "User"
-        self.actions: List[Dict[str, Any]] = []
+        self._session_written = False
+        
+        # Текущая серия сворачиваемых действий
+        self._run: Optional[dict] = None
+        self._run_lock = threading.Lock()
+        
+        self._queue: "queue.Queue[Optional[dict]]" = queue.Queue()
+        self._files: Dict[Path, Any] = {}
+        # Последний день, в который писал поток записи (прошлые дни закрыты)
+        self._latest_day = ""
+        self._last_fsync = time.monotonic()
+        self._closed = False
+        
+        # Сжатие прошлых дней и очистка архива - в фоне
+        self.rotator = LogRotator(self.logs_dir)
+        self.rotator.rotate_async()
+        
+        self._writer = threading.Thread(target=self._writer_loop, name="action-log-writer",
+                                        daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
     
     def set_role(self, role: str):
         """Устанавливает текущую роль (User/Admin)"""
@@ -34,55 +86,241 @@ class ActionLogger:
             action_type: Тип действия (load_dicom, run_segmentation, etc.)
             **kwargs: Дополнительные параметры действия
         """
-        action = {
-            "timestamp": datetime.now().isoformat(),
-            "action": action_type,
-            **kwargs
-        }
-        self.actions.append(action)
-        self._save_to_file()
-    
-    def _get_log_file_path(self) -> Path:
-        """Возвращает путь к файлу лога за сегодняшний день"""
-        today = datetime.now().strftime("%Y-%m-%d")
-        return self.logs_dir / f"{today}.json"
-    
-    def _save_to_file(self):
-        """Сохраняет текущую сессию в файл"""
-        log_file = self._get_log_file_path()
-        
-        # Загружаем существующие данные
-        if log_file.exists():
-            with open(log_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-        else:
-            data = {"sessions": []}
-        
-        # Ищем текущую сессию или создаем новую
-        session_found = False
-        for session in data["sessions"]:
-            if session.get("session_id") == self.session_id:
-                session["actions"] = self.actions
-                session_found = True
-                break
-        
-        if not session_found:
-            data["sessions"].append({
+        if self._closed:
+            return
+        
+        with self._run_lock:
+            # Заголовок сессии пишется перед первым действием
+            if not self._session_written:
+                self._session_written = True
+                self._queue.put({
+                    "record": SESSION_RECORD,
+                    "session_id": self.session_id,
+                    "session_start": self.session_start,
+                    "user_role": self.current_role
+                })
+            
+            record = {
+                "timestamp": datetime.now().isoformat(),
                 "session_id": self.session_id,
-                "session_start": self.session_start,
                 "user_role": self.current_role,
-                "actions": self.actions
-            })
+                "action": action_type,
+                **kwargs
+            }
+            
+            run = self._run
+            now = time.monotonic()
+            if run is not None and run["action"] == action_type \
+                    and now - run["last_time"] < self.COALESCE_IDLE:
+                run["last"] = record
+                run["count"] += 1
+                run["last_time"] = now
+                return
+            
+            # Другое действие завершает текущую серию
+            self._finish_run()
+            
+            if action_type in self.COALESCED_ACTIONS:
+                self._run = {"action": action_type, "first": record, "last": record,
+                             "count": 1, "start_time": now, "last_time": now}
+            else:
+                self._queue.put(record)
+    
+    def _finish_run(self, idle_only: bool = False):
+        """
+        Ставит в очередь сводную запись текущей серии (вызывать под _run_lock)
+        
+        Args:
+            idle_only: Завершить серию, только если она затихла
+        """
+        run = self._run
+        if run is None:
+            return
+        if idle_only and time.monotonic() - run["last_time"] < self.COALESCE_IDLE:
+            return
+        
+        self._run = None
+        self._queue.put(self._summarize_run(run))
+    
+    @staticmethod
+    def _summarize_run(run: dict) -> dict:
+        """Сводная запись серии: начало/конец, число событий, длительность"""
+        first, last = run["first"], run["last"]
+        summary = {
+            "timestamp": first["timestamp"],
+            "session_id": first["session_id"],
+            "user_role": first["user_role"],
+            "action": run["action"],
+            "end_timestamp": last["timestamp"],
+            "count": run["count"],
+            "duration_ms": round((run["last_time"] - run["start_time"]) * 1000.0, 1),
+        }
+        
+        if run["action"] == 'interaction_slice_change':
+            summary["start_slice"] = first.get("slice")
+            summary["end_slice"] = last.get("slice")
+        elif run["action"] == 'set_slice_range':
+            # Итоговый диапазон и диапазон в начале серии
+            summary["start_slice"] = last.get("start_slice")
+            summary["end_slice"] = last.get("end_slice")
+            summary["initial_range"] = [first.get("start_slice"), first.get("end_slice")]
+        
+        return summary
+    
+    def _get_log_file_path(self, timestamp: str = None) -> Path:
+        """Возвращает путь к файлу лога за день записи (по умолчанию - сегодня)"""
+        day = timestamp[:10] if timestamp else datetime.now().strftime("%Y-%m-%d")
+        return self.logs_dir / f"{day}.jsonl"
+    
+    # === ФОНОВАЯ ЗАПИСЬ ===
+    
+    def _writer_loop(self):
+        """Поток записи: забирает из очереди все накопленное и дописывает в файлы"""
+        running = True
+        while running:
+            # Затихшая серия частых действий записывается сводкой
+            with self._run_lock:
+                self._finish_run(idle_only=True)
+            
+            try:
+                batch = [self._queue.get(timeout=self.IDLE_TIMEOUT)]
+            except queue.Empty:
+                batch = []
+            
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            received = len(batch)
+            if None in batch:
+                running = False
+                batch = [record for record in batch if record is not None]
+            
+            self._write_batch(batch)
+            for _ in range(received):
+                self._queue.task_done()
+            
+            if not running or time.monotonic() - self._last_fsync >= self.FSYNC_INTERVAL:
+                self._fsync()
+        
+        for handle in self._files.values():
+            handle.close()
+        self._files.clear()
+    
+    def _write_batch(self, batch: List[dict]):
+        """Дописывает пачку записей (каждая в файл своего дня)"""
+        for record in batch:
+            # Заголовок сессии попадает в файл текущего дня, вместе с действием
+            line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+            try:
+                self._open(self._record_file_path(record)).write(line)
+            except Exception as e:
+                print(f"⚠️ Ошибка записи журнала: {e}")
+        
+        for path, handle in list(self._files.items()):
+            handle.flush()
+            if handle.tell() >= self.rotator.max_file_bytes:
+                self._rotate_file(path)
+    
+    def _record_file_path(self, record: dict) -> Path:
+        """
+        Файл дня для записи
+        
+        В закрытый день (сводка серии несет время первого действия и
+        может прийти после полуночи) не дописываем: его файл уже сжимает
+        ротация. Такая запись попадает в файл текущего дня.
+        """
+        path = self._get_log_file_path(record.get("timestamp"))
+        current_day = max(self._latest_day, datetime.now().strftime("%Y-%m-%d"))
+        if path.name[:10] < current_day:
+            path = self._get_log_file_path(current_day)
+        self._latest_day = path.name[:10]
+        return path
+    
+    def _rotate_file(self, path: Path):
+        """Отрезает переполненный файл дня в отдельную часть и сжимает ее в фоне"""
+        handle = self._files.pop(path)
+        try:
+            os.fsync(handle.fileno())
+        finally:
+            handle.close()
+        
+        os.replace(path, self.rotator.next_part_path(path.name[:10]))
+        self.rotator.rotate_async()
+    
+    def _open(self, path: Path):
+        """Открывает файл дня на дозапись (после сбоя - с новой строки)"""
+        handle = self._files.get(path)
+        if handle is not None:
+            return handle
+        
+        # Закрываем файлы прошлых дней, их сожмет ротация
+        if self._files:
+            for old_path in list(self._files):
+                self._files.pop(old_path).close()
+            self.rotator.rotate_async()
+        
+        needs_newline = False
+        if path.exists() and path.stat().st_size > 0:
+            with open(path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b"\n"
         
-        # Сохраняем
-        with open(log_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        handle = open(path, 'a', encoding='utf-8')
+        if needs_newline:
+            handle.write("\n")
+        self._files[path] = handle
+        return handle
+    
+    def _fsync(self):
+        """Сбрасывает открытые файлы на диск"""
+        for handle in self._files.values():
+            try:
+                handle.flush()
+                os.fsync(handle.fileno())
+            except Exception as e:
+                print(f"⚠️ Ошибка сброса журнала на диск: {e}")
+        self._last_fsync = time.monotonic()
+    
+    def flush(self, timeout: float = 5.0):
+        """Дожидается записи всех действий (незавершенная серия записывается сводкой)"""
+        with self._run_lock:
+            self._finish_run()
+        
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline and self._writer.is_alive():
+            time.sleep(0.01)
+    
+    def close(self):
+        """Дописывает очередь, выполняет fsync и останавливает поток записи"""
+        if self._closed:
+            return
+        with self._run_lock:
+            self._closed = True
+            self._finish_run()
+        self._queue.put(None)
+        self._writer.join(timeout=5.0)
     
     def start_new_session(self):
         """Начинает новую сессию логирования"""
+        with self._run_lock:
+            self._finish_run()
         self.session_id = str(uuid.uuid4())
         self.session_start = datetime.now().isoformat()
-        self.actions = []
+        self._session_written = False
+    
+    def get_sessions_view(self, day: str = None) -> dict:
+        """
+        Вложенное представление журнала за день {"sessions": [...]}
+        
+        Args:
+            day: Дата YYYY-MM-DD (по умолчанию - сегодня)
+        """
+        self.flush()
+        day = day or datetime.now().strftime("%Y-%m-%d")
+        return load_sessions_view(self.logs_dir, day)
     
     # Предопределенные методы для частых действий
     
@@ -98,9 +336,11 @@ class ActionLogger:
         """Логирует установку рабочего диапазона срезов"""
         self.log_action("set_slice_range", start_slice=start_slice, end_slice=end_slice)
     
-    def log_segmentation_run(self, mode: str = None):
-        """Логирует запуск сегментации"""
-        self.log_action("run_segmentation", mode=mode)
+    def log_segmentation_run(self, mode: str = None, mode_id: str = None, parameters: dict = None,
+                             start_slice: int = None, end_slice: int = None):
+        """Логирует запуск сегментации (режим, параметры и диапазон срезов - для воспроизведения)"""
+        self.log_action("run_segmentation", mode=mode, mode_id=mode_id, params=parameters,
+                        start_slice=start_slice, end_slice=end_slice)
     
     def log_processing_mode(self, mode_name: str, parameters: dict = None):
         """Логирует выбор режима обработки"""
@@ -112,4 +352,110 @@ class ActionLogger:
     
     def log_admin_action(self, admin_action: str, **kwargs):
         """Логирует действие администратора"""
-        self.log_action("admin_action", admin_action=admin_action, **kwargs)
\ No newline at end of file
+        self.log_action("admin_action", admin_action=admin_action, **kwargs)
+
+
+# === ЧТЕНИЕ ЖУРНАЛОВ ===
+
+def read_log_records(path: Path) -> Iterator[dict]:
+    """
+    Читает записи журнала построчно (архивы .gz - с потоковой распаковкой)
+    
+    Поврежденные строки (например, недописанная последняя строка после
+    сбоя) пропускаются. Старый формат .json (сессии) разворачивается в
+    плоские записи.
+    """
+    path = Path(path)
+    if logical_log_name(path).endswith(".json"):
+        yield from _read_legacy_records(path)
+        return
+    
+    with open_log_stream(path) as f:
+        try:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(record, dict):
+                    yield record
+        except EOFError:
+            # Недописанный архив - читаем, сколько есть
+            print(f"⚠️ Архив журнала поврежден: {path}")
+
+
+def _read_legacy_records(path: Path) -> Iterator[dict]:
+    """Записи из старого формата {"sessions": [...]}"""
+    try:
+        with open_log_stream(path) as f:
+            data = json.load(f)
+    except Exception as e:
+        print(f"⚠️ Ошибка чтения журнала {path}: {e}")
+        return
+    
+    for session in data.get("sessions", []):
+        session_id = session.get("session_id")
+        role = session.get("user_role")
+        yield {
+            "record": SESSION_RECORD,
+            "session_id": session_id,
+            "session_start": session.get("session_start"),
+            "user_role": role
+        }
+        for action in session.get("actions", []):
+            yield {"session_id": session_id, "user_role": role, **action}
+
+
+def build_sessions_view(records) -> dict:
+    """
+    Группирует плоские записи по сессиям
+    
+    Returns:
+        {"sessions": [{"session_id", "session_start", "user_role", "actions"}]}
+    """
+    sessions: Dict[str, dict] = {}
+    
+    for record in records:
+        session_id = record.get("session_id")
+        session = sessions.get(session_id)
+        if session is None:
+            session = sessions[session_id] = {
+                "session_id": session_id,
+                "session_start": record.get("session_start") or record.get("timestamp"),
+                "user_role": record.get("user_role"),
+                "actions": []
+            }
+        
+        if record.get("record") == SESSION_RECORD:
+            session["session_start"] = record.get("session_start") or session["session_start"]
+            session["user_role"] = record.get("user_role") or session["user_role"]
+            continue
+        
+        action = {key: value for key, value in record.items()
+                  if key not in ("session_id", "user_role")}
+        session["actions"].append(action)
+    
+    # День может быть разбит на части и архивы - упорядочиваем по времени
+    for session in sessions.values():
+        session["actions"].sort(key=lambda action: action.get("timestamp") or "")
+    
+    return {"sessions": list(sessions.values())}
+
+
+def load_sessions_view(logs_dir, day: str) -> dict:
+    """
+    Вложенное представление журнала за день
+    
+    Читаются старый .json, файл .jsonl и его части - как текущие, так и
+    сжатые в архиве.
+    """
+    paths = [path for path in list_log_files(logs_dir) if parse_log_name(path)[0] == day]
+    
+    def records():
+        for path in paths:
+            yield from read_log_records(path)
+    
+    return build_sessions_view(records())
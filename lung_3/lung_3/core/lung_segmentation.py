@@ -0,0 +1,176 @@
+"""
+Сегментация легких по порогу HU.
+Шаги: порог -> удаление воздуха вне тела (компоненты связности,
+касающиеся боковых границ) -> два крупнейших компонента -> заливка
+отверстий по срезам -> сглаживание. Работает на диапазоне срезов,
+в обрезанной по маске области; требует scipy (импортируется при запуске).
+"""
+
+from typing import Callable, Optional
+
+import numpy as np
+
+
+# Метки результата
+RIGHT_LUNG = 1
+LEFT_LUNG = 2
+
+# Второй компонент считается легким, если он не меньше этой доли первого
+SECOND_LUNG_MIN_FRACTION = 0.1
+# Минимальный размер компонента легкого (вокселей)
+MIN_LUNG_VOXELS = 1000
+# Отступ вокруг найденной маски при обрезке, вокселей
+CROP_MARGIN = 3
+
+
+def _bounding_box(mask: np.ndarray, margin: int = 0) -> tuple:
+    """Срезы (slice) по осям, охватывающие ненулевые элементы маски"""
+    box = []
+    for axis in range(mask.ndim):
+        other = tuple(i for i in range(mask.ndim) if i != axis)
+        present = np.flatnonzero(mask.any(axis=other))
+        start = max(0, present[0] - margin)
+        stop = min(mask.shape[axis], present[-1] + 1 + margin)
+        box.append(slice(start, stop))
+    return tuple(box)
+
+
+def segment_lungs(volume: np.ndarray, start_slice: int = 0, end_slice: int = None,
+                  threshold: float = -500, smooth: bool = True, refine: bool = False,
+                  token=None, progress: Optional[Callable[[float], None]] = None) -> np.ndarray:
+    """
+    Сегментация легких на срезах start_slice..end_slice
+
+    Args:
+        threshold: Порог HU (воздух и легочная ткань - ниже порога)
+        smooth: Морфологическое закрытие маски (сглаживание границ)
+        refine: Разделить сросшиеся легкие по средней линии каждого среза
+        token: CancellationToken (проверяется между шагами)
+        progress: Обработчик прогресса (доля 0..1)
+
+    Returns:
+        Карта меток формы volume (uint8): 0 - фон, RIGHT_LUNG, LEFT_LUNG
+    """
+    from scipy import ndimage
+
+    def step(fraction: float):
+        if token is not None:
+            token.raise_if_cancelled()
+        if progress is not None:
+            progress(fraction)
+
+    depth = volume.shape[0]
+    end_slice = depth - 1 if end_slice is None else end_slice
+    start_slice = min(max(int(start_slice), 0), depth - 1)
+    end_slice = min(max(int(end_slice), start_slice), depth - 1)
+
+    labels_out = np.zeros(volume.shape, dtype=np.uint8)
+    sub = volume[start_slice:end_slice + 1]
+
+    # 1. Порог
+    air = sub < threshold
+    step(0.1)
+
+    # 2. Компоненты воздуха; касающиеся боковых границ среза - воздух вне тела
+    components, count = ndimage.label(air)
+    step(0.35)
+    if count == 0:
+        step(1.0)
+        return labels_out
+
+    outside = np.unique(np.concatenate([
+        components[:, 0, :].ravel(), components[:, -1, :].ravel(),
+        components[:, :, 0].ravel(), components[:, :, -1].ravel(),
+    ]))
+
+    # 3. Два крупнейших компонента внутри тела
+    sizes = np.bincount(components.ravel(), minlength=count + 1)
+    sizes[0] = 0
+    sizes[outside] = 0
+    order = np.argsort(sizes)[::-1]
+    lungs = [label for label in order[:2] if sizes[label] >= MIN_LUNG_VOXELS]
+    if len(lungs) == 2 and sizes[lungs[1]] < SECOND_LUNG_MIN_FRACTION * sizes[lungs[0]]:
+        lungs = lungs[:1]
+    step(0.45)
+    if not lungs:
+        step(1.0)
+        return labels_out
+
+    # Дальше работаем в обрезанной по найденным легким области
+    lookup = np.zeros(count + 1, dtype=np.uint8)
+    for index, label in enumerate(lungs, start=1):
+        lookup[label] = index
+    box = _bounding_box(np.isin(components, lungs), CROP_MARGIN)
+    lung_labels = lookup[components[box]]
+    del components
+    step(0.55)
+
+    mask = lung_labels > 0
+
+    # 4. Сглаживание (закрытие) - сосуды у границ и шероховатость контура
+    if smooth:
+        structure = ndimage.generate_binary_structure(3, 1)
+        mask = ndimage.binary_closing(mask, structure=structure, iterations=2)
+        # Закрытие не выходит за тело: воксели выше порога у внешней границы не добавляются
+        mask[:, :2, :] = lung_labels[:, :2, :] > 0
+        mask[:, -2:, :] = lung_labels[:, -2:, :] > 0
+    step(0.7)
+
+    # 5. Заливка отверстий по срезам (сосуды внутри легких)
+    for index in range(mask.shape[0]):
+        if mask[index].any():
+            mask[index] = ndimage.binary_fill_holes(mask[index])
+    step(0.85)
+
+    # Метки правого/левого легкого
+    result = _assign_sides(mask, lung_labels, refine)
+    labels_out[start_slice + box[0].start:start_slice + box[0].stop, box[1], box[2]] = result
+    step(1.0)
+    return labels_out
+
+
+def _assign_sides(mask: np.ndarray, lung_labels: np.ndarray, refine: bool) -> np.ndarray:
+    """
+    Метки RIGHT_LUNG/LEFT_LUNG для маски
+
+    Два компонента - по положению (в DICOM столбцы растут к левому боку
+    пациента); воксели, добавленные сглаживанием и заливкой, делятся по
+    середине промежутка между легкими на срезе. Один компонент (легкие
+    срослись): при refine - разделение по центру масс каждого среза,
+    иначе - одна метка.
+    """
+    result = np.zeros(mask.shape, dtype=np.uint8)
+    columns = np.arange(mask.shape[2])
+    present = [label for label in (1, 2) if (lung_labels == label).any()]
+
+    if len(present) < 2 and not refine:
+        result[mask] = RIGHT_LUNG
+        return result
+
+    # Граница между легкими по срезам
+    column_counts = mask.sum(axis=1)
+    totals = column_counts.sum(axis=1)
+    split = (column_counts * columns).sum(axis=1) / np.maximum(totals, 1)
+
+    if len(present) == 2:
+        profiles = [(lung_labels == label).any(axis=1) for label in present]
+        centers = [np.flatnonzero(profile.any(axis=0)).mean() for profile in profiles]
+        right, left = (0, 1) if centers[0] < centers[1] else (1, 0)
+        default_split = (centers[0] + centers[1]) / 2
+        for index in range(mask.shape[0]):
+            right_columns = np.flatnonzero(profiles[right][index])
+            left_columns = np.flatnonzero(profiles[left][index])
+            if right_columns.size and left_columns.size:
+                split[index] = (right_columns[-1] + left_columns[0]) / 2
+            else:
+                split[index] = default_split
+
+    left_side = columns[None, None, :] >= split[:, None, None]
+    result[mask & ~left_side] = RIGHT_LUNG
+    result[mask & left_side] = LEFT_LUNG
+
+    # Исходные компоненты сохраняют свою сторону
+    if len(present) == 2:
+        result[lung_labels == present[right]] = RIGHT_LUNG
+        result[lung_labels == present[left]] = LEFT_LUNG
+    return result
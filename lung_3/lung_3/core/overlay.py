@@ -0,0 +1,196 @@
+"""
+Наложение масок (карт меток) на изображение в градациях серого.
+Смешивание векторизовано, подготовленный RGBA-слой кэшируется
+по срезам и сбрасывается только для измененных срезов.
+"""
+
+from collections import OrderedDict
+import threading
+from typing import Callable, Dict, Iterable, Optional, Tuple
+import numpy as np
+
+
+# Цвета меток по умолчанию (RGB, 0..1)
+DEFAULT_LABEL_COLORS = {
+    1: (0.0, 1.0, 0.0),
+    2: (0.0, 0.6, 1.0),
+    3: (1.0, 0.8, 0.0),
+    4: (1.0, 0.2, 0.2),
+    5: (0.8, 0.3, 1.0),
+}
+
+
+def _slice_labels(labels: np.ndarray, orientation: str, index: int) -> np.ndarray:
+    """Срез карты меток в заданной ориентации"""
+    if orientation == 'axial':
+        return labels[index, :, :]
+    elif orientation == 'sagittal':
+        return labels[:, :, index]
+    elif orientation == 'coronal':
+        return labels[:, index, :]
+    raise ValueError(f"Неподдерживаемая ориентация: {orientation}")
+
+
+def _label_contours(labels: np.ndarray) -> np.ndarray:
+    """Оставляет только граничные пиксели меток (4-связность)"""
+    edge = np.zeros(labels.shape, dtype=bool)
+    edge[1:, :] |= labels[1:, :] != labels[:-1, :]
+    edge[:-1, :] |= labels[:-1, :] != labels[1:, :]
+    edge[:, 1:] |= labels[:, 1:] != labels[:, :-1]
+    edge[:, :-1] |= labels[:, :-1] != labels[:, 1:]
+    return np.where(edge, labels, 0)
+
+
+class OverlayLayer:
+    """Один слой меток с цветом и непрозрачностью по меткам"""
+
+    def __init__(self, labels: np.ndarray, colors: Dict[int, Tuple[float, float, float]] = None,
+                 opacity=0.4, contour_only: bool = False):
+        self.labels = labels
+        self.contour_only = contour_only
+        self.set_style(colors, opacity)
+
+    def set_style(self, colors: Dict[int, Tuple[float, float, float]] = None, opacity=0.4):
+        """
+        Задает цвета и непрозрачность
+
+        Args:
+            colors: {метка: (R, G, B)} в диапазоне 0..1
+            opacity: Общая непрозрачность или {метка: непрозрачность}
+        """
+        colors = colors or DEFAULT_LABEL_COLORS
+        max_label = int(max(max(colors), max(opacity) if isinstance(opacity, dict) else 0))
+
+        # Таблицы цвета (с предумножением на альфу) и альфы по меткам; метка 0 - фон
+        self.alpha_lut = np.zeros(max_label + 1, dtype=np.float32)
+        self.color_lut = np.zeros((max_label + 1, 3), dtype=np.float32)
+        for label in range(1, max_label + 1):
+            alpha = opacity.get(label, 0.4) if isinstance(opacity, dict) else opacity
+            color = colors.get(label, DEFAULT_LABEL_COLORS[(label - 1) % len(DEFAULT_LABEL_COLORS) + 1])
+            self.alpha_lut[label] = alpha
+            self.color_lut[label] = np.array(color, dtype=np.float32) * alpha * 255
+
+    def render_slice(self, orientation: str, index: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Строит RGBA-слой среза
+
+        Returns:
+            (premultiplied RGB (h, w, 3), alpha (h, w)) или None, если меток нет
+        """
+        labels = _slice_labels(self.labels, orientation, index)
+        if not labels.any():
+            return None
+
+        labels = labels.astype(np.intp, copy=False)
+        if self.contour_only:
+            labels = _label_contours(labels)
+        labels = np.minimum(labels, len(self.alpha_lut) - 1)
+
+        return self.color_lut[labels], self.alpha_lut[labels]
+
+
+class OverlayCompositor:
+    """
+    Набор слоев меток и кэш готовых RGBA-слоев по срезам.
+
+    Ключ кэша - (ориентация, индекс среза). Изменение аксиальных срезов
+    маски сбрасывает только эти аксиальные срезы и сагиттальные/корональные
+    срезы (они пересекают все аксиальные).
+    """
+
+    def __init__(self, cache_size: int = 192):
+        self.layers: "OrderedDict[str, OverlayLayer]" = OrderedDict()
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, int], Optional[tuple]]" = OrderedDict()
+        # Слои могут запрашиваться из потока предвыборки кадров
+        self._lock = threading.RLock()
+
+    def has_layers(self) -> bool:
+        return bool(self.layers)
+
+    def set_layer(self, name: str, layer: OverlayLayer):
+        """Добавляет или заменяет слой"""
+        self.layers[name] = layer
+        self.invalidate()
+
+    def remove_layer(self, name: str):
+        """Удаляет слой"""
+        if self.layers.pop(name, None) is not None:
+            self.invalidate()
+
+    def invalidate(self, changed_slices: Iterable[int] = None):
+        """
+        Сбрасывает кэш
+
+        Args:
+            changed_slices: Индексы измененных аксиальных срезов (None - все)
+        """
+        with self._lock:
+            if changed_slices is None:
+                self._cache.clear()
+                return
+
+            changed = set(changed_slices)
+            for key in list(self._cache):
+                orientation, index = key
+                if orientation != 'axial' or index in changed:
+                    del self._cache[key]
+
+    def get_overlay(self, orientation: str, index: int,
+                    transform: Callable[[np.ndarray], np.ndarray] = None) -> Optional[tuple]:
+        """
+        Возвращает объединенный RGBA-слой среза (из кэша при наличии)
+
+        Args:
+            orientation: Ориентация среза
+            index: Индекс среза
+            transform: Преобразование слоя перед кэшированием (например,
+                       пересэмплирование под пропорции экрана)
+
+        Returns:
+            (premultiplied RGB, alpha) или None
+        """
+        with self._lock:
+            key = (orientation, index)
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+            result = None
+            for layer in self.layers.values():
+                rendered = layer.render_slice(orientation, index)
+                if rendered is None:
+                    continue
+                if result is None:
+                    result = rendered
+                else:
+                    # Оператор "over": верхний слой поверх нижнего
+                    color, alpha = rendered
+                    below_color, below_alpha = result
+                    result = (color + below_color * (1 - alpha)[..., None],
+                              alpha + below_alpha * (1 - alpha))
+
+            if result is not None and transform is not None:
+                color, alpha = result
+                packed = transform(np.concatenate([color, alpha[..., None]], axis=-1))
+                result = (packed[..., :3], packed[..., 3])
+
+            self._cache[key] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return result
+
+
+def composite_argb32(gray: np.ndarray, overlay: tuple) -> np.ndarray:
+    """
+    Смешивает изображение uint8 с RGBA-слоем
+
+    Returns:
+        Массив uint32 в формате ARGB32 (0xAARRGGBB)
+    """
+    color, alpha = overlay
+    blended = gray[..., None] * (1 - alpha)[..., None] + color
+    blended = np.clip(blended, 0, 255).astype(np.uint32)
+
+    return (np.uint32(0xFF000000) | (blended[..., 0] << 16) |
+            (blended[..., 1] << 8) | blended[..., 2])
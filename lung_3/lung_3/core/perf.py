@@ -0,0 +1,111 @@
+"""
+Замеры производительности по этапам (рендеринг, загрузка данных).
+Хранит скользящее окно последних замеров и считает p50/p95,
+снимок метрик можно записать в журнал действий.
+"""
+
+from collections import deque
+from contextlib import contextmanager
+import platform
+import threading
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+
+class PerfMonitor:
+    """Скользящая статистика времени выполнения по этапам"""
+
+    def __init__(self, window: int = 200):
+        """
+        Args:
+            window: Число последних замеров, по которым считаются перцентили
+        """
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+        self._totals: Dict[str, int] = {}
+        # Этапы замеряются и из фоновых потоков (кино-режим)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Замер этапа
+
+        Пример:
+            with perf_monitor.stage('render.fetch'):
+                ...
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float):
+        """Добавляет замер этапа (в секундах)"""
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+                self._totals[name] = 0
+            samples.append(seconds)
+            self._totals[name] += 1
+
+    def get_stats(self, name: str) -> Optional[dict]:
+        """
+        Статистика одного этапа
+
+        Returns:
+            {'count', 'p50_ms', 'p95_ms', 'max_ms'} или None, если замеров нет
+        """
+        with self._lock:
+            samples = self._samples.get(name)
+            if not samples:
+                return None
+            values = np.fromiter(samples, dtype=np.float64, count=len(samples)) * 1000.0
+            count = self._totals[name]
+
+        p50, p95 = np.percentile(values, [50, 95])
+        return {
+            'count': count,
+            'p50_ms': round(float(p50), 3),
+            'p95_ms': round(float(p95), 3),
+            'max_ms': round(float(values.max()), 3),
+        }
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Статистика всех этапов {этап: статистика}"""
+        with self._lock:
+            names = sorted(self._samples)
+
+        result = {}
+        for name in names:
+            stats = self.get_stats(name)
+            if stats is not None:
+                result[name] = stats
+        return result
+
+    def dump_to_logger(self, logger) -> Dict[str, dict]:
+        """
+        Записывает снимок метрик в журнал действий (действие perf_snapshot)
+
+        Returns:
+            Записанный снимок
+        """
+        stages = self.snapshot()
+        if logger is not None:
+            logger.log_action("perf_snapshot", host=platform.node(),
+                              window=self.window, stages=stages)
+        return stages
+
+    def reset(self):
+        """Сбрасывает все замеры"""
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+
+
+# Общий экземпляр приложения
+perf_monitor = PerfMonitor()
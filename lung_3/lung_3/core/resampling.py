@@ -0,0 +1,84 @@
+"""
+Пересэмплирование срезов с учетом размера вокселя.
+Приводит срез к квадратным пикселям (физически верные пропорции).
+"""
+
+from collections import OrderedDict
+from typing import Optional, Tuple
+import numpy as np
+
+
+class AspectResampler:
+    """
+    Линейная интерполяция срезов по строкам до размера пикселя по столбцам.
+
+    Индексы и веса интерполяции вычисляются один раз для заданного числа
+    строк, результаты кэшируются по ключу среза. Размер результата
+    определяется физической протяженностью среза, поэтому стоимость
+    не растет с толщиной среза.
+    """
+
+    def __init__(self, row_spacing: float, col_spacing: float, cache_size: int = 32):
+        self.row_spacing = float(row_spacing)
+        self.col_spacing = float(col_spacing)
+        self.cache_size = cache_size
+
+        self._weights_rows: Optional[int] = None
+        self._weights: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+        self._cache: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+
+    @property
+    def is_identity(self) -> bool:
+        """Пиксели уже квадратные - пересэмплирование не нужно"""
+        return abs(self.row_spacing / self.col_spacing - 1.0) < 0.01
+
+    @property
+    def row_scale(self) -> float:
+        """Коэффициент растяжения по строкам"""
+        return self.row_spacing / self.col_spacing
+
+    def _get_weights(self, rows: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Индексы соседних строк и веса интерполяции"""
+        if self._weights_rows != rows:
+            out_rows = max(1, int(round((rows - 1) * self.row_scale)) + 1)
+            src = np.linspace(0, rows - 1, out_rows)
+            lower = np.floor(src).astype(np.intp)
+            upper = np.minimum(lower + 1, rows - 1)
+            weight = (src - lower).astype(np.float32)
+
+            self._weights_rows = rows
+            self._weights = (lower, upper, weight)
+
+        return self._weights
+
+    def resample(self, data: np.ndarray, key: tuple = None) -> np.ndarray:
+        """
+        Пересэмплирует срез по строкам
+
+        Args:
+            data: Срез (строки - первая ось)
+            key: Ключ кэша (None - без кэширования)
+        """
+        if self.is_identity:
+            return data
+
+        if key is not None and key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        lower, upper, weight = self._get_weights(data.shape[0])
+        # Поддержка многоканальных срезов (например, RGBA-оверлей)
+        weight = weight.reshape((-1,) + (1,) * (data.ndim - 1))
+        result = data[lower] * (1 - weight) + data[upper] * weight
+        result = result.astype(np.float32)
+
+        if key is not None:
+            self._cache[key] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        return result
+
+    def clear_cache(self):
+        """Сбрасывает кэш срезов"""
+        self._cache.clear()
@@ -0,0 +1,155 @@
+"""
+Толстослойные проекции (slab) MIP / MinIP / AvgIP.
+Скользящий слой пересчитывается за O(размер среза) при сдвиге на один срез.
+"""
+
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import numpy as np
+
+
+SLAB_MODES = ('mip', 'minip', 'avgip')
+
+AXIS_BY_ORIENTATION = {'axial': 0, 'coronal': 1, 'sagittal': 2}
+
+
+class _SlidingReducer:
+    """
+    Скользящее окно фиксированной толщины вдоль оси 0.
+
+    MIP/MinIP - алгоритм van Herk / Gil-Werman: объем делится на блоки
+    длины k, для каждого блока лениво считаются префиксные и суффиксные
+    max/min. Окно [i, i + k) = op(suffix[i], prefix[i + k - 1]), блок
+    строится один раз на k сдвигов.
+    AvgIP - скользящая сумма: добавляем входящий срез, вычитаем уходящий.
+    """
+
+    MAX_BLOCKS = 4
+
+    def __init__(self, stack: np.ndarray, thickness: int, mode: str):
+        self.stack = stack
+        self.k = thickness
+        self.mode = mode
+        self.op = np.maximum if mode == 'mip' else np.minimum
+
+        self._blocks: "OrderedDict[int, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+        self._last_start: Optional[int] = None
+        self._last_sum: Optional[np.ndarray] = None
+
+    def _get_block(self, block: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Префиксные и суффиксные экстремумы блока"""
+        if block in self._blocks:
+            self._blocks.move_to_end(block)
+            return self._blocks[block]
+
+        chunk = self.stack[block * self.k:(block + 1) * self.k]
+        prefix = self.op.accumulate(chunk, axis=0)
+        suffix = self.op.accumulate(chunk[::-1], axis=0)[::-1]
+
+        self._blocks[block] = (prefix, suffix)
+        if len(self._blocks) > self.MAX_BLOCKS:
+            self._blocks.popitem(last=False)
+        return prefix, suffix
+
+    def get(self, start: int) -> np.ndarray:
+        """Проекция окна [start, start + k)"""
+        if self.mode == 'avgip':
+            return self._get_average(start)
+
+        end = start + self.k - 1
+        first_block, last_block = start // self.k, end // self.k
+
+        _, suffix = self._get_block(first_block)
+        if first_block == last_block:
+            # Окно выровнено по границе блока
+            return suffix[start - first_block * self.k]
+
+        prefix, _ = self._get_block(last_block)
+        return self.op(suffix[start - first_block * self.k], prefix[end - last_block * self.k])
+
+    def _get_average(self, start: int) -> np.ndarray:
+        """Среднее по окну через скользящую сумму"""
+        last = self._last_start
+
+        if last is not None and start == last + 1:
+            total = self._last_sum + self.stack[start + self.k - 1] - self.stack[last]
+        elif last is not None and start == last - 1:
+            total = self._last_sum + self.stack[start] - self.stack[last + self.k - 1]
+        elif last is not None and start == last:
+            total = self._last_sum
+        else:
+            total = self.stack[start:start + self.k].sum(axis=0, dtype=np.float64)
+
+        self._last_start = start
+        self._last_sum = total
+        return (total / self.k).astype(np.float32)
+
+
+class SlabProjector:
+    """
+    Построение толстослойных проекций с кэшем по положению слоя
+    """
+
+    MAX_REDUCERS = 6
+
+    def __init__(self, volume: np.ndarray, cache_size: int = 64):
+        self.volume = volume
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._reducers: Dict[Tuple[int, int, str], _SlidingReducer] = {}
+
+    def _cached(self, key: tuple, compute) -> np.ndarray:
+        """Возвращает результат из кэша или вычисляет его"""
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        result = compute()
+        self._cache[key] = result
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return result
+
+    def get_sliding_slab(self, orientation: str, center: int, thickness: int, mode: str) -> np.ndarray:
+        """
+        Слой фиксированной толщины вокруг текущего среза
+
+        Args:
+            orientation: 'axial', 'sagittal', 'coronal'
+            center: Индекс центрального среза
+            thickness: Толщина слоя в срезах
+            mode: 'mip', 'minip', 'avgip'
+        """
+        axis = AXIS_BY_ORIENTATION[orientation]
+        length = self.volume.shape[axis]
+        thickness = max(1, min(thickness, length))
+        start = max(0, min(center - thickness // 2, length - thickness))
+
+        reducer_key = (axis, thickness, mode)
+        if reducer_key not in self._reducers:
+            if len(self._reducers) >= self.MAX_REDUCERS:
+                self._reducers.pop(next(iter(self._reducers)))
+            stack = np.moveaxis(self.volume, axis, 0)
+            self._reducers[reducer_key] = _SlidingReducer(stack, thickness, mode)
+        reducer = self._reducers[reducer_key]
+
+        return self._cached(('sliding',) + reducer_key + (start,), lambda: reducer.get(start))
+
+    def get_range_slab(self, orientation: str, start: int, end: int, mode: str) -> np.ndarray:
+        """
+        Слой по явному диапазону срезов [start, end] (например, рабочая область)
+        """
+        axis = AXIS_BY_ORIENTATION[orientation]
+        length = self.volume.shape[axis]
+        start = max(0, min(start, length - 1))
+        end = max(start, min(end, length - 1))
+
+        def compute():
+            stack = np.moveaxis(self.volume, axis, 0)[start:end + 1]
+            if mode == 'mip':
+                return stack.max(axis=0)
+            if mode == 'minip':
+                return stack.min(axis=0)
+            return stack.mean(axis=0, dtype=np.float64).astype(np.float32)
+
+        return self._cached(('range', axis, mode, start, end), compute)
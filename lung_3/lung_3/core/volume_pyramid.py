@@ -0,0 +1,61 @@
+"""
+Пирамида уровней детализации 3D-объема.
+Используется для быстрого предпросмотра при интерактивных операциях
+(вращение косого среза, объемный рендеринг, кино-режим).
+"""
+
+import threading
+from typing import List, Optional
+import numpy as np
+
+
+class VolumePyramid:
+    """
+    Набор уменьшенных копий объема.
+
+    Уровень 0 - исходный объем, уровень k - прореживание в 2^k раз
+    по каждой оси. Уровни строятся лениво при первом обращении.
+    """
+
+    def __init__(self, volume: np.ndarray, max_levels: int = 3):
+        self.volume = volume
+        self.max_levels = max_levels
+        self._levels: List[Optional[np.ndarray]] = [volume] + [None] * max_levels
+        # Уровни запрашиваются из фоновых потоков (рендеринг, предвыборка кадров)
+        self._lock = threading.Lock()
+
+    @property
+    def num_levels(self) -> int:
+        """Количество доступных уровней (включая исходный)"""
+        return len(self._levels)
+
+    def clamp_level(self, level: int) -> int:
+        """Уровень в пределах доступных (как его фактически возвращает get_level)"""
+        return max(0, min(level, self.num_levels - 1))
+
+    def get_level(self, level: int) -> np.ndarray:
+        """
+        Возвращает объем заданного уровня
+
+        Args:
+            level: 0 - полное разрешение, 1 - в 2 раза меньше, и т.д.
+        """
+        level = self.clamp_level(level)
+
+        if self._levels[level] is not None:
+            return self._levels[level]
+
+        with self._lock:
+            if self._levels[level] is None:
+                step = 2 ** level
+                # Непрерывная копия в float32: быстрее для последующих выборок
+                self._levels[level] = np.ascontiguousarray(
+                    self.volume[::step, ::step, ::step], dtype=np.float32
+                )
+
+        return self._levels[level]
+
+    @staticmethod
+    def level_scale(level: int) -> int:
+        """Коэффициент уменьшения для уровня"""
+        return 2 ** max(0, level)
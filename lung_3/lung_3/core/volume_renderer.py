@@ -0,0 +1,255 @@
+"""
+Программный объемный рендеринг (ray casting) на CPU.
+Лучи обрабатываются пакетно средствами NumPy, пустые области
+пропускаются по грубой сетке блоков (min/max), рендеринг идет
+от грубого уровня пирамиды к полному разрешению.
+"""
+
+import threading
+from typing import Callable, Dict, Optional, Tuple
+import numpy as np
+
+from core.mpr import trilinear_sample
+from core.volume_pyramid import VolumePyramid
+
+
+HU_MIN = -1024
+HU_MAX = 3071
+
+# Передаточные функции: (HU, (R, G, B), непрозрачность на 1 мм)
+TRANSFER_PRESETS: Dict[str, list] = {
+    'lung': [
+        (-1024, (0.0, 0.0, 0.0), 0.0),
+        (-900, (0.9, 0.6, 0.5), 0.0),
+        (-700, (0.9, 0.6, 0.5), 0.015),
+        (-450, (0.9, 0.5, 0.4), 0.03),
+        (-300, (0.8, 0.3, 0.3), 0.0),
+        (50, (0.8, 0.2, 0.2), 0.0),
+        (150, (0.9, 0.3, 0.3), 0.15),
+        (300, (1.0, 1.0, 0.9), 0.35),
+        (HU_MAX, (1.0, 1.0, 0.9), 0.6),
+    ],
+    'airway': [
+        (-1024, (0.0, 0.0, 0.0), 0.0),
+        (-980, (0.3, 0.6, 1.0), 0.0),
+        (-940, (0.3, 0.6, 1.0), 0.12),
+        (-880, (0.5, 0.8, 1.0), 0.25),
+        (-820, (0.5, 0.8, 1.0), 0.0),
+        (HU_MAX, (0.0, 0.0, 0.0), 0.0),
+    ],
+}
+
+
+class TransferFunction:
+    """Таблица цвета и непрозрачности по целым значениям HU"""
+
+    def __init__(self, points: list):
+        hu = np.arange(HU_MIN, HU_MAX + 1, dtype=np.float64)
+        xs = [p[0] for p in points]
+
+        self.color = np.stack(
+            [np.interp(hu, xs, [p[1][ch] for p in points]) for ch in range(3)], axis=1
+        ).astype(np.float32)
+        self.alpha = np.interp(hu, xs, [p[2] for p in points]).astype(np.float32)
+
+        # Префиксный счетчик ненулевой непрозрачности: проверка
+        # "блок с диапазоном [min, max] пуст" за O(1)
+        self._visible_cumsum = np.concatenate([[0], np.cumsum(self.alpha > 0)])
+
+    @classmethod
+    def from_preset(cls, name: str) -> "TransferFunction":
+        return cls(TRANSFER_PRESETS[name])
+
+    def lookup_index(self, values: np.ndarray) -> np.ndarray:
+        """Переводит HU в индексы таблицы"""
+        return np.clip(values, HU_MIN, HU_MAX).astype(np.intp) - HU_MIN
+
+    def range_visible(self, min_values: np.ndarray, max_values: np.ndarray) -> np.ndarray:
+        """Есть ли в диапазоне [min, max] значения с ненулевой непрозрачностью"""
+        lo = self.lookup_index(min_values)
+        hi = self.lookup_index(max_values)
+        return (self._visible_cumsum[hi + 1] - self._visible_cumsum[lo]) > 0
+
+
+class BrickGrid:
+    """Грубая сетка блоков с min/max значениями для пропуска пустоты"""
+
+    def __init__(self, volume: np.ndarray, brick_size: int = 8):
+        self.brick_size = brick_size
+        b = brick_size
+
+        nz, ny, nx = volume.shape
+        pad = [(0, (-n) % b) for n in (nz, ny, nx)]
+        padded = np.pad(volume, pad, mode='edge')
+        blocks = padded.reshape(padded.shape[0] // b, b, padded.shape[1] // b, b,
+                                padded.shape[2] // b, b)
+
+        self.min_values = blocks.min(axis=(1, 3, 5))
+        self.max_values = blocks.max(axis=(1, 3, 5))
+
+    def occupancy(self, transfer: TransferFunction) -> np.ndarray:
+        """Маска блоков, которые могут дать вклад в изображение"""
+        return transfer.range_visible(self.min_values, self.max_values)
+
+
+class VolumeRenderer:
+    """
+    Ray casting с ортографической камерой.
+
+    Композиция front-to-back с ранним завершением лучей. Лучи в пустых
+    блоках перескакивают сразу к границе блока.
+    """
+
+    OPACITY_CUTOFF = 0.95
+
+    def __init__(self, volume: np.ndarray, spacing: Tuple[float, float, float] = (1.0, 1.0, 1.0),
+                 preset: str = 'lung'):
+        self.pyramid = VolumePyramid(volume)
+        self.spacing = np.array(spacing, dtype=np.float64)
+
+        self.azimuth = 0.0
+        self.elevation = 0.0
+
+        self._bricks: Dict[int, BrickGrid] = {}
+        self._bricks_lock = threading.Lock()
+        self.set_preset(preset)
+
+    def set_preset(self, preset: str):
+        """Выбирает предустановку передаточной функции"""
+        self.preset = preset
+        self.transfer = TransferFunction.from_preset(preset)
+
+    def set_spacing(self, spacing: Tuple[float, float, float]):
+        """Устанавливает размер вокселя (dz, dy, dx) в мм"""
+        self.spacing = np.array(spacing, dtype=np.float64)
+
+    def rotate(self, d_azimuth: float, d_elevation: float):
+        """Поворот камеры (радианы)"""
+        self.azimuth = (self.azimuth + d_azimuth) % (2 * np.pi)
+        self.elevation = float(np.clip(self.elevation + d_elevation, -np.pi / 2, np.pi / 2))
+
+    def _get_bricks(self, level: int) -> BrickGrid:
+        bricks = self._bricks.get(level)
+        if bricks is None:
+            # Сетка строится один раз, даже при запросах из нескольких потоков
+            with self._bricks_lock:
+                bricks = self._bricks.get(level)
+                if bricks is None:
+                    bricks = BrickGrid(self.pyramid.get_level(level))
+                    self._bricks[level] = bricks
+        return bricks
+
+    def _camera(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Направление взгляда и оси изображения в координатах (z, y, x)"""
+        ca, sa = np.cos(self.azimuth), np.sin(self.azimuth)
+        ce, se = np.cos(self.elevation), np.sin(self.elevation)
+
+        # Азимут - вокруг оси z (смешивает y и x), элевация - вокруг оси x
+        rot_azimuth = np.array([[1, 0, 0], [0, ca, -sa], [0, sa, ca]])
+        rot_elevation = np.array([[ce, -se, 0], [se, ce, 0], [0, 0, 1]])
+        rotation = rot_azimuth @ rot_elevation
+
+        # По умолчанию - вид спереди, верх изображения - краниальное направление
+        direction = rotation @ np.array([0.0, 1.0, 0.0])
+        up = rotation @ np.array([1.0, 0.0, 0.0])
+        right = rotation @ np.array([0.0, 0.0, 1.0])
+        return direction, up, right
+
+    def render(self, out_shape: Tuple[int, int], level: int = 0,
+               is_cancelled: Optional[Callable[[], bool]] = None) -> Optional[np.ndarray]:
+        """
+        Рендерит изображение
+
+        Args:
+            out_shape: Максимальный размер изображения (высота, ширина)
+            level: Уровень пирамиды (0 - полное разрешение)
+            is_cancelled: Функция проверки отмены (для фоновых потоков)
+
+        Returns:
+            RGB-изображение uint8 (квадратное) или None при отмене
+        """
+        level = self.pyramid.clamp_level(level)
+        volume = self.pyramid.get_level(level)
+        bricks = self._get_bricks(level)
+        occupied = bricks.occupancy(self.transfer)
+
+        scale = VolumePyramid.level_scale(level)
+        spacing = self.spacing * scale
+        step = float(spacing.min())
+        extent = (np.array(volume.shape) - 1) * spacing
+        center = extent / 2
+        radius = float(np.linalg.norm(extent)) / 2
+
+        # Лучи: не больше, чем пикселей на экране и вокселей по диагонали
+        size = int(max(1, min(min(out_shape), 2 * radius / step)))
+        image = np.zeros((size, size, 3), dtype=np.float32)
+        if not occupied.any():
+            return (image * 255).astype(np.uint8)
+
+        direction, up, right = self._camera()
+        grid = (np.arange(size) - (size - 1) / 2) * (2 * radius / size)
+        rows, cols = np.meshgrid(-grid, grid, indexing='ij')
+        origins = (center - direction * radius +
+                   rows.reshape(-1, 1) * up + cols.reshape(-1, 1) * right)
+
+        # Пересечение лучей с габаритами непустых блоков (метод слоев)
+        brick_mm = bricks.brick_size * spacing
+        nonempty = np.argwhere(occupied)
+        box_lo = nonempty.min(axis=0) * brick_mm
+        box_hi = np.minimum((nonempty.max(axis=0) + 1) * brick_mm, extent)
+
+        safe_dir = np.where(np.abs(direction) < 1e-9, 1e-9, direction)
+        t0 = (box_lo - origins) / safe_dir
+        t1 = (box_hi - origins) / safe_dir
+        t_near = np.maximum(np.minimum(t0, t1).max(axis=1), 0.0)
+        t_far = np.maximum(t0, t1).min(axis=1)
+
+        ray_ids = np.nonzero(t_near < t_far)[0]
+        t = t_near[ray_ids]
+        t_end = t_far[ray_ids]
+
+        color = np.zeros((size * size, 3), dtype=np.float32)
+        alpha = np.zeros(size * size, dtype=np.float32)
+
+        # Непрозрачность задана на 1 мм - корректируем под шаг луча
+        step_alpha = 1.0 - np.power(1.0 - np.clip(self.transfer.alpha, 0, 0.999), step)
+        brick_limit = np.array(occupied.shape) - 1
+
+        while ray_ids.size:
+            if is_cancelled is not None and is_cancelled():
+                return None
+
+            pos = origins[ray_ids] + t[:, None] * direction
+            index = pos / spacing
+            brick = np.clip((index // bricks.brick_size).astype(np.intp), 0, brick_limit)
+            in_brick = occupied[brick[:, 0], brick[:, 1], brick[:, 2]]
+
+            # Непустые блоки: выборка и композиция
+            hit = np.nonzero(in_brick)[0]
+            if hit.size:
+                values = trilinear_sample(volume, index[hit, 0], index[hit, 1], index[hit, 2],
+                                          fill_value=HU_MIN)
+                lut = self.transfer.lookup_index(values)
+                a = step_alpha[lut]
+                ids = ray_ids[hit]
+                weight = (1.0 - alpha[ids]) * a
+                color[ids] += weight[:, None] * self.transfer.color[lut]
+                alpha[ids] += weight
+
+            # Пустые блоки: прыжок к выходу из блока
+            advance = np.full(ray_ids.size, step)
+            empty = np.nonzero(~in_brick)[0]
+            if empty.size:
+                lo = brick[empty] * brick_mm
+                hi = lo + brick_mm
+                exit_t = np.where(direction > 0, (hi - pos[empty]) / safe_dir,
+                                  (lo - pos[empty]) / safe_dir)
+                exit_t = np.where(np.abs(direction) < 1e-9, np.inf, exit_t).min(axis=1)
+                advance[empty] = np.maximum(exit_t + 1e-3, step)
+
+            t = t + advance
+            alive = (t < t_end) & (alpha[ray_ids] < self.OPACITY_CUTOFF)
+            ray_ids, t, t_end = ray_ids[alive], t[alive], t_end[alive]
+
+        image = color.reshape(size, size, 3)
+        return (np.clip(image, 0, 1) * 255).astype(np.uint8)
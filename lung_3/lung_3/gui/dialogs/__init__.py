@@ -5,5 +5,6 @@
 from .login_dialog import LoginDialog
 from .series_selector import SeriesSelectorDialog
 from .config_editor import ConfigEditorDialog
+from .log_analytics_dialog import LogAnalyticsDialog
 
-__all__ = ['LoginDialog', 'SeriesSelectorDialog', 'ConfigEditorDialog']
\ No newline at end of file
+__all__ = ['LoginDialog', 'SeriesSelectorDialog', 'ConfigEditorDialog', 'LogAnalyticsDialog']
\ No newline at end of file
@@ -0,0 +1,168 @@
+"""
+Диалог аналитики журналов действий для администратора
+"""
+
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
+                             QComboBox, QDateEdit, QCheckBox, QTableWidget,
+                             QTableWidgetItem, QHeaderView, QFormLayout)
+from PyQt5.QtCore import QDate, pyqtSignal
+
+from core.compute import submit_compute
+from core.log_analytics import LogIndex
+
+
+class LogAnalyticsDialog(QDialog):
+    """Запросы к индексу журналов: число действий с фильтрами и группировкой"""
+
+    GROUP_NAMES = {
+        'day': "По дням",
+        'action': "По действиям",
+        'role': "По ролям",
+        'session': "По сессиям",
+        'detail': "По уточнению (режим, формат)",
+    }
+
+    ALL_VALUES = "Все"
+
+    # Результат фонового обновления индекса (число новых записей, ошибка)
+    _index_updated = pyqtSignal(object, object)
+
+    def __init__(self, logs_dir, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Аналитика журналов")
+        self.setModal(True)
+
+        self.index = LogIndex(logs_dir)
+        self._update_job = None
+        self._index_updated.connect(self._on_index_updated)
+
+        self._setup_ui()
+        self.resize(600, 500)
+
+        self._on_update_index()
+
+    def _setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        form = QFormLayout()
+
+        self.action_combo = QComboBox()
+        form.addRow("Действие:", self.action_combo)
+
+        self.role_combo = QComboBox()
+        form.addRow("Роль:", self.role_combo)
+
+        dates_layout = QHBoxLayout()
+        self.date_checkbox = QCheckBox("Период:")
+        dates_layout.addWidget(self.date_checkbox)
+        self.date_from = QDateEdit(QDate.currentDate().addMonths(-1))
+        self.date_from.setCalendarPopup(True)
+        dates_layout.addWidget(self.date_from)
+        dates_layout.addWidget(QLabel("—"))
+        self.date_to = QDateEdit(QDate.currentDate())
+        self.date_to.setCalendarPopup(True)
+        dates_layout.addWidget(self.date_to)
+        form.addRow(dates_layout)
+
+        self.group_combo = QComboBox()
+        for group, name in self.GROUP_NAMES.items():
+            self.group_combo.addItem(name, group)
+        form.addRow("Группировка:", self.group_combo)
+
+        layout.addLayout(form)
+
+        self.results_table = QTableWidget()
+        self.results_table.setColumnCount(2)
+        self.results_table.setHorizontalHeaderLabels(["Значение", "Количество"])
+        self.results_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        layout.addWidget(self.results_table)
+
+        self.status_label = QLabel("")
+        self.status_label.setStyleSheet("font-size: 10px; color: #888;")
+        layout.addWidget(self.status_label)
+
+        buttons_layout = QHBoxLayout()
+
+        self.update_btn = QPushButton("Обновить индекс")
+        self.update_btn.clicked.connect(self._on_update_index)
+        buttons_layout.addWidget(self.update_btn)
+
+        self.query_btn = QPushButton("Выполнить")
+        self.query_btn.clicked.connect(self._on_query)
+        buttons_layout.addWidget(self.query_btn)
+
+        close_btn = QPushButton("Закрыть")
+        close_btn.clicked.connect(self.accept)
+        buttons_layout.addWidget(close_btn)
+
+        layout.addLayout(buttons_layout)
+
+    def _fill_combo(self, combo: QComboBox, values: list):
+        """Заполняет фильтр значениями словаря с сохранением выбора"""
+        current = combo.currentData()
+        combo.clear()
+        combo.addItem(self.ALL_VALUES, None)
+        for value in sorted(values):
+            combo.addItem(value, value)
+        index = combo.findData(current)
+        combo.setCurrentIndex(max(0, index))
+
+    def _on_update_index(self):
+        """Дополняет индекс новыми записями журналов в фоновом потоке"""
+        if self._update_job is not None:
+            return
+
+        self.update_btn.setEnabled(False)
+        self.query_btn.setEnabled(False)
+        self.status_label.setText("Обновление индекса...")
+
+        index = self.index
+        job = submit_compute(lambda token, progress: index.update())
+        job.future.add_done_callback(
+            lambda future: None if future.cancelled()
+            else self._index_updated.emit(future.result() if future.exception() is None else None,
+                                          future.exception())
+        )
+        self._update_job = job
+
+    def _on_index_updated(self, added, error):
+        """Индекс обновлен - фильтры и результат запроса"""
+        self._update_job = None
+        self.update_btn.setEnabled(True)
+        self.query_btn.setEnabled(True)
+
+        if error is not None:
+            self.status_label.setText(f"Ошибка обновления индекса: {error}")
+            return
+
+        self._fill_combo(self.action_combo, self.index.distinct('action'))
+        self._fill_combo(self.role_combo, self.index.distinct('role'))
+        self.status_label.setText(f"Записей в индексе: {self.index.num_rows} (новых: {added})")
+        self._on_query()
+
+    def _on_query(self):
+        """Выполняет запрос и показывает результат"""
+        if self._update_job is not None:
+            return
+
+        filters = {
+            'action': self.action_combo.currentData(),
+            'role': self.role_combo.currentData(),
+        }
+        if self.date_checkbox.isChecked():
+            filters['date_from'] = self.date_from.date().toPyDate()
+            filters['date_to'] = self.date_to.date().toPyDate()
+
+        result = self.index.query(group_by=self.group_combo.currentData(), **filters)
+
+        self.results_table.setRowCount(len(result))
+        for row, (key, count) in enumerate(result.items()):
+            self.results_table.setItem(row, 0, QTableWidgetItem(key or "—"))
+            self.results_table.setItem(row, 1, QTableWidgetItem(str(count)))
+
+    def done(self, result):
+        """Закрытие диалога: незавершенное обновление больше не нужно"""
+        if self._update_job is not None:
+            self._update_job.cancel()
+            self._update_job = None
+        super().done(result)
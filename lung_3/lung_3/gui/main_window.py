@@ -4,20 +4,29 @@
 """
 
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-                             QSplitter, QMenuBar, QMenu, QAction, QMessageBox)
-from PyQt5.QtCore import Qt, pyqtSignal
+                             QSplitter, QMenuBar, QMenu, QAction, QMessageBox,
+                             QScrollArea, QFrame)
+from PyQt5.QtCore import Qt, pyqtSignal, QFileSystemWatcher, QTimer
 from PyQt5.QtGui import QDragEnterEvent, QDropEvent
 from pathlib import Path
+import numpy as np
 
 from core.auth import AuthManager
 from core.config_manager import ConfigManager
 from core.logger import ActionLogger
 from core.dicom_loader import DICOMLoader
+from core.perf import perf_monitor
+from core.analysis_context import AnalysisContext
+from core.compute import submit_compute
+from core.lung_segmentation import segment_lungs, RIGHT_LUNG, LEFT_LUNG
 from utils.plugin_loader import PluginLoader
 
 from gui.widgets.projection_manager import ProjectionManager
 from gui.widgets.viewer_widget import ViewerWidget
 from gui.widgets.status_widget import StatusWidget
+from gui.widgets.segmentation_widget import SegmentationWidget
+from gui.widgets.save_widget import SaveWidget
+from gui.widgets.module_host import LazyModuleHost
 from gui.dialogs.login_dialog import LoginDialog
 from gui.dialogs.series_selector import SeriesSelectorDialog
 
@@ -28,6 +37,16 @@ class MainWindow(QMainWindow):
     data_loaded = pyqtSignal(object)
     role_changed = pyqtSignal(str)
     
+    # Результаты фоновой сегментации (из рабочего потока)
+    _segmentation_progress = pyqtSignal(object, float)
+    _segmentation_done = pyqtSignal(object, object, object)  # job, labels, error
+    
+    # Цвета меток сегментации
+    SEGMENTATION_COLORS = {RIGHT_LUNG: (0.2, 0.8, 0.3), LEFT_LUNG: (0.2, 0.5, 1.0)}
+    
+    # Пауза перед перечитыванием измененного файла конфигурации
+    CONFIG_RELOAD_DELAY_MS = 300
+    
     def __init__(self):
         super().__init__()
         
@@ -37,6 +56,7 @@ class MainWindow(QMainWindow):
         self.logger = ActionLogger()
         self.dicom_loader = DICOMLoader()
         self.plugin_loader = PluginLoader()
+        self.analysis_context = AnalysisContext()
         
         # Загрузка плагинов
         self.plugin_loader.discover_modules()
@@ -48,10 +68,17 @@ class MainWindow(QMainWindow):
         self.projection_manager = None
         self.viewer_widget = None
         self.status_widget = None
+        self.segmentation_widget = None
+        self.save_widget = None
         self.modules_widgets = {}
+        self.module_hosts = {}
+        self.modules_layout = None
+        self.modules_scroll = None
+        self._segmentation_job = None
         
         self._setup_ui()
         self._setup_drag_drop()
+        self._setup_config_watcher()
         self._connect_signals()
         
         self.setWindowTitle("lung1122 - Medical Imaging Viewer")
@@ -76,6 +103,7 @@ class MainWindow(QMainWindow):
         # ЦЕНТР (проекции)
         self.projection_manager = ProjectionManager()
         self.projection_manager.set_dicom_loader(self.dicom_loader)
+        self.projection_manager.set_config_manager(self.config_manager)
         main_splitter.addWidget(self.projection_manager)
         
         # ПРАВАЯ ПАНЕЛЬ
@@ -108,6 +136,17 @@ class MainWindow(QMainWindow):
         exit_action.triggered.connect(self.close)
         file_menu.addAction(exit_action)
         
+        view_menu = menubar.addMenu("Вид")
+        
+        hud_action = QAction("Время кадра на проекциях", self)
+        hud_action.setCheckable(True)
+        hud_action.toggled.connect(self._on_hud_toggled)
+        view_menu.addAction(hud_action)
+        
+        perf_dump_action = QAction("Записать метрики в журнал", self)
+        perf_dump_action.triggered.connect(self._on_perf_dump)
+        view_menu.addAction(perf_dump_action)
+        
         mode_menu = menubar.addMenu("Режим")
         
         admin_action = QAction("Войти как Администратор", self)
@@ -117,6 +156,14 @@ class MainWindow(QMainWindow):
         user_action = QAction("Выйти из режима Администратора", self)
         user_action.triggered.connect(self._on_admin_logout)
         mode_menu.addAction(user_action)
+        
+        mode_menu.addSeparator()
+        
+        # Только для администратора (доступность - по роли)
+        self.analytics_action = QAction("Аналитика журналов...", self)
+        self.analytics_action.triggered.connect(self._on_log_analytics)
+        self.analytics_action.setEnabled(self.auth_manager.is_admin())
+        mode_menu.addAction(self.analytics_action)
     
     def _create_left_panel(self) -> QWidget:
         """Создание левой панели управления"""
@@ -126,23 +173,55 @@ class MainWindow(QMainWindow):
         self.viewer_widget = ViewerWidget()
         self.viewer_widget.set_dicom_loader(self.dicom_loader)
         self.viewer_widget.set_logger(self.logger)
+        self.viewer_widget.set_analysis_context(self.analysis_context)
         layout.addWidget(self.viewer_widget)
         
         layout.addStretch()
         return panel
     
     def _create_right_panel(self) -> QWidget:
-        """Создание правой панели (модули)"""
+        """Создание правой панели (сегментация, сохранение и модули, с прокруткой)"""
         panel = QWidget()
         layout = QVBoxLayout(panel)
         
-        self._load_visible_modules(layout)
+        # Неотключаемые блоки
+        self.segmentation_widget = SegmentationWidget()
+        self.segmentation_widget.set_config_manager(self.config_manager)
+        layout.addWidget(self.segmentation_widget)
+        
+        self.save_widget = SaveWidget()
+        self.save_widget.set_logger(self.logger)
+        self.save_widget.set_mask_data(None)
+        layout.addWidget(self.save_widget)
+        
+        # Подключаемые модули - в отдельном контейнере (позиции в _sync_modules)
+        modules_panel = QWidget()
+        modules_layout = QVBoxLayout(modules_panel)
+        modules_layout.setContentsMargins(0, 0, 0, 0)
+        self._load_visible_modules(modules_layout)
+        layout.addWidget(modules_panel)
         
         layout.addStretch()
-        return panel
+        
+        self.modules_scroll = QScrollArea()
+        self.modules_scroll.setWidgetResizable(True)
+        self.modules_scroll.setFrameShape(QFrame.NoFrame)
+        self.modules_scroll.setWidget(panel)
+        # Модуль, прокрученный в видимую область, получает отложенные данные
+        self.modules_scroll.verticalScrollBar().valueChanged.connect(self._activate_module_hosts)
+        return self.modules_scroll
     
     def _load_visible_modules(self, layout):
-        """Загружает видимые модули в layout"""
+        """Размещает панели видимых модулей (модули создаются при разворачивании)"""
+        self.modules_layout = layout
+        self._sync_modules()
+    
+    def _sync_modules(self):
+        """
+        Приводит панель модулей к конфигурации: создает недостающие
+        панели, расставляет видимые по порядку, скрывает невидимые
+        (без удаления)
+        """
         visible_modules = self.config_manager.get_visible_modules()
         
         sorted_modules = sorted(
@@ -151,35 +230,128 @@ class MainWindow(QMainWindow):
         )
         
         for module_id, config in sorted_modules:
+            host = self.module_hosts.get(module_id)
+            if host is None:
+                if module_id in self.plugin_loader.module_metadata:
+                    self._create_module_host(module_id, config)
+            else:
+                host.set_title(config.get('name', module_id))
+        
+        for host in self.module_hosts.values():
+            self.modules_layout.removeWidget(host)
+        
+        position = 0
+        for module_id, config in sorted_modules:
+            host = self.module_hosts.get(module_id)
+            if host:
+                self.modules_layout.insertWidget(position, host)
+                host.show()
+                position += 1
+        
+        for module_id, host in self.module_hosts.items():
+            if module_id not in visible_modules:
+                host.hide()
+    
+    def _create_module_host(self, module_id: str, config: dict) -> LazyModuleHost:
+        """Создает панель модуля (сам модуль - при первом разворачивании)"""
+        host = LazyModuleHost(module_id, config.get('name', module_id), self._create_module,
+                              expanded=config.get('expanded', False))
+        host.expanded_changed.connect(self.config_manager.set_module_expanded)
+        self.module_hosts[module_id] = host
+        
+        # Загруженные данные модуль получит, когда станет активным
+        if self.dicom_loader.get_volume() is not None:
+            host.set_data(self.dicom_loader)
+            host.set_slice_range(*self.viewer_widget.get_slice_range())
+        
+        return host
+    
+    def _create_module(self, module_id: str):
+        """Создает и инициализирует модуль (фабрика для LazyModuleHost)"""
+        with perf_monitor.stage(f'module.create.{module_id}'):
             module_widget = self.plugin_loader.instantiate_module(module_id, self)
             
             if module_widget:
                 module_widget.set_logger(self.logger)
                 module_widget.set_config_manager(self.config_manager)
+                module_widget.set_analysis_context(self.analysis_context)
                 module_widget.initialize()
                 
                 self.modules_widgets[module_id] = module_widget
-                layout.addWidget(module_widget)
+        
+        return module_widget
+    
+    def _activate_module_hosts(self):
+        """Передает отложенные данные модулям, ставшим видимыми"""
+        for host in self.module_hosts.values():
+            host.activate()
     
     def _register_discovered_modules(self):
         """Регистрирует обнаруженные модули в конфигурации"""
         available_modules = self.plugin_loader.get_available_modules()
         
-        for module_info in available_modules:
-            module_id = module_info['id']
-            
-            if module_id not in self.config_manager.get_modules():
-                self.config_manager.register_module(module_id, {
-                    'name': module_info['name'],
-                    'visible': True,
-                    'order': 999,
-                    'removable': module_info.get('removable', True)
-                })
+        # Одна запись конфигурации на все новые модули
+        with self.config_manager.batch():
+            for module_info in available_modules:
+                module_id = module_info['id']
+                
+                if module_id not in self.config_manager.get_modules():
+                    self.config_manager.register_module(module_id, {
+                        'name': module_info['name'],
+                        'visible': True,
+                        'order': 999,
+                        'removable': module_info.get('removable', True)
+                    })
     
     def _setup_drag_drop(self):
         """Настройка Drag & Drop для загрузки DICOM"""
         self.setAcceptDrops(True)
     
+    def _setup_config_watcher(self):
+        """Отслеживание изменений файла конфигурации (горячая перезагрузка)"""
+        self.config_watcher = QFileSystemWatcher(self)
+        
+        # Несколько событий подряд (запись, замена файла) - одно перечитывание
+        self._config_reload_timer = QTimer(self)
+        self._config_reload_timer.setSingleShot(True)
+        self._config_reload_timer.setInterval(self.CONFIG_RELOAD_DELAY_MS)
+        self._config_reload_timer.timeout.connect(self._reload_config)
+        
+        config_path = self.config_manager.config_path.resolve()
+        self.config_watcher.addPath(str(config_path))
+        # Атомарная замена файла видна как изменение папки
+        self.config_watcher.addPath(str(config_path.parent))
+        self.config_watcher.fileChanged.connect(lambda path: self._config_reload_timer.start())
+        self.config_watcher.directoryChanged.connect(lambda path: self._config_reload_timer.start())
+        
+        self.config_manager.add_listener(self._on_config_changed)
+    
+    def _reload_config(self):
+        """Перечитывает конфигурацию, если ее изменили извне"""
+        config_path = self.config_manager.config_path.resolve()
+        if not config_path.exists():
+            return
+        
+        # После замены файла наблюдение нужно восстановить
+        if str(config_path) not in self.config_watcher.files():
+            self.config_watcher.addPath(str(config_path))
+        
+        self.config_manager.reload_from_disk()
+    
+    def _on_config_changed(self, diff: dict):
+        """Применяет только изменившиеся разделы конфигурации"""
+        if 'modules' in diff:
+            self._sync_modules()
+        
+        layout_diff = diff.get('ui_layout', {})
+        if 'projection_order' in layout_diff:
+            order = layout_diff['projection_order'][1]
+            self.projection_manager.set_projection_order(
+                order or self.projection_manager.DEFAULT_PROJECTION_ORDER
+            )
+        
+        self.status_widget.set_status("Конфигурация обновлена")
+    
     def _connect_signals(self):
         """Подключение сигналов"""
         self.data_loaded.connect(self._on_data_loaded)
@@ -189,6 +361,33 @@ class MainWindow(QMainWindow):
         self.viewer_widget.window_level_changed.connect(
             self.projection_manager.set_window_level
         )
+        
+        # Рабочая область используется толстослойными проекциями
+        self.viewer_widget.slice_range_changed.connect(
+            self.projection_manager.set_slice_range
+        )
+        self.viewer_widget.slice_range_changed.connect(self._on_slice_range_changed)
+        
+        # Сегментация легких в фоновом потоке
+        self.segmentation_widget.segmentation_requested.connect(self._on_segmentation_requested)
+        self._segmentation_progress.connect(self._on_segmentation_progress)
+        self._segmentation_done.connect(self._on_segmentation_done)
+        
+        # Кино-режим
+        self.viewer_widget.cine_toggled.connect(self.projection_manager.set_cine_playing)
+        self.viewer_widget.cine_fps_changed.connect(self.projection_manager.set_cine_fps)
+        self.projection_manager.cine_fps_measured.connect(self.viewer_widget.update_cine_fps)
+        
+        # HU под курсором мыши
+        self.projection_manager.hu_probed.connect(self.viewer_widget.update_hu_value)
+    
+    def closeEvent(self, event):
+        """Закрытие окна: останавливаем кино-режим, дописываем журнал действий и конфигурацию"""
+        if self.projection_manager is not None:
+            self.projection_manager.shutdown()
+        self.config_manager.flush()
+        self.logger.close()
+        super().closeEvent(event)
     
     def dragEnterEvent(self, event: QDragEnterEvent):
         """Обработка перетаскивания"""
@@ -236,6 +435,9 @@ class MainWindow(QMainWindow):
         """Загрузка выбранной серии"""
         self.status_widget.set_status("Загрузка серии...")
         
+        # Расчеты по предыдущей серии больше не нужны
+        self._cancel_module_computations()
+        
         if self.dicom_loader.load_series(series_uid):
             self.logger.log_dicom_load(series_uid, series_uid)
             self.status_widget.set_status("Серия загружена. Готов к работе.")
@@ -247,15 +449,118 @@ class MainWindow(QMainWindow):
     
     def _on_data_loaded(self, loader):
         """Обработка загрузки новых данных"""
+        # Производные данные прежней серии больше не нужны
+        self._cancel_module_computations()
+        self.analysis_context.set_data_loader(loader)
+        
+        # Маска прежней серии
+        self.projection_manager.remove_overlay('segmentation')
+        self.save_widget.set_mask_data(None)
+        
         # Обновляем проекции
         self.projection_manager.update_views()
         
         # Обновляем ViewerWidget
         self.viewer_widget.update_from_data()
         
-        # Уведомляем модули
+        # Уведомляем модули: активные - сразу, остальные - при активации
+        for host in self.module_hosts.values():
+            host.set_data(loader)
+    
+    def _on_slice_range_changed(self, start_slice: int, end_slice: int):
+        """Рабочий диапазон срезов - модулям (неактивным - при активации)"""
+        for host in self.module_hosts.values():
+            host.set_slice_range(start_slice, end_slice)
+    
+    def _cancel_module_computations(self):
+        """Отменяет фоновые расчеты всех созданных модулей и сегментацию"""
         for module_widget in self.modules_widgets.values():
-            module_widget.on_data_loaded(loader)
+            module_widget.cancel_compute()
+        
+        if self._segmentation_job is not None:
+            self._segmentation_job.cancel()
+            self._segmentation_job = None
+            self.segmentation_widget.on_segmentation_cancelled()
+    
+    def _on_segmentation_requested(self, params: dict):
+        """Запуск сегментации легких на рабочем диапазоне срезов"""
+        volume = self.dicom_loader.get_volume()
+        if volume is None:
+            self.status_widget.set_status("Сегментация: загрузите данные")
+            self.segmentation_widget.on_segmentation_complete(False)
+            return
+        
+        if self._segmentation_job is not None:
+            self._segmentation_job.cancel()
+        
+        start_slice, end_slice = self.viewer_widget.get_slice_range()
+        self.status_widget.set_status(f"Сегментация: режим «{params.get('mode_name')}»...")
+        
+        parameters = {name: value for name, value in params.items()
+                      if name not in ('mode_id', 'mode_name')}
+        self.logger.log_segmentation_run(params.get('mode_name'), params.get('mode_id'),
+                                         parameters, start_slice, end_slice)
+        
+        job = None
+        
+        def progress(fraction: float):
+            self._segmentation_progress.emit(job, fraction)
+        
+        job = submit_compute(
+            segment_lungs, volume, start_slice, end_slice,
+            threshold=params.get('threshold', -500),
+            smooth=params.get('smooth', True),
+            refine=params.get('refine', False),
+            progress=progress,
+        )
+        
+        def done(future):
+            if future.cancelled():
+                return
+            error = future.exception()
+            self._segmentation_done.emit(job, None if error else future.result(), error)
+        
+        job.future.add_done_callback(done)
+        self._segmentation_job = job
+    
+    def _on_segmentation_progress(self, job, fraction: float):
+        if job is self._segmentation_job:
+            self.segmentation_widget.set_progress(fraction)
+    
+    def _on_segmentation_done(self, job, labels, error):
+        """Маска готова: наложение, сохранение и модули (пересчет по новой маске)"""
+        if job is not self._segmentation_job or job.is_cancelled:
+            return
+        self._segmentation_job = None
+        
+        if error is not None:
+            print(f"⚠️ Ошибка сегментации: {error}")
+            self.status_widget.set_status("Ошибка сегментации")
+            self.segmentation_widget.on_segmentation_complete(False)
+            return
+        
+        self.projection_manager.set_overlay('segmentation', labels, self.SEGMENTATION_COLORS)
+        self.save_widget.set_mask_data(labels)
+        self.analysis_context.put('lung_labels', labels)
+        self.analysis_context.put('lung_mask', labels > 0)
+        
+        voxels = int(np.count_nonzero(labels))
+        self.status_widget.set_status(f"Сегментация завершена: {voxels} вокселей легких")
+        self.segmentation_widget.on_segmentation_complete(True)
+        
+        # Модули, использующие маску легких, пересчитываются по новой версии
+        for host in self.module_hosts.values():
+            host.notify_product_changed('lung_labels')
+            host.notify_product_changed('lung_mask')
+    
+    def _on_hud_toggled(self, visible: bool):
+        """Показ/скрытие времени кадра"""
+        self.projection_manager.set_hud_visible(visible)
+    
+    def _on_perf_dump(self):
+        """Запись снимка метрик производительности в журнал"""
+        stages = perf_monitor.dump_to_logger(self.logger)
+        self.status_widget.set_status(f"Метрики записаны в журнал ({len(stages)} этапов)")
     
     def _on_admin_login(self):
         """Вход в режим администратора"""
@@ -278,4 +583,15 @@ class MainWindow(QMainWindow):
     
     def _on_role_changed(self, role: str):
         """Обработка изменения роли"""
-        pass
+        self.analytics_action.setEnabled(self.auth_manager.is_admin())
+    
+    def _on_log_analytics(self):
+        """Аналитика журналов действий (администратор)"""
+        from gui.dialogs import LogAnalyticsDialog
+        
+        if not self.auth_manager.is_admin():
+            return
+        
+        self.logger.flush()
+        dialog = LogAnalyticsDialog(self.logger.logs_dir, self)
+        dialog.exec_()
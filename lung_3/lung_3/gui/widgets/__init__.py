@@ -7,6 +7,10 @@ from .save_widget import SaveWidget
 from .admin_panel import AdminPanel
 from .projection_manager import ProjectionManager
 from .viewer_widget import ViewerWidget
+from .volume_view import VolumeRenderView
+from .module_host import LazyModuleHost
+from .histogram_widget import HistogramWidget
+from .mode_combo import ProcessingModeCombo
 
 __all__ = [
     'StatusWidget',
@@ -16,4 +20,8 @@ __all__ = [
     'AdminPanel',
     'ProjectionManager',
     'ViewerWidget',
+    'VolumeRenderView',
+    'LazyModuleHost',
+    'HistogramWidget',
+    'ProcessingModeCombo',
 ]
\ No newline at end of file
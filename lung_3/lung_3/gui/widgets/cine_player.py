@@ -0,0 +1,217 @@
+"""
+Кино-режим: воспроизведение срезов рабочей области с заданной частотой.
+Кадры готовятся заранее в фоновом потоке, частота кадров измеряется,
+при невозможности удержать целевой FPS уровень детализации понижается.
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+from PyQt5.QtCore import QObject, QTimer, Qt, pyqtSignal
+
+
+class CinePlayer(QObject):
+    """Воспроизведение срезов одной проекции"""
+
+    frame_shown = pyqtSignal(int)            # индекс показанного среза
+    fps_measured = pyqtSignal(float, int)    # достигнутый FPS, уровень детализации
+
+    MODES = ('loop', 'bounce')
+
+    PREFETCH_DEPTH = 8
+    MAX_LEVEL = 2
+    # Окно измерения и допуски для смены уровня детализации
+    MEASURE_FRAMES = 20
+    SLOW_RATIO = 1.25
+    FAST_RATIO = 0.5
+
+    def __init__(self, view, parent=None):
+        super().__init__(parent)
+        self.view = view
+
+        self.start_slice = 0
+        self.end_slice = 0
+        self.fps = 15
+        self.mode = 'loop'
+        self.level = 0
+
+        self._position = 0
+        self._direction = 1
+        self._prefetch = {}
+        self._frame_times = deque(maxlen=self.MEASURE_FRAMES)
+        self._busy_times = deque(maxlen=self.MEASURE_FRAMES)
+        self._last_frame_time = None
+
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cine")
+
+        self._timer = QTimer(self)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.timeout.connect(self._on_tick)
+
+    def is_playing(self) -> bool:
+        return self._timer.isActive()
+
+    def start(self, start_slice: int, end_slice: int, fps: int = 15, mode: str = 'loop'):
+        """
+        Запускает воспроизведение
+
+        Args:
+            start_slice, end_slice: Диапазон срезов (включительно)
+            fps: Целевая частота кадров
+            mode: 'loop' - по кругу, 'bounce' - туда и обратно
+        """
+        last = max(0, self.view.max_slices - 1)
+        self.start_slice = max(0, min(start_slice, last))
+        self.end_slice = max(self.start_slice, min(end_slice, last))
+        self.fps = max(1, fps)
+        self.mode = mode if mode in self.MODES else 'loop'
+        self.level = 0
+
+        current = self.view.current_slice
+        self._position = current if self.start_slice <= current <= self.end_slice else self.start_slice
+        self._direction = 1
+        self._reset_measurements()
+        self._prefetch.clear()
+
+        self._schedule_prefetch()
+        self._timer.start(int(round(1000 / self.fps)))
+
+    def stop(self, redraw: bool = True):
+        """
+        Останавливает воспроизведение
+
+        Args:
+            redraw: Перерисовать текущий кадр в полном разрешении
+                    (False - при смене данных: кадр прежней серии не нужен)
+        """
+        if not self._timer.isActive():
+            return
+        self._timer.stop()
+        for future in self._prefetch.values():
+            future.cancel()
+        self._prefetch.clear()
+        if redraw:
+            self.view.set_slice(self._position)
+
+    def shutdown(self):
+        """Останавливает воспроизведение и фоновые потоки подготовки кадров"""
+        self._timer.stop()
+        for future in self._prefetch.values():
+            future.cancel()
+        self._prefetch.clear()
+        self._executor.shutdown(wait=False)
+
+    def set_fps(self, fps: int):
+        """Меняет целевую частоту без остановки"""
+        self.fps = max(1, fps)
+        self._reset_measurements()
+        if self._timer.isActive():
+            self._timer.setInterval(int(round(1000 / self.fps)))
+
+    def _reset_measurements(self):
+        self._frame_times.clear()
+        self._busy_times.clear()
+        self._last_frame_time = None
+
+    def _upcoming(self, count: int) -> list:
+        """Индексы следующих кадров после текущего положения"""
+        indices = []
+        position, direction = self._position, self._direction
+        for _ in range(count):
+            position, direction = self._advance(position, direction)
+            indices.append(position)
+        return indices
+
+    def _advance(self, position: int, direction: int) -> tuple:
+        """Следующее положение с учетом режима воспроизведения"""
+        if self.start_slice == self.end_slice:
+            return self.start_slice, direction
+
+        position += direction
+        if self.mode == 'loop':
+            if position > self.end_slice:
+                position = self.start_slice
+        else:
+            if position > self.end_slice or position < self.start_slice:
+                direction = -direction
+                position += 2 * direction
+        return position, direction
+
+    def _can_prefetch(self) -> bool:
+        """Фоновая подготовка возможна только для обычного среза ортогональной проекции"""
+        return self.view.projection_mode == 'slice' and self.view.orientation != 'oblique'
+
+    def _frame_key(self, index: int) -> tuple:
+        return (index, self.level, self.view.window_center, self.view.window_width)
+
+    def _schedule_prefetch(self):
+        """Держит очередь подготовленных кадров впереди точки воспроизведения"""
+        if not self._can_prefetch():
+            return
+
+        upcoming = self._upcoming(self.PREFETCH_DEPTH)
+        wanted = {self._frame_key(index) for index in upcoming}
+
+        # Отбрасываем устаревшие кадры (пройденные, другой уровень или W/L)
+        for key in list(self._prefetch):
+            if key not in wanted:
+                self._prefetch.pop(key).cancel()
+
+        for index in upcoming:
+            key = self._frame_key(index)
+            if key not in self._prefetch:
+                self._prefetch[key] = self._executor.submit(
+                    self.view.render_frame, index, self.level, False
+                )
+
+    def _on_tick(self):
+        """Показ следующего кадра"""
+        tick_start = time.perf_counter()
+        self._position, self._direction = self._advance(self._position, self._direction)
+
+        future = self._prefetch.pop(self._frame_key(self._position), None)
+        if future is not None and future.done() and not future.cancelled():
+            frame = future.result()
+        else:
+            # Кадр не успел подготовиться - строим синхронно
+            if future is not None:
+                future.cancel()
+            frame = self.view.render_frame(self._position, self.level, False)
+
+        if frame is not None:
+            self.view.show_cine_frame(frame)
+            self.frame_shown.emit(self._position)
+
+        self._schedule_prefetch()
+        self._measure(time.perf_counter() - tick_start)
+
+    def _measure(self, busy_time: float):
+        """
+        Измеряет время кадра и подбирает уровень детализации
+
+        Args:
+            busy_time: Время работы GUI-потока на этом кадре
+        """
+        now = time.perf_counter()
+        if self._last_frame_time is not None:
+            self._frame_times.append(now - self._last_frame_time)
+            self._busy_times.append(busy_time)
+        self._last_frame_time = now
+
+        if len(self._frame_times) < self.MEASURE_FRAMES:
+            return
+
+        frame_time = sum(self._frame_times) / len(self._frame_times)
+        busy = sum(self._busy_times) / len(self._busy_times)
+        target = 1.0 / self.fps
+        self.fps_measured.emit(1.0 / frame_time, self.level)
+
+        if frame_time > target * self.SLOW_RATIO and self.level < self.MAX_LEVEL:
+            # Целевой FPS не удерживается - огрубляем кадры
+            self.level += 1
+            self._reset_measurements()
+        elif self.level > 0 and busy * 4 < target * self.FAST_RATIO:
+            # Уровень точнее стоит ~в 4 раза дороже - и все равно укладываемся
+            self.level -= 1
+            self._reset_measurements()
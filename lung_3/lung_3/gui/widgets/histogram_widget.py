@@ -0,0 +1,182 @@
+"""
+Гистограмма HU с окном Window/Level.
+Рисуется по готовой гистограмме целых HU (HUHistogram) без обращения
+к объему; окно W/L можно перетаскивать мышью.
+"""
+
+from typing import Optional
+
+import numpy as np
+
+from PyQt5.QtWidgets import QWidget, QSizePolicy
+from PyQt5.QtCore import Qt, pyqtSignal, QRectF
+from PyQt5.QtGui import QPainter, QColor, QPen, QMouseEvent
+
+from core.hu_statistics import HUHistogram
+
+
+class HistogramWidget(QWidget):
+    """
+    Гистограмма (логарифмическая шкала) с окном W/L
+
+    Перетаскивание внутри окна сдвигает центр, у границ окна - меняет
+    ширину, щелчок вне окна переносит центр в точку щелчка.
+    """
+
+    window_level_changed = pyqtSignal(int, int)  # center, width
+
+    # Диапазон HU, доступный для W/L
+    HU_MIN = -1024
+    HU_MAX = 3071
+    # Допуск захвата границы окна, пикселей
+    EDGE_TOLERANCE = 4
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimumHeight(80)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+        self.setMouseTracking(True)
+
+        self.histogram: Optional[HUHistogram] = None
+        self.center = 40
+        self.width_hu = 400
+
+        self._range = (self.HU_MIN, self.HU_MAX)
+        # Высоты столбцов по пикселям ширины (0..1), пересчитываются при смене данных/размера
+        self._columns = None
+        self._drag = None
+
+    # === ДАННЫЕ ===
+
+    def set_histogram(self, histogram: Optional[HUHistogram]):
+        """Новая гистограмма (объем или рабочий диапазон срезов)"""
+        self.histogram = histogram
+        if histogram is not None and histogram.count:
+            low = max(self.HU_MIN, int(np.floor(histogram.min)))
+            high = min(self.HU_MAX, int(np.ceil(histogram.max)))
+            self._range = (low, max(high, low + 1))
+        self._columns = None
+        self.update()
+
+    def set_window_level(self, center: int, width: int):
+        """Положение окна W/L (без сигнала)"""
+        self.center = center
+        self.width_hu = max(1, width)
+        self.update()
+
+    def _compute_columns(self) -> Optional[np.ndarray]:
+        """Сумма корзин на каждый пиксель ширины, логарифмическая нормировка"""
+        if self.histogram is None or not self.histogram.count or self.width() < 2:
+            return None
+
+        low, high = self._range
+        counts = self.histogram.counts
+        offset = self.histogram.offset
+
+        # Корзины диапазона [low, high] (вне гистограммы - нули)
+        values = np.zeros(high - low + 1, dtype=np.int64)
+        src_start = max(low, offset)
+        src_end = min(high, offset + counts.size - 1)
+        if src_start <= src_end:
+            values[src_start - low:src_end - low + 1] = counts[src_start - offset:src_end - offset + 1]
+
+        edges = np.linspace(0, values.size, self.width() + 1).astype(np.int64)
+        edges = np.minimum(edges[:-1], values.size - 1)
+        columns = np.log1p(np.add.reduceat(values, edges).astype(np.float64))
+        peak = columns.max()
+        return columns / peak if peak > 0 else columns
+
+    # === КООРДИНАТЫ ===
+
+    def _hu_to_x(self, hu: float) -> float:
+        low, high = self._range
+        return (hu - low) / (high - low) * self.width()
+
+    def _x_to_hu(self, x: float) -> float:
+        low, high = self._range
+        return low + x / max(1, self.width()) * (high - low)
+
+    # === ОТРИСОВКА ===
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._columns = None
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor(30, 30, 30))
+
+        if self._columns is None:
+            self._columns = self._compute_columns()
+
+        height = self.height()
+        if self._columns is not None:
+            painter.setPen(QPen(QColor(150, 150, 150)))
+            for x, value in enumerate(self._columns):
+                if value > 0:
+                    painter.drawLine(x, height, x, int(height - value * (height - 2)))
+
+        # Окно W/L
+        left = self._hu_to_x(self.center - self.width_hu / 2)
+        right = self._hu_to_x(self.center + self.width_hu / 2)
+        painter.fillRect(QRectF(left, 0, right - left, height), QColor(80, 160, 255, 50))
+        painter.setPen(QPen(QColor(80, 160, 255), 1))
+        painter.drawLine(int(left), 0, int(left), height)
+        painter.drawLine(int(right), 0, int(right), height)
+        painter.setPen(QPen(QColor(255, 200, 0), 1, Qt.DashLine))
+        center_x = int(self._hu_to_x(self.center))
+        painter.drawLine(center_x, 0, center_x, height)
+
+        painter.setPen(QColor(200, 200, 200))
+        low, high = self._range
+        painter.drawText(self.rect().adjusted(3, 2, -3, -2), Qt.AlignTop | Qt.AlignLeft, str(low))
+        painter.drawText(self.rect().adjusted(3, 2, -3, -2), Qt.AlignTop | Qt.AlignRight, str(high))
+
+    # === МЫШЬ ===
+
+    def _hit(self, x: float) -> str:
+        """Что под курсором: 'left'/'right' - граница окна, 'inside', 'outside'"""
+        left = self._hu_to_x(self.center - self.width_hu / 2)
+        right = self._hu_to_x(self.center + self.width_hu / 2)
+        if abs(x - left) <= self.EDGE_TOLERANCE:
+            return 'left'
+        if abs(x - right) <= self.EDGE_TOLERANCE:
+            return 'right'
+        return 'inside' if left < x < right else 'outside'
+
+    def mousePressEvent(self, event: QMouseEvent):
+        if event.button() != Qt.LeftButton:
+            return super().mousePressEvent(event)
+
+        hit = self._hit(event.x())
+        if hit == 'outside':
+            self._apply(int(round(self._x_to_hu(event.x()))), self.width_hu)
+            hit = 'inside'
+        self._drag = (hit, event.x(), self.center, self.width_hu)
+
+    def mouseMoveEvent(self, event: QMouseEvent):
+        if self._drag is None:
+            hit = self._hit(event.x())
+            self.setCursor(Qt.SizeHorCursor if hit in ('left', 'right') else Qt.ArrowCursor)
+            return
+
+        mode, start_x, center, width = self._drag
+        delta = self._x_to_hu(event.x()) - self._x_to_hu(start_x)
+        if mode == 'inside':
+            self._apply(int(round(center + delta)), width)
+        else:
+            # Граница тянется, центр на месте - ширина меняется вдвое быстрее
+            sign = 1 if mode == 'right' else -1
+            self._apply(center, int(round(width + 2 * sign * delta)))
+
+    def mouseReleaseEvent(self, event: QMouseEvent):
+        self._drag = None
+
+    def _apply(self, center: int, width: int):
+        """Новое окно в допустимых пределах и сигнал"""
+        center = min(max(center, self.HU_MIN), self.HU_MAX)
+        width = min(max(width, 1), self.HU_MAX - self.HU_MIN)
+        if (center, width) == (self.center, self.width_hu):
+            return
+        self.set_window_level(center, width)
+        self.window_level_changed.emit(center, width)
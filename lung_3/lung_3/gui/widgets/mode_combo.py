@@ -0,0 +1,47 @@
+"""
+Выпадающий список режимов обработки из конфигурации.
+Список обновляется при изменении режимов в файле конфигурации.
+"""
+
+from typing import Optional
+
+from PyQt5.QtWidgets import QComboBox
+
+
+class ProcessingModeCombo(QComboBox):
+    """Режимы обработки (processing_modes) с сохранением выбора при обновлении"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.config_manager = None
+
+    def set_config_manager(self, config_manager):
+        """Устанавливает менеджер конфигурации и подписывается на изменения режимов"""
+        if self.config_manager is not None:
+            self.config_manager.remove_listener(self._on_config_changed)
+        self.config_manager = config_manager
+        config_manager.add_listener(self._on_config_changed)
+        self.reload_modes()
+
+    def _on_config_changed(self, diff: dict):
+        """Режимы изменены в файле конфигурации - обновляем список"""
+        if 'processing_modes' in diff:
+            self.reload_modes()
+
+    def reload_modes(self):
+        """Загружает режимы из конфигурации (выбранный остается, если он есть в списке)"""
+        if self.config_manager is None:
+            return
+
+        current = self.current_mode()
+        current_id = current['id'] if current else None
+
+        self.clear()
+        for mode in self.config_manager.get_processing_modes():
+            self.addItem(mode['name'], mode)
+            if mode['id'] == current_id:
+                self.setCurrentIndex(self.count() - 1)
+
+    def current_mode(self) -> Optional[dict]:
+        """Выбранный режим {'id', 'name', 'parameters'} или None"""
+        return self.currentData()
@@ -0,0 +1,160 @@
+"""
+Сворачиваемая панель модуля с отложенным созданием.
+Модуль создается при первом разворачивании, а уведомления о данных
+для неактивного модуля (свернут или прокручен за край) откладываются
+до его активации.
+"""
+
+from typing import Callable, Optional
+
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QToolButton, QSizePolicy
+from PyQt5.QtCore import Qt, pyqtSignal
+
+
+class LazyModuleHost(QWidget):
+    """
+    Контейнер модуля правой панели
+
+    Заголовок-кнопка разворачивает/сворачивает панель. Экземпляр модуля
+    создается фабрикой при первом разворачивании. set_data() и
+    set_slice_range() и notify_product_changed() передают данные сразу
+    только активному модулю; для неактивного запоминается последнее
+    значение (более ранние заменяются) и передается при активации.
+    """
+
+    expanded_changed = pyqtSignal(str, bool)  # module_id, expanded
+
+    def __init__(self, module_id: str, title: str, factory: Callable[[str], Optional[QWidget]],
+                 expanded: bool = False, parent=None):
+        super().__init__(parent)
+        self.module_id = module_id
+        self.module = None
+
+        self._factory = factory
+        self._create_failed = False
+        # Отложенные данные (последние) для неактивного модуля
+        self._pending_data = None
+        self._has_pending = False
+        self._pending_range = None
+        self._pending_products = set()
+
+        self._setup_ui(title)
+        self.set_expanded(expanded, notify=False)
+
+    def _setup_ui(self, title: str):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(2)
+
+        self.header_btn = QToolButton()
+        self.header_btn.setText(title)
+        self.header_btn.setCheckable(True)
+        self.header_btn.setToolButtonStyle(Qt.ToolButtonTextBesideIcon)
+        self.header_btn.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+        self.header_btn.setStyleSheet("QToolButton { border: none; font-weight: bold; text-align: left; }")
+        self.header_btn.toggled.connect(self._on_header_toggled)
+        layout.addWidget(self.header_btn)
+
+        self.body = QWidget()
+        self.body_layout = QVBoxLayout(self.body)
+        self.body_layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.body)
+
+    def set_title(self, title: str):
+        """Обновляет заголовок панели"""
+        self.header_btn.setText(title)
+
+    def is_expanded(self) -> bool:
+        return self.header_btn.isChecked()
+
+    def set_expanded(self, expanded: bool, notify: bool = True):
+        """Разворачивает/сворачивает панель (модуль создается при первом разворачивании)"""
+        self.header_btn.blockSignals(True)
+        self.header_btn.setChecked(expanded)
+        self.header_btn.blockSignals(False)
+        self._apply_expanded(expanded)
+
+        if notify:
+            self.expanded_changed.emit(self.module_id, expanded)
+
+    def _on_header_toggled(self, expanded: bool):
+        self._apply_expanded(expanded)
+        self.expanded_changed.emit(self.module_id, expanded)
+
+    def _apply_expanded(self, expanded: bool):
+        self.header_btn.setArrowType(Qt.DownArrow if expanded else Qt.RightArrow)
+
+        if expanded and self.module is None:
+            self._create_module()
+
+        self.body.setVisible(expanded)
+        self.activate()
+
+    def _create_module(self):
+        """Создает модуль через фабрику (одна попытка)"""
+        if self._create_failed:
+            return
+
+        self.module = self._factory(self.module_id)
+        if self.module is None:
+            self._create_failed = True
+            return
+
+        self.body_layout.addWidget(self.module)
+
+    # === ДАННЫЕ ===
+
+    def is_active(self) -> bool:
+        """Модуль создан, панель развернута и видна хотя бы частично"""
+        return (self.module is not None and self.is_expanded() and self.isVisible()
+                and not self.body.visibleRegion().isEmpty())
+
+    def set_data(self, data):
+        """Передает данные модулю; для неактивного - откладывает (последние)"""
+        self._pending_data = data
+        self._has_pending = True
+        # Новые данные модуль прочитает целиком - уведомления о продуктах не нужны
+        self._pending_products.clear()
+        self.activate()
+
+    def set_slice_range(self, start_slice: int, end_slice: int):
+        """Передает модулю рабочий диапазон срезов (для неактивного - откладывает)"""
+        self._pending_range = (start_slice, end_slice)
+        self.activate()
+
+    def notify_product_changed(self, name: str):
+        """Сообщает модулю о замене продукта контекста анализа (неактивному - при активации)"""
+        if self.module is None or self._has_pending:
+            return
+        self._pending_products.add(name)
+        self.activate()
+
+    def activate(self):
+        """Передает отложенные данные, если модуль стал активным"""
+        if not self.is_active():
+            return
+        if not self._has_pending and self._pending_range is None and not self._pending_products:
+            return
+
+        if self._has_pending:
+            data = self._pending_data
+            self._pending_data = None
+            self._has_pending = False
+            self.module.on_data_loaded(data)
+
+        if self._pending_range is not None:
+            start_slice, end_slice = self._pending_range
+            self._pending_range = None
+            self.module.on_slice_range_changed(start_slice, end_slice)
+
+        for name in sorted(self._pending_products):
+            self.module.on_analysis_product_changed(name)
+        self._pending_products.clear()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.activate()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.activate()
@@ -3,16 +3,86 @@
 С слайдерами и Zoom/Pan для каждой проекции.
 """
 
-from PyQt5.QtWidgets import QWidget, QGridLayout, QLabel, QVBoxLayout, QSlider
-from PyQt5.QtCore import Qt, pyqtSignal, QPoint
-from PyQt5.QtGui import QPixmap, QImage, QPainter, QTransform, QWheelEvent, QMouseEvent
+from PyQt5.QtWidgets import (QWidget, QGridLayout, QLabel, QVBoxLayout, QHBoxLayout, QSlider,
+                             QComboBox, QSpinBox, QCheckBox, QTabWidget, QSizePolicy)
+from PyQt5.QtCore import Qt, pyqtSignal, QPoint, QPointF, QRectF
+from PyQt5.QtGui import (QPixmap, QImage, QPainter, QTransform, QWheelEvent, QMouseEvent,
+                         QPen, QColor)
+from collections import namedtuple
 import numpy as np
 
+from core.mpr import ObliqueReslicer
+from core.slab import SlabProjector
+from core.resampling import AspectResampler
+from core.overlay import OverlayCompositor, OverlayLayer, composite_argb32
+from core.perf import perf_monitor
+from gui.widgets.volume_view import VolumeRenderView
+from gui.widgets.cine_player import CinePlayer
+
+
+# Готовый к выводу кадр: buffer удерживает память, на которую ссылается image
+RenderedFrame = namedtuple('RenderedFrame', ['slice_index', 'level', 'image', 'buffer'])
+
+
+class ViewOverlay(QWidget):
+    """
+    Легкий слой поверх изображения: перекрестие и HU-зонд.
+    Перерисовывается отдельно, не затрагивая рендеринг среза.
+    """
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.setAttribute(Qt.WA_NoSystemBackground)
+        
+        self.crosshair = None   # QPointF в координатах слоя
+        self.probe_pos = None
+        self.probe_text = ""
+    
+    def paintEvent(self, event):
+        if self.crosshair is None and not self.probe_text:
+            return
+        
+        painter = QPainter(self)
+        
+        if self.crosshair is not None:
+            pen = QPen(QColor(255, 220, 0, 180))
+            pen.setStyle(Qt.DashLine)
+            painter.setPen(pen)
+            painter.drawLine(QPointF(0, self.crosshair.y()), QPointF(self.width(), self.crosshair.y()))
+            painter.drawLine(QPointF(self.crosshair.x(), 0), QPointF(self.crosshair.x(), self.height()))
+        
+        if self.probe_text and self.probe_pos is not None:
+            rect = QRectF(self.probe_pos.x() + 12, self.probe_pos.y() + 12, 170, 18)
+            painter.fillRect(rect, QColor(0, 0, 0, 160))
+            painter.setPen(QColor(255, 255, 255))
+            painter.drawText(rect, Qt.AlignLeft | Qt.AlignVCenter, " " + self.probe_text)
+        
+        painter.end()
+
 
 class ProjectionView(QWidget):
     """Виджет отображения одной проекции"""
     
     slice_changed = pyqtSignal(int)
+    hu_probed = pyqtSignal(float)
+    point_selected = pyqtSignal(int, int, int)  # z, y, x
+    
+    # Смещение мыши (пиксели), до которого нажатие считается кликом
+    CLICK_TOLERANCE = 3
+    
+    # Уровень пирамиды, используемый во время вращения косой плоскости
+    PREVIEW_LEVEL = 1
+    
+    # Этапы рендеринга, показываемые в HUD
+    HUD_STAGES = (
+        ('render.fetch', "срез"),
+        ('render.window_level', "W/L"),
+        ('render.qimage', "QImage"),
+        ('render.zoom', "zoom"),
+        ('render.set_pixmap', "вывод"),
+        ('render.total', "кадр"),
+    )
     
     def __init__(self, orientation: str, parent=None):
         super().__init__(parent)
@@ -21,6 +91,28 @@ class ProjectionView(QWidget):
         self.max_slices = 0
         self.image_data = None
         
+        # Размер вокселя (dz, dy, dx) в мм и приведение к квадратным пикселям
+        self.spacing = (1.0, 1.0, 1.0)
+        self.resampler = None
+        
+        # Наложение масок (общий компоновщик задается менеджером)
+        self.overlay_compositor = None
+        
+        # Косой срез (только для orientation == 'oblique')
+        self.reslicer = None
+        self.is_rotating = False
+        self.render_level = 0
+        
+        # Толстослойные проекции (MIP/MinIP/AvgIP)
+        self.slab_projector = None
+        self.projection_mode = 'slice'
+        self.slab_thickness = 10
+        self.slab_use_range = False
+        self.slice_range = None
+        
+        # Кино-режим (создается при первом запуске)
+        self.cine_player = None
+        
         # Window/Level
         self.window_center = 40
         self.window_width = 400
@@ -29,8 +121,17 @@ class ProjectionView(QWidget):
         self.zoom_factor = 1.0
         self.pan_offset = QPoint(0, 0)
         self.last_mouse_pos = None
+        self.press_pos = None
         self.is_panning = False
         
+        # Последний показанный кадр (для панорамирования и пересчета координат)
+        self._frame_pixmap = None
+        self._frame_level = 0
+        self.crosshair_voxel = None
+        
+        # Невидимая проекция не рендерится, перерисуем при показе
+        self._needs_render = False
+        
         self._setup_ui()
         self.setMouseTracking(True)
     
@@ -46,14 +147,33 @@ class ProjectionView(QWidget):
         self.title_label.setStyleSheet("font-weight: bold; background: #333; color: white; padding: 2px;")
         layout.addWidget(self.title_label)
         
+        # Режим проекции (для косого среза слой не поддерживается)
+        if self.orientation != 'oblique':
+            layout.addLayout(self._create_slab_controls())
+        
         # Область отображения
         self.image_label = QLabel()
         self.image_label.setMinimumSize(200, 200)
         self.image_label.setAlignment(Qt.AlignCenter)
         self.image_label.setStyleSheet("QLabel { background-color: black; border: 1px solid #555; }")
         self.image_label.setText(f"Нет данных")
+        # Размер области задает компоновка, а не размер картинки
+        self.image_label.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Ignored)
+        self.image_label.setMouseTracking(True)
         layout.addWidget(self.image_label)
         
+        self.view_overlay = ViewOverlay(self.image_label)
+        
+        # Время кадра (p50/p95), по умолчанию скрыто
+        self.hud_label = QLabel(self.image_label)
+        self.hud_label.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.hud_label.setStyleSheet(
+            "QLabel { background-color: rgba(0, 0, 0, 160); color: #0f0; "
+            "font-size: 10px; font-family: monospace; padding: 2px; border: none; }"
+        )
+        self.hud_label.move(4, 4)
+        self.hud_label.hide()
+        
         # Слайдер
         self.slice_slider = QSlider(Qt.Horizontal)
         self.slice_slider.setMinimum(0)
@@ -67,9 +187,65 @@ class ProjectionView(QWidget):
         self.info_label.setStyleSheet("font-size: 10px; color: #888;")
         layout.addWidget(self.info_label)
     
-    def set_data(self, volume: np.ndarray):
-        """Устанавливает 3D-объем для отображения"""
+    def _create_slab_controls(self) -> QHBoxLayout:
+        """Панель выбора режима толстослойной проекции"""
+        slab_layout = QHBoxLayout()
+        slab_layout.setSpacing(4)
+        
+        self.mode_combo = QComboBox()
+        self.mode_combo.addItem("Срез", 'slice')
+        self.mode_combo.addItem("MIP", 'mip')
+        self.mode_combo.addItem("MinIP", 'minip')
+        self.mode_combo.addItem("AvgIP", 'avgip')
+        self.mode_combo.currentIndexChanged.connect(self._on_slab_settings_changed)
+        slab_layout.addWidget(self.mode_combo)
+        
+        self.thickness_spinbox = QSpinBox()
+        self.thickness_spinbox.setRange(2, 200)
+        self.thickness_spinbox.setValue(self.slab_thickness)
+        self.thickness_spinbox.setSuffix(" ср.")
+        self.thickness_spinbox.setToolTip("Толщина слоя в срезах")
+        self.thickness_spinbox.valueChanged.connect(self._on_slab_settings_changed)
+        slab_layout.addWidget(self.thickness_spinbox)
+        
+        # Рабочая область задается по аксиальным срезам
+        self.range_checkbox = QCheckBox("Рабочая область")
+        self.range_checkbox.setToolTip("Слой по рабочей области вместо скользящего слоя")
+        self.range_checkbox.setVisible(self.orientation == 'axial')
+        self.range_checkbox.toggled.connect(self._on_slab_settings_changed)
+        slab_layout.addWidget(self.range_checkbox)
+        
+        return slab_layout
+    
+    def _on_slab_settings_changed(self, *args):
+        """Обработка изменения параметров толстослойной проекции"""
+        self.projection_mode = self.mode_combo.currentData()
+        self.slab_thickness = self.thickness_spinbox.value()
+        self.slab_use_range = self.range_checkbox.isChecked()
+        self.update_display()
+    
+    def set_slice_range(self, start: int, end: int):
+        """Устанавливает рабочую область (аксиальные срезы)"""
+        self.slice_range = (start, end)
+        if self.projection_mode != 'slice' and self.slab_use_range:
+            self.update_display()
+    
+    def set_data(self, volume: np.ndarray, spacing: tuple = None):
+        """
+        Устанавливает 3D-объем для отображения
+        
+        Args:
+            volume: 3D-объем (z, y, x)
+            spacing: Размер вокселя (dz, dy, dx) в мм
+        """
+        # Кадры, предвыбранные кино-режимом, относятся к прежней серии
+        self.stop_cine(redraw=False)
+        
         self.image_data = volume
+        if spacing is not None:
+            self.spacing = spacing
+        self.slab_projector = SlabProjector(volume) if self.orientation != 'oblique' else None
+        self.resampler = self._create_resampler()
         
         if self.orientation == 'axial':
             self.max_slices = volume.shape[0]
@@ -80,26 +256,109 @@ class ProjectionView(QWidget):
         elif self.orientation == 'coronal':
             self.max_slices = volume.shape[1]
             self.current_slice = volume.shape[1] // 2
+        elif self.orientation == 'oblique':
+            self.reslicer = ObliqueReslicer(volume, self.spacing)
+            self.max_slices = self.reslicer.num_positions
+            self.current_slice = self.max_slices // 2
         
         self.slice_slider.setMaximum(self.max_slices - 1)
         self.slice_slider.setValue(self.current_slice)
         self.update_display()
     
+    def _create_resampler(self):
+        """Пересэмплирование для физически верных пропорций среза"""
+        dz, dy, dx = self.spacing
+        row_col_spacing = {
+            'axial': (dy, dx),
+            'sagittal': (dz, dy),
+            'coronal': (dz, dx),
+        }
+        if self.orientation not in row_col_spacing:
+            # Косой срез строится сразу в миллиметрах
+            return None
+        return AspectResampler(*row_col_spacing[self.orientation])
+    
+    def set_overlay_compositor(self, compositor: OverlayCompositor):
+        """Устанавливает компоновщик слоев масок"""
+        self.overlay_compositor = compositor
+    
+    def _get_overlay(self, slice_index: int):
+        """RGBA-слой масок для среза (только в режиме среза)"""
+        if (self.overlay_compositor is None or not self.overlay_compositor.has_layers()
+                or self.projection_mode != 'slice' or self.orientation == 'oblique'):
+            return None
+        
+        transform = None
+        if self.resampler is not None and not self.resampler.is_identity:
+            transform = self.resampler.resample
+        
+        return self.overlay_compositor.get_overlay(self.orientation, slice_index, transform)
+    
+    def _get_display_key(self, slice_index: int) -> tuple:
+        """Ключ кэша отображаемого среза"""
+        key = (self.projection_mode, slice_index)
+        if self.projection_mode != 'slice':
+            key += (self.slab_thickness, self.slab_use_range, self.slice_range)
+        return key
+    
     def get_current_slice_data(self) -> np.ndarray:
         """Возвращает текущий срез"""
+        return self.get_slice_data(self.current_slice)
+    
+    def get_slice_data(self, slice_index: int, level: int = 0) -> np.ndarray:
+        """
+        Возвращает срез (или толстослойную проекцию) с заданным индексом
+        
+        Args:
+            slice_index: Индекс среза
+            level: Уровень пирамиды (используется косым срезом)
+        """
         if self.image_data is None:
             return None
         
+        if self.projection_mode != 'slice' and self.slab_projector is not None:
+            return self._get_slab_data(slice_index)
+        
         try:
             if self.orientation == 'axial':
-                return self.image_data[self.current_slice, :, :]
+                return self.image_data[slice_index, :, :]
             elif self.orientation == 'sagittal':
-                return self.image_data[:, :, self.current_slice]
+                return self.image_data[:, :, slice_index]
             elif self.orientation == 'coronal':
-                return self.image_data[:, self.current_slice, :]
+                return self.image_data[:, slice_index, :]
+            elif self.orientation == 'oblique':
+                return self._get_oblique_slice(slice_index, level)
         except IndexError:
             return None
     
+    def _get_slab_data(self, slice_index: int) -> np.ndarray:
+        """Возвращает толстослойную проекцию для заданного положения"""
+        if self.slab_use_range and self.orientation == 'axial' and self.slice_range:
+            start, end = self.slice_range
+            return self.slab_projector.get_range_slab(self.orientation, start, end,
+                                                      self.projection_mode)
+        
+        return self.slab_projector.get_sliding_slab(self.orientation, slice_index,
+                                                    self.slab_thickness, self.projection_mode)
+    
+    def _get_oblique_slice(self, slice_index: int, level: int) -> np.ndarray:
+        """Строит косой срез только для видимой области экрана"""
+        if self.reslicer is None:
+            return None
+        
+        out_shape = (max(1, self.image_label.height()), max(1, self.image_label.width()))
+        pixel_size = self.reslicer.step / self.zoom_factor
+        
+        return self.reslicer.reslice(slice_index, out_shape,
+                                     pixel_size=pixel_size, level=level)
+    
+    def _get_display_scale(self, level: int) -> float:
+        """Масштаб перевода изображения в пиксели экрана"""
+        if self.orientation == 'oblique':
+            # Косой срез уже выбран в масштабе экрана, растягиваем только превью
+            return float(2 ** level)
+        return self.zoom_factor * 2 ** level
+    
     def set_slice(self, slice_idx: int):
         """Устанавливает текущий срез"""
         if 0 <= slice_idx < self.max_slices:
@@ -113,39 +372,292 @@ class ProjectionView(QWidget):
         self.update_display()
         self.slice_changed.emit(value)
     
+    def start_cine(self, start_slice: int, end_slice: int, fps: int = 15, mode: str = 'loop'):
+        """Запускает кино-режим по диапазону срезов"""
+        if self.image_data is None:
+            return None
+        
+        if self.cine_player is None:
+            self.cine_player = CinePlayer(self, self)
+        self.cine_player.start(start_slice, end_slice, fps, mode)
+        return self.cine_player
+    
+    def stop_cine(self, redraw: bool = True):
+        """Останавливает кино-режим"""
+        if self.cine_player is not None:
+            self.cine_player.stop(redraw)
+    
+    def is_cine_playing(self) -> bool:
+        return self.cine_player is not None and self.cine_player.is_playing()
+    
+    def shutdown_cine(self):
+        """Освобождает потоки кино-режима (при закрытии приложения)"""
+        if self.cine_player is not None:
+            self.cine_player.shutdown()
+    
+    def show_cine_frame(self, frame: "RenderedFrame"):
+        """Показ кадра кино-режима без повторного рендеринга"""
+        self.current_slice = frame.slice_index
+        self.slice_slider.blockSignals(True)
+        self.slice_slider.setValue(frame.slice_index)
+        self.slice_slider.blockSignals(False)
+        self.show_frame(frame)
+        self._update_hud()
+    
     def set_window_level(self, center: int, width: int):
         """Устанавливает Window/Level"""
         self.window_center = center
         self.window_width = width
         self.update_display()
     
+    def _is_on_screen(self) -> bool:
+        """Проекция видна и имеет ненулевую область отображения"""
+        # Размер самой проекции: image_label имеет минимальный размер и не
+        # сжимается, даже когда разделитель свел проекцию к нулю
+        return (self.isVisible() and self.width() > 0 and self.height() > 0
+                and not self.visibleRegion().isEmpty())
+    
     def update_display(self):
-        """Обновляет отображение"""
-        slice_data = self.get_current_slice_data()
+        """Обновляет отображение (для невидимой проекции - откладывает)"""
+        if self.image_data is None:
+            return
         
-        if slice_data is None:
+        if not self._is_on_screen():
+            self._needs_render = True
             return
+        self._needs_render = False
         
-        # Применяем Window/Level
-        img_normalized = self._apply_window_level(slice_data)
+        with perf_monitor.stage('render.total'):
+            frame = self.render_frame(self.current_slice, self.render_level)
+            
+            if frame is None:
+                return
+            
+            self.show_frame(frame)
+        
+        self._update_hud()
+    
+    def set_hud_visible(self, visible: bool):
+        """Показывает/скрывает время кадра поверх изображения"""
+        self.hud_label.setVisible(visible)
+        self._update_hud()
+    
+    def _update_hud(self):
+        """Обновляет текст HUD (только если он включен)"""
+        # isHidden(), а не isVisible(): HUD скрытой вкладки тоже обновляется,
+        # иначе при возврате на вкладку показывается устаревший текст
+        if self.hud_label.isHidden():
+            return
+        
+        lines = []
+        for stage, title in self.HUD_STAGES:
+            stats = perf_monitor.get_stats(stage)
+            if stats is not None:
+                lines.append(f"{title:<7}{stats['p50_ms']:7.1f}{stats['p95_ms']:7.1f}")
+        
+        header = f"{'мс':<7}{'p50':>7}{'p95':>7}"
+        self.hud_label.setText("\n".join([header] + lines))
+        self.hud_label.adjustSize()
+    
+    def render_frame(self, slice_index: int, level: int = 0, use_cache: bool = True):
+        """
+        Строит кадр без вывода на экран
         
-        # Конвертируем в QPixmap
-        height, width = img_normalized.shape
-        bytes_per_line = width
-        q_img = QImage(img_normalized.data, width, height, bytes_per_line, QImage.Format_Grayscale8)
+        В режиме среза ортогональной проекции может вызываться из фонового
+        потока (с use_cache=False) - так кино-режим готовит кадры заранее.
         
-        pixmap = QPixmap.fromImage(q_img)
+        Args:
+            slice_index: Индекс среза
+            level: Уровень детализации (0 - полное разрешение)
+            use_cache: Использовать кэш пересэмплированных срезов
         
+        Returns:
+            RenderedFrame или None
+        """
+        with perf_monitor.stage('render.fetch'):
+            slice_data = self.get_slice_data(slice_index, level)
+            
+            if slice_data is None:
+                return None
+            
+            # Учитываем размер вокселя (кэш по положению среза)
+            if self.resampler is not None:
+                key = self._get_display_key(slice_index) if use_cache else None
+                slice_data = self.resampler.resample(slice_data, key)
+            
+            overlay = self._get_overlay(slice_index)
+            
+            # Грубый уровень для ортогональных проекций - прореживание среза
+            step = 2 ** level if self.orientation != 'oblique' else 1
+            if step > 1:
+                slice_data = slice_data[::step, ::step]
+                if overlay is not None:
+                    overlay = tuple(part[::step, ::step] for part in overlay)
+        
+        # Применяем Window/Level
+        with perf_monitor.stage('render.window_level'):
+            img_normalized = self._apply_window_level(slice_data)
+        
+        # Конвертируем в QImage (с наложением масок при наличии)
+        with perf_monitor.stage('render.qimage'):
+            height, width = img_normalized.shape
+            if overlay is not None:
+                buffer = composite_argb32(img_normalized, overlay)
+                q_img = QImage(buffer.data, width, height, 4 * width, QImage.Format_ARGB32)
+            else:
+                buffer = img_normalized
+                bytes_per_line = width
+                q_img = QImage(buffer.data, width, height, bytes_per_line, QImage.Format_Grayscale8)
+        
+        return RenderedFrame(slice_index, level, q_img, buffer)
+    
+    def show_frame(self, frame: "RenderedFrame"):
+        """Выводит готовый кадр на экран"""
         # Применяем zoom
-        if self.zoom_factor != 1.0:
-            transform = QTransform()
-            transform.scale(self.zoom_factor, self.zoom_factor)
-            pixmap = pixmap.transformed(transform, Qt.SmoothTransformation)
+        with perf_monitor.stage('render.zoom'):
+            pixmap = QPixmap.fromImage(frame.image)
+            
+            scale = self._get_display_scale(frame.level)
+            if scale != 1.0:
+                transform = QTransform()
+                transform.scale(scale, scale)
+                pixmap = pixmap.transformed(transform, Qt.SmoothTransformation)
         
-        self.image_label.setPixmap(pixmap)
+        self._frame_pixmap = pixmap
+        self._frame_level = frame.level
+        with perf_monitor.stage('render.set_pixmap'):
+            self._present()
         
         # Обновляем инфо
-        self.info_label.setText(f"Срез: {self.current_slice + 1} / {self.max_slices}")
+        info = f"Срез: {frame.slice_index + 1} / {self.max_slices}"
+        if self.projection_mode != 'slice':
+            info = f"{self.mode_combo.currentText()} | {info}"
+        self.info_label.setText(info)
+    
+    def _image_origin(self) -> QPoint:
+        """Левый верхний угол изображения в координатах image_label (с учетом pan)"""
+        rect = self.image_label.contentsRect()
+        return QPoint(
+            rect.x() + (rect.width() - self._frame_pixmap.width()) // 2 + self.pan_offset.x(),
+            rect.y() + (rect.height() - self._frame_pixmap.height()) // 2 + self.pan_offset.y()
+        )
+    
+    def _present(self):
+        """Размещает готовое изображение со смещением pan (без повторного рендеринга)"""
+        if self._frame_pixmap is None:
+            return
+        
+        rect = self.image_label.contentsRect()
+        canvas = QPixmap(rect.size())
+        canvas.fill(Qt.black)
+        
+        painter = QPainter(canvas)
+        painter.drawPixmap(self._image_origin() - rect.topLeft(), self._frame_pixmap)
+        painter.end()
+        
+        self.image_label.setPixmap(canvas)
+        self.view_overlay.setGeometry(self.image_label.rect())
+        self._update_crosshair()
+    
+    def _pixels_per_display_pixel(self) -> float:
+        """Пикселей экрана на пиксель изображения полного разрешения"""
+        return self._get_display_scale(self._frame_level) / 2 ** self._frame_level
+    
+    def _label_to_voxel(self, label_pos: QPoint):
+        """
+        Переводит точку image_label в индексы вокселя (z, y, x)
+        
+        Returns:
+            (z, y, x) или None, если точка вне объема
+        """
+        if self._frame_pixmap is None or self.image_data is None:
+            return None
+        
+        origin = self._image_origin()
+        scale = self._pixels_per_display_pixel()
+        row = (label_pos.y() - origin.y()) / scale
+        col = (label_pos.x() - origin.x()) / scale
+        
+        if self.orientation == 'oblique':
+            voxel = self._oblique_to_voxel(row, col)
+        else:
+            if row < 0 or col < 0:
+                return None
+            if self.resampler is not None and not self.resampler.is_identity:
+                row = row / self.resampler.row_scale
+            row, col = int(row), int(col)
+            
+            if self.orientation == 'axial':
+                voxel = (self.current_slice, row, col)
+            elif self.orientation == 'sagittal':
+                voxel = (row, col, self.current_slice)
+            else:
+                voxel = (row, self.current_slice, col)
+        
+        if voxel is None or not all(0 <= v < n for v, n in zip(voxel, self.image_data.shape)):
+            return None
+        return voxel
+    
+    def _oblique_to_voxel(self, row: float, col: float):
+        """Точка косого среза (пиксели экрана от угла изображения) -> воксель"""
+        if self.reslicer is None:
+            return None
+        
+        half_h = self._frame_pixmap.height() / 2
+        half_w = self._frame_pixmap.width() / 2
+        pixel_mm = self.reslicer.step / self.zoom_factor
+        
+        normal, row_axis, col_axis = self.reslicer.get_axes()
+        point = (self.reslicer.center
+                 + normal * self.reslicer.position_to_offset(self.current_slice)
+                 + row_axis * (row - half_h) * pixel_mm
+                 + col_axis * (col - half_w) * pixel_mm)
+        return tuple(int(round(v)) for v in point / self.reslicer.spacing)
+    
+    def _voxel_to_label(self, voxel) -> QPointF:
+        """Переводит воксель в точку image_label (только ортогональные проекции)"""
+        z, y, x = voxel
+        if self.orientation == 'axial':
+            row, col = y, x
+        elif self.orientation == 'sagittal':
+            row, col = z, y
+        else:
+            row, col = z, x
+        
+        if self.resampler is not None and not self.resampler.is_identity:
+            row = row * self.resampler.row_scale
+        
+        origin = self._image_origin()
+        scale = self._pixels_per_display_pixel()
+        return QPointF(origin.x() + (col + 0.5) * scale, origin.y() + (row + 0.5) * scale)
+    
+    def set_crosshair(self, voxel):
+        """Устанавливает перекрестие в точку (z, y, x) или убирает его (None)"""
+        self.crosshair_voxel = voxel
+        self._update_crosshair()
+    
+    def _update_crosshair(self):
+        """Пересчитывает положение перекрестия на слое"""
+        if self.crosshair_voxel is None or self._frame_pixmap is None or self.orientation == 'oblique':
+            self.view_overlay.crosshair = None
+        else:
+            self.view_overlay.crosshair = self._voxel_to_label(self.crosshair_voxel)
+        self.view_overlay.update()
+    
+    def _update_probe(self, pos: QPoint):
+        """HU под курсором: чтение одного вокселя и перерисовка только слоя"""
+        label_pos = self.image_label.mapFrom(self, pos)
+        voxel = self._label_to_voxel(label_pos)
+        
+        if voxel is None:
+            self.view_overlay.probe_text = ""
+        else:
+            hu_value = float(self.image_data[voxel])
+            self.view_overlay.probe_pos = label_pos
+            self.view_overlay.probe_text = f"HU: {hu_value:.0f}  [{voxel[0]}, {voxel[1]}, {voxel[2]}]"
+            self.hu_probed.emit(hu_value)
+        
+        self.view_overlay.update()
     
     def _apply_window_level(self, data: np.ndarray) -> np.ndarray:
         """Применяет Window/Level к данным"""
@@ -178,37 +690,82 @@ class ProjectionView(QWidget):
                 self.set_slice(self.current_slice - 1)
     
     def mousePressEvent(self, event: QMouseEvent):
-        """Начало панорамирования"""
+        """Начало панорамирования / вращения косой плоскости"""
         if event.button() == Qt.LeftButton:
             self.is_panning = True
             self.last_mouse_pos = event.pos()
+            self.press_pos = event.pos()
             self.setCursor(Qt.ClosedHandCursor)
+        elif event.button() == Qt.RightButton and self.reslicer is not None:
+            # Во время вращения рисуем грубый уровень пирамиды
+            self.is_rotating = True
+            self.render_level = self.PREVIEW_LEVEL
+            self.last_mouse_pos = event.pos()
+            self.setCursor(Qt.SizeAllCursor)
     
     def mouseMoveEvent(self, event: QMouseEvent):
-        """Панорамирование"""
-        if self.is_panning and self.last_mouse_pos:
+        """Панорамирование / вращение косой плоскости / HU-зонд"""
+        if self.is_rotating and self.last_mouse_pos:
+            delta = event.pos() - self.last_mouse_pos
+            self.last_mouse_pos = event.pos()
+            self.reslicer.rotate(delta.x() * 0.01, delta.y() * 0.01)
+            self.update_display()
+        elif self.is_panning and self.last_mouse_pos:
             delta = event.pos() - self.last_mouse_pos
             self.pan_offset += delta
             self.last_mouse_pos = event.pos()
-            # TODO: реализовать отрисовку со смещением
+            self._present()
+        else:
+            self._update_probe(event.pos())
     
     def mouseReleaseEvent(self, event: QMouseEvent):
-        """Конец панорамирования"""
+        """Конец панорамирования / вращения, клик - выбор точки"""
         if event.button() == Qt.LeftButton:
             self.is_panning = False
             self.setCursor(Qt.ArrowCursor)
+            
+            if self.press_pos is not None and \
+                    (event.pos() - self.press_pos).manhattanLength() <= self.CLICK_TOLERANCE:
+                # Клик без перетаскивания: отменяем микросдвиг и выбираем точку
+                self.pan_offset -= event.pos() - self.press_pos
+                self._present()
+                voxel = self._label_to_voxel(self.image_label.mapFrom(self, event.pos()))
+                if voxel is not None:
+                    self.set_crosshair(voxel)
+                    self.point_selected.emit(*voxel)
+            self.press_pos = None
+        elif event.button() == Qt.RightButton and self.is_rotating:
+            # Плоскость отпущена - перерисовываем в полном разрешении
+            self.is_rotating = False
+            self.render_level = 0
+            self.setCursor(Qt.ArrowCursor)
+            self.update_display()
     
     def mouseDoubleClickEvent(self, event: QMouseEvent):
-        """Двойной клик - сброс zoom"""
+        """Двойной клик - сброс zoom (и поворота косой плоскости)"""
         if event.button() == Qt.LeftButton:
             self.zoom_factor = 1.0
             self.pan_offset = QPoint(0, 0)
+            if self.reslicer is not None:
+                self.reslicer.reset()
+            self.update_display()
+    
+    def leaveEvent(self, event):
+        """Курсор ушел - скрываем HU-зонд"""
+        super().leaveEvent(event)
+        self.view_overlay.probe_text = ""
+        self.view_overlay.update()
+    
+    def showEvent(self, event):
+        """Отложенный рендеринг при показе"""
+        super().showEvent(event)
+        if self._needs_render:
             self.update_display()
     
     def resizeEvent(self, event):
         """Обновляем отображение при изменении размера"""
         super().resizeEvent(event)
-        if self.image_label.pixmap():
+        if self.image_label.pixmap() or self._needs_render:
             self.update_display()
 
 
@@ -218,10 +775,26 @@ class ProjectionManager(QWidget):
     Динамическая компоновка - легко добавлять/удалять проекции.
     """
     
+    cine_fps_measured = pyqtSignal(float, int)  # достигнутый FPS, уровень детализации
+    hu_probed = pyqtSignal(float)
+    
+    # Порядок по умолчанию; 'oblique' - ячейка с вкладками MPR и 3D
+    DEFAULT_PROJECTION_ORDER = ['axial', 'sagittal', 'coronal', 'oblique']
+    KNOWN_PROJECTIONS = ('axial', 'sagittal', 'coronal', 'oblique')
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         self.dicom_loader = None
+        self.config_manager = None
         self.projections = {}
+        self.projection_order = []
+        self.slice_range = None
+        self.overlay_compositor = OverlayCompositor()
+        
+        # Ячейки сетки: проекция или вкладки MPR/3D
+        self.cells = {}
+        self.extra_tabs = None
+        self.volume_view = None
         
         self._setup_ui()
     
@@ -231,28 +804,98 @@ class ProjectionManager(QWidget):
         layout.setSpacing(5)
         layout.setContentsMargins(0, 0, 0, 0)
         
-        # Создаем 3 стандартные проекции
-        self._create_projection('axial', 0, 0)
-        self._create_projection('sagittal', 0, 1)
-        self._create_projection('coronal', 1, 0)
-        
-        # Резервное место для 4-й проекции
-        placeholder = QLabel("Резерв для\n3D / 4-й проекции")
-        placeholder.setAlignment(Qt.AlignCenter)
-        placeholder.setStyleSheet("""
-            QLabel {
-                background-color: #1a1a1a;
-                color: #666;
-                border: 2px dashed #444;
-            }
-        """)
-        layout.addWidget(placeholder, 1, 1)
-    
-    def _create_projection(self, orientation: str, row: int, col: int):
+        self.set_projection_order(self.DEFAULT_PROJECTION_ORDER)
+    
+    def set_config_manager(self, config_manager):
+        """Устанавливает менеджер конфигурации и применяет компоновку из ui_layout"""
+        self.config_manager = config_manager
+        order = config_manager.get_ui_layout().get('projection_order')
+        self.set_projection_order(order or self.DEFAULT_PROJECTION_ORDER)
+    
+    def set_projection_order(self, order: list):
+        """
+        Строит сетку проекций в заданном порядке
+        
+        Недостающие проекции создаются, отсутствующие в списке скрываются
+        (и не рендерятся). Сетка: 1 проекция - одна ячейка, 2 - в ряд,
+        3-4 - 2x2.
+        """
+        order = [name for name in dict.fromkeys(order) if name in self.KNOWN_PROJECTIONS]
+        if not order:
+            print("⚠️ Пустой порядок проекций, используется порядок по умолчанию")
+            order = list(self.DEFAULT_PROJECTION_ORDER)
+        
+        layout = self.layout()
+        for cell in self.cells.values():
+            layout.removeWidget(cell)
+        
+        columns = 1 if len(order) == 1 else 2
+        for position, name in enumerate(order):
+            cell = self.cells.get(name) or self._create_cell(name)
+            layout.addWidget(cell, position // columns, position % columns)
+            cell.show()
+        
+        for name, cell in self.cells.items():
+            if name not in order:
+                if name in self.projections:
+                    self.projections[name].stop_cine()
+                cell.hide()
+        
+        self.projection_order = order
+    
+    def _create_cell(self, name: str) -> QWidget:
+        """Создает ячейку сетки (с данными, если объем уже загружен)"""
+        if name == 'oblique':
+            # Косой срез (MPR) и объемный рендеринг (3D),
+            # правая кнопка мыши - вращение плоскости / камеры
+            self.extra_tabs = QTabWidget()
+            
+            oblique = self._create_projection('oblique')
+            self.extra_tabs.addTab(oblique, "MPR")
+            
+            self.volume_view = VolumeRenderView(self)
+            self.extra_tabs.addTab(self.volume_view, "3D")
+            cell = self.extra_tabs
+        else:
+            cell = self._create_projection(name)
+        
+        self.cells[name] = cell
+        
+        if self.dicom_loader is not None and self.dicom_loader.get_volume() is not None:
+            volume = self.dicom_loader.get_volume()
+            spacing = self.dicom_loader.get_spacing()
+            self.projections[name].set_data(volume, spacing)
+            if self.slice_range:
+                self.projections[name].set_slice_range(*self.slice_range)
+            if name == 'oblique':
+                self.volume_view.set_data(volume, spacing)
+        
+        return cell
+    
+    def _create_projection(self, orientation: str) -> ProjectionView:
         """Создает виджет проекции"""
         projection = ProjectionView(orientation, self)
+        self._connect_projection(projection)
         self.projections[orientation] = projection
-        self.layout().addWidget(projection, row, col)
+        return projection
+    
+    def _connect_projection(self, projection: ProjectionView):
+        """Общие подключения проекции: маски, HU-зонд, связанное перекрестие"""
+        projection.set_overlay_compositor(self.overlay_compositor)
+        projection.hu_probed.connect(self.hu_probed)
+        projection.point_selected.connect(self._on_point_selected)
+    
+    def _on_point_selected(self, z: int, y: int, x: int):
+        """Клик в одной проекции - синхронизация остальных по перекрестию"""
+        slice_by_orientation = {'axial': z, 'sagittal': x, 'coronal': y}
+        source = self.sender()
+        
+        for orientation, projection in self.projections.items():
+            if orientation not in slice_by_orientation:
+                continue
+            if projection is not source:
+                projection.set_slice(slice_by_orientation[orientation])
+            projection.set_crosshair((z, y, x))
     
     def set_dicom_loader(self, loader):
         """Устанавливает загрузчик DICOM"""
@@ -264,23 +907,112 @@ class ProjectionManager(QWidget):
             return
         
         volume = self.dicom_loader.get_volume()
+        spacing = self.dicom_loader.get_spacing()
         
         for projection in self.projections.values():
-            projection.set_data(volume)
+            projection.set_data(volume, spacing)
+        
+        if self.volume_view is not None:
+            self.volume_view.set_data(volume, spacing)
+    
+    def set_slice_range(self, start: int, end: int):
+        """Передает рабочую область во все проекции (для толстослойных режимов)"""
+        self.slice_range = (start, end)
+        for projection in self.projections.values():
+            projection.set_slice_range(start, end)
     
     def set_window_level(self, center: int, width: int):
         """Устанавливает Window/Level для всех проекций"""
         for projection in self.projections.values():
             projection.set_window_level(center, width)
     
-    def add_projection(self, orientation: str, row: int, col: int):
-        """Добавляет новую проекцию"""
-        if orientation not in self.projections:
-            self._create_projection(orientation, row, col)
+    def set_cine_playing(self, playing: bool, fps: int = 15, mode: str = 'loop',
+                         orientation: str = 'axial'):
+        """
+        Запускает/останавливает кино-режим проекции
+        
+        Для аксиальной проекции воспроизводится рабочая область срезов.
+        """
+        projection = self.projections.get(orientation)
+        if projection is None:
+            return
+        
+        if not playing:
+            projection.stop_cine()
+            return
+        
+        start, end = 0, projection.max_slices - 1
+        if orientation == 'axial' and self.slice_range:
+            start, end = self.slice_range
+        
+        player = projection.start_cine(start, end, fps, mode)
+        if player is not None:
+            try:
+                player.fps_measured.disconnect(self.cine_fps_measured)
+            except TypeError:
+                pass
+            player.fps_measured.connect(self.cine_fps_measured)
+    
+    def set_cine_fps(self, fps: int, orientation: str = 'axial'):
+        """Меняет частоту кадров кино-режима на лету"""
+        projection = self.projections.get(orientation)
+        if projection is not None and projection.cine_player is not None:
+            projection.cine_player.set_fps(fps)
+    
+    def shutdown(self):
+        """Остановка фоновых потоков проекций (при закрытии окна)"""
+        for projection in self.projections.values():
+            projection.shutdown_cine()
+    
+    def set_hud_visible(self, visible: bool):
+        """Показывает/скрывает время кадра на всех проекциях"""
+        for projection in self.projections.values():
+            projection.set_hud_visible(visible)
+    
+    def set_overlay(self, name: str, labels: np.ndarray, colors: dict = None,
+                    opacity=0.4, contour_only: bool = False):
+        """
+        Добавляет или заменяет слой маски поверх проекций
+        
+        Args:
+            name: Имя слоя (например, 'segmentation')
+            labels: Карта меток той же формы, что и объем (0 - фон)
+            colors: {метка: (R, G, B)} в диапазоне 0..1
+            opacity: Общая непрозрачность или {метка: непрозрачность}
+            contour_only: Рисовать только контуры меток
+        """
+        layer = OverlayLayer(labels, colors, opacity, contour_only)
+        self.overlay_compositor.set_layer(name, layer)
+        self._refresh_views()
+    
+    def update_overlay(self, name: str, changed_slices=None):
+        """
+        Сообщает об изменении маски слоя (маска изменена на месте)
+        
+        Args:
+            changed_slices: Индексы измененных аксиальных срезов (None - все)
+        """
+        if name in self.overlay_compositor.layers:
+            self.overlay_compositor.invalidate(changed_slices)
+            self._refresh_views()
+    
+    def remove_overlay(self, name: str):
+        """Удаляет слой маски"""
+        self.overlay_compositor.remove_layer(name)
+        self._refresh_views()
+    
+    def _refresh_views(self):
+        """Перерисовывает проекции без смены данных"""
+        for projection in self.projections.values():
+            projection.update_display()
+    
+    def add_projection(self, orientation: str):
+        """Добавляет проекцию в конец компоновки"""
+        if orientation not in self.projection_order:
+            self.set_projection_order(self.projection_order + [orientation])
     
     def remove_projection(self, orientation: str):
-        """Удаляет проекцию"""
-        if orientation in self.projections:
-            projection = self.projections.pop(orientation)
-            self.layout().removeWidget(projection)
-            projection.deleteLater()
+        """Убирает проекцию из компоновки"""
+        if orientation in self.projection_order:
+            self.set_projection_order([name for name in self.projection_order
+                                       if name != orientation])
@@ -2,9 +2,12 @@
 Виджет сегментации - НЕОТКЛЮЧАЕМЫЙ модуль
 """
 
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QPushButton, QGroupBox
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+                             QGroupBox, QProgressBar)
 from PyQt5.QtCore import Qt, pyqtSignal
 
+from gui.widgets.mode_combo import ProcessingModeCombo
+
 
 class SegmentationWidget(QWidget):
     """
@@ -12,7 +15,7 @@ class SegmentationWidget(QWidget):
     Всегда видим пользователю.
     """
     
-    segmentation_requested = pyqtSignal(dict)  # Сигнал запуска сегментации
+    segmentation_requested = pyqtSignal(dict)  # Сигнал запуска сегментации (режим и параметры)
     
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -33,6 +36,13 @@ class SegmentationWidget(QWidget):
         info_label.setStyleSheet("color: #888;")
         seg_layout.addWidget(info_label)
         
+        # Режим сегментации (параметры из конфигурации)
+        mode_layout = QHBoxLayout()
+        mode_layout.addWidget(QLabel("Режим:"))
+        self.mode_combo = ProcessingModeCombo()
+        mode_layout.addWidget(self.mode_combo)
+        seg_layout.addLayout(mode_layout)
+        
         # Кнопка запуска
         self.run_btn = QPushButton("Запустить сегментацию")
         self.run_btn.clicked.connect(self._on_run_clicked)
@@ -44,23 +54,42 @@ class SegmentationWidget(QWidget):
         self.status_label.setAlignment(Qt.AlignCenter)
         seg_layout.addWidget(self.status_label)
         
+        # Прогресс фонового расчета
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setVisible(False)
+        seg_layout.addWidget(self.progress_bar)
+        
         seg_group.setLayout(seg_layout)
         layout.addWidget(seg_group)
     
+    def set_config_manager(self, config_manager):
+        """Устанавливает менеджер конфигурации (режимы сегментации)"""
+        self.mode_combo.set_config_manager(config_manager)
+    
     def set_logger(self, logger):
         """Устанавливает логгер"""
         self.logger = logger
     
     def _on_run_clicked(self):
         """Обработка запуска сегментации"""
+        mode = self.mode_combo.current_mode() or {}
+        params = dict(mode.get('parameters', {}))
+        params['mode_id'] = mode.get('id')
+        params['mode_name'] = mode.get('name')
+        
         self.status_label.setText("Сегментация запущена...")
         self.run_btn.setEnabled(False)
+        self.set_progress(0.0)
         
-        # Отправляем сигнал для запуска сегментации
-        self.segmentation_requested.emit({})
-        
-        if self.logger:
-            self.logger.log_segmentation_run()
+        # Отправляем сигнал для запуска сегментации (запуск с диапазоном
+        # срезов журналирует главное окно)
+        self.segmentation_requested.emit(params)
+    
+    def set_progress(self, fraction: float):
+        """Прогресс сегментации (доля 0..1)"""
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setValue(int(fraction * 100))
     
     def on_segmentation_complete(self, success: bool = True):
         """Callback после завершения сегментации"""
@@ -69,4 +98,11 @@ class SegmentationWidget(QWidget):
         else:
             self.status_label.setText("✗ Ошибка сегментации")
         
-        self.run_btn.setEnabled(True)
\ No newline at end of file
+        self.progress_bar.setVisible(False)
+        self.run_btn.setEnabled(True)
+    
+    def on_segmentation_cancelled(self):
+        """Сегментация отменена (например, загружена другая серия)"""
+        self.status_label.setText("Сегментация отменена")
+        self.progress_bar.setVisible(False)
+        self.run_btn.setEnabled(True)
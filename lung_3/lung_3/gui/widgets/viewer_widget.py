@@ -7,6 +7,9 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                              QSlider, QPushButton, QSpinBox, QComboBox, QGroupBox)
 from PyQt5.QtCore import Qt, pyqtSignal
 
+from core.compute import submit_compute
+from gui.widgets.histogram_widget import HistogramWidget
+
 
 class ViewerWidget(QWidget):
     """Виджет базового функционала просмотра"""
@@ -15,11 +18,24 @@ class ViewerWidget(QWidget):
     slice_changed = pyqtSignal(int)
     window_level_changed = pyqtSignal(int, int)  # center, width
     slice_range_changed = pyqtSignal(int, int)   # start, end
+    cine_toggled = pyqtSignal(bool, int, str)    # playing, fps, mode
+    cine_fps_changed = pyqtSignal(int)
+    # Агрегаты по срезам готовы (из рабочего потока): агрегаты, объем
+    _aggregates_ready = pyqtSignal(object, object)
+    
+    # Перцентили гистограммы для автоматического W/L
+    AUTO_WL_PERCENTILES = (1, 99)
     
     def __init__(self, parent=None):
         super().__init__(parent)
         self.dicom_loader = None
         self.logger = None
+        self.analysis_context = None
+        
+        # Агрегаты по срезам текущей серии (гистограмма любого диапазона)
+        self._aggregates = None
+        self._aggregates_job = None
+        self._aggregates_ready.connect(self._on_aggregates_ready)
         
         self.start_slice = 0
         self.end_slice = 0
@@ -84,6 +100,36 @@ class ViewerWidget(QWidget):
         work_range_group.setLayout(work_range_layout)
         layout.addWidget(work_range_group)
         
+        # === ГРУППА: Кино-режим ===
+        cine_group = QGroupBox("Кино-режим")
+        cine_layout = QVBoxLayout()
+        
+        cine_settings_layout = QHBoxLayout()
+        cine_settings_layout.addWidget(QLabel("FPS:"))
+        self.cine_fps_spinbox = QSpinBox()
+        self.cine_fps_spinbox.setRange(1, 60)
+        self.cine_fps_spinbox.setValue(15)
+        self.cine_fps_spinbox.valueChanged.connect(self.cine_fps_changed)
+        cine_settings_layout.addWidget(self.cine_fps_spinbox)
+        
+        self.cine_mode_combo = QComboBox()
+        self.cine_mode_combo.addItem("По кругу", 'loop')
+        self.cine_mode_combo.addItem("Туда-обратно", 'bounce')
+        cine_settings_layout.addWidget(self.cine_mode_combo)
+        cine_layout.addLayout(cine_settings_layout)
+        
+        self.cine_btn = QPushButton("▶ Воспроизвести")
+        self.cine_btn.setCheckable(True)
+        self.cine_btn.toggled.connect(self._on_cine_toggled)
+        cine_layout.addWidget(self.cine_btn)
+        
+        self.cine_fps_label = QLabel("")
+        self.cine_fps_label.setStyleSheet("font-size: 10px; color: #888;")
+        cine_layout.addWidget(self.cine_fps_label)
+        
+        cine_group.setLayout(cine_layout)
+        layout.addWidget(cine_group)
+        
         # === ГРУППА: Window/Level ===
         wl_group = QGroupBox("Window/Level")
         wl_layout = QVBoxLayout()
@@ -125,6 +171,19 @@ class ViewerWidget(QWidget):
         preset_layout.addWidget(self.wl_preset_combo)
         wl_layout.addLayout(preset_layout)
         
+        # Гистограмма рабочей области с окном W/L
+        self.histogram_widget = HistogramWidget()
+        self.histogram_widget.set_window_level(self.wl_center_spinbox.value(),
+                                               self.wl_width_spinbox.value())
+        self.histogram_widget.window_level_changed.connect(self._on_histogram_wl_changed)
+        wl_layout.addWidget(self.histogram_widget)
+        
+        self.auto_wl_btn = QPushButton("Авто W/L")
+        self.auto_wl_btn.setToolTip("Окно по 1-му и 99-му перцентилям гистограммы рабочей области")
+        self.auto_wl_btn.setEnabled(False)
+        self.auto_wl_btn.clicked.connect(self._on_auto_wl)
+        wl_layout.addWidget(self.auto_wl_btn)
+        
         wl_group.setLayout(wl_layout)
         layout.addWidget(wl_group)
         
@@ -148,6 +207,10 @@ class ViewerWidget(QWidget):
         """Устанавливает логгер"""
         self.logger = logger
     
+    def set_analysis_context(self, analysis_context):
+        """Устанавливает общий кэш производных данных (источник гистограммы)"""
+        self.analysis_context = analysis_context
+    
     def update_from_data(self):
         """Обновление элементов управления после загрузки данных"""
         if self.dicom_loader is None:
@@ -159,6 +222,16 @@ class ViewerWidget(QWidget):
         
         self.max_slices = volume.shape[0]
         
+        # Кино-режим остановлен при смене данных проекций - сбрасываем кнопку
+        self.cine_btn.blockSignals(True)
+        self.cine_btn.setChecked(False)
+        self.cine_btn.blockSignals(False)
+        self.cine_btn.setText("▶ Воспроизвести")
+        self.cine_fps_label.setText("")
+        
+        # Гистограмма прежней серии не подходит для нового диапазона
+        self._aggregates = None
+        
         # Обновляем слайдер
         self.slice_slider.setMaximum(self.max_slices - 1)
         self.slice_slider.setValue(self.max_slices // 2)
@@ -174,6 +247,79 @@ class ViewerWidget(QWidget):
         self.end_slice_spinbox.setValue(self.end_slice)
         
         self._update_slice_label()
+        self._request_aggregates(volume)
+    
+    # === ГИСТОГРАММА ===
+    
+    def _request_aggregates(self, volume):
+        """Агрегаты по срезам из общего кэша (построение - в фоне, один раз на серию)"""
+        self._aggregates = None
+        self.auto_wl_btn.setEnabled(False)
+        self.histogram_widget.set_histogram(None)
+        
+        if self._aggregates_job is not None:
+            self._aggregates_job.cancel()
+            self._aggregates_job = None
+        
+        if self.analysis_context is None or self.analysis_context.volume is not volume:
+            return
+        
+        cached = self.analysis_context.peek('slice_aggregates')
+        if cached is not None:
+            self._on_aggregates_ready(cached, volume)
+            return
+        
+        context = self.analysis_context
+        job = submit_compute(lambda token, progress: context.get('slice_aggregates', token=token))
+        job.future.add_done_callback(
+            lambda future: None if future.cancelled() or future.exception()
+            else self._aggregates_ready.emit(future.result(), volume)
+        )
+        self._aggregates_job = job
+    
+    def _on_aggregates_ready(self, aggregates, volume):
+        """Агрегаты построены - гистограмма рабочей области"""
+        if self.dicom_loader is None or volume is not self.dicom_loader.get_volume():
+            return
+        self._aggregates_job = None
+        self._aggregates = aggregates
+        self.auto_wl_btn.setEnabled(True)
+        self._update_histogram()
+    
+    def _update_histogram(self):
+        """Гистограмма текущей рабочей области (из префиксных сумм, без прохода по объему)"""
+        if self._aggregates is not None:
+            self.histogram_widget.set_histogram(
+                self._aggregates.range_histogram(self.start_slice, self.end_slice)
+            )
+    
+    def _on_histogram_wl_changed(self, center: int, width: int):
+        """Окно перетащено на гистограмме"""
+        self._set_window_level(center, width)
+    
+    def _on_auto_wl(self):
+        """Окно W/L по перцентилям гистограммы рабочей области"""
+        histogram = self.histogram_widget.histogram
+        if histogram is None or not histogram.count:
+            return
+        
+        low, high = histogram.percentile(self.AUTO_WL_PERCENTILES)
+        center = int(round((low + high) / 2))
+        width = max(1, int(round(high - low)))
+        self._set_window_level(center, width)
+        
+        if self.logger:
+            self.logger.log_action("auto_window_level", center=center, width=width)
+    
+    def _set_window_level(self, center: int, width: int):
+        """Устанавливает оба значения W/L одним сигналом"""
+        for spinbox in (self.wl_center_spinbox, self.wl_width_spinbox):
+            spinbox.blockSignals(True)
+        self.wl_center_spinbox.setValue(center)
+        self.wl_width_spinbox.setValue(width)
+        for spinbox in (self.wl_center_spinbox, self.wl_width_spinbox):
+            spinbox.blockSignals(False)
+        self._on_wl_changed()
     
     def _on_slice_slider_changed(self, value):
         """Обработка изменения среза"""
@@ -200,6 +346,7 @@ class ViewerWidget(QWidget):
             self.end_slice = self.start_slice
         
         self.slice_range_changed.emit(self.start_slice, self.end_slice)
+        self._update_histogram()
         
         if self.logger:
             self.logger.log_slice_range_set(self.start_slice, self.end_slice)
@@ -215,6 +362,7 @@ class ViewerWidget(QWidget):
         width = self.wl_width_spinbox.value()
         
         self.wl_preset_combo.setCurrentIndex(0)  # "Пользовательское"
+        self.histogram_widget.set_window_level(center, width)
         self.window_level_changed.emit(center, width)
     
     def _on_preset_changed(self, index):
@@ -231,6 +379,27 @@ class ViewerWidget(QWidget):
             self.wl_center_spinbox.setValue(center)
             self.wl_width_spinbox.setValue(width)
     
+    def _on_cine_toggled(self, playing: bool):
+        """Запуск/остановка кино-режима"""
+        self.cine_btn.setText("■ Остановить" if playing else "▶ Воспроизвести")
+        if not playing:
+            self.cine_fps_label.setText("")
+        
+        self.cine_toggled.emit(playing, self.cine_fps_spinbox.value(),
+                               self.cine_mode_combo.currentData())
+        
+        if self.logger:
+            self.logger.log_action("cine_playback", playing=playing,
+                                   fps=self.cine_fps_spinbox.value(),
+                                   mode=self.cine_mode_combo.currentData())
+    
+    def update_cine_fps(self, fps: float, level: int):
+        """Отображение достигнутой частоты кадров"""
+        text = f"Факт: {fps:.1f} кадр/с"
+        if level > 0:
+            text += f" (упрощение 1:{2 ** level})"
+        self.cine_fps_label.setText(text)
+    
     def update_hu_value(self, hu_value: float):
         """Обновление отображаемого значения HU"""
         self.hu_label.setText(f"HU: {hu_value:.1f}")
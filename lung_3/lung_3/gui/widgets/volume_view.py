@@ -0,0 +1,187 @@
+"""
+Окно объемного 3D-рендеринга (CPU).
+Сначала показывает грубый уровень пирамиды, затем уточняет
+изображение до полного разрешения после остановки взаимодействия.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox
+from PyQt5.QtCore import Qt, pyqtSignal, QTimer
+from PyQt5.QtGui import QPixmap, QImage, QMouseEvent
+import numpy as np
+
+from core.volume_renderer import VolumeRenderer, TRANSFER_PRESETS
+
+
+class VolumeRenderView(QWidget):
+    """Виджет объемного рендеринга с прогрессивным уточнением"""
+
+    # Результат фонового рендеринга: изображение, уровень, поколение запроса
+    _render_finished = pyqtSignal(object, int, int)
+
+    PREVIEW_LEVEL = 2
+    REFINE_DELAY_MS = 300
+
+    PRESET_NAMES = {
+        'lung': "Лёгкие",
+        'airway': "Дыхательные пути",
+    }
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.renderer = None
+        self.spacing = (1.0, 1.0, 1.0)
+
+        self._generation = 0
+        self._needs_render = False
+        # Один рабочий поток: запросы, устаревшие к моменту запуска, пропускаются
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="volume-render")
+        self.is_rotating = False
+        self.last_mouse_pos = None
+
+        # Уточнение запускается после паузы во взаимодействии
+        self._refine_timer = QTimer(self)
+        self._refine_timer.setSingleShot(True)
+        self._refine_timer.timeout.connect(self._on_refine_timeout)
+
+        self._render_finished.connect(self._on_render_finished)
+
+        self._setup_ui()
+
+    def _setup_ui(self):
+        """Настройка UI"""
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(2, 2, 2, 2)
+        layout.setSpacing(2)
+
+        controls_layout = QHBoxLayout()
+        controls_layout.addWidget(QLabel("Предустановка:"))
+        self.preset_combo = QComboBox()
+        for preset in TRANSFER_PRESETS:
+            self.preset_combo.addItem(self.PRESET_NAMES.get(preset, preset), preset)
+        self.preset_combo.currentIndexChanged.connect(self._on_preset_changed)
+        controls_layout.addWidget(self.preset_combo)
+        controls_layout.addStretch()
+        layout.addLayout(controls_layout)
+
+        self.image_label = QLabel()
+        self.image_label.setMinimumSize(200, 200)
+        self.image_label.setAlignment(Qt.AlignCenter)
+        self.image_label.setStyleSheet("QLabel { background-color: black; border: 1px solid #555; }")
+        self.image_label.setText("Нет данных")
+        layout.addWidget(self.image_label)
+
+        self.info_label = QLabel("Правая кнопка мыши - вращение")
+        self.info_label.setAlignment(Qt.AlignCenter)
+        self.info_label.setStyleSheet("font-size: 10px; color: #888;")
+        layout.addWidget(self.info_label)
+
+    def set_data(self, volume: np.ndarray, spacing=None):
+        """Устанавливает 3D-объем для рендеринга"""
+        if spacing is not None:
+            self.spacing = spacing
+        self.renderer = VolumeRenderer(volume, self.spacing, self.preset_combo.currentData())
+        self.request_render(progressive=True)
+
+    def request_render(self, progressive: bool = True):
+        """
+        Запрашивает перерисовку
+
+        Args:
+            progressive: True - от превью до полного разрешения,
+                         False - только превью (во время вращения)
+        """
+        if self.renderer is None:
+            return
+
+        # Скрытая вкладка не рендерится, перерисуем при показе
+        if not self.isVisible():
+            self._needs_render = True
+            return
+        self._needs_render = False
+
+        levels = [self.PREVIEW_LEVEL, 1, 0] if progressive else [self.PREVIEW_LEVEL]
+        self._start_worker(levels)
+
+    def _start_worker(self, levels: list):
+        """Ставит рендеринг уровней в очередь рабочего потока (выполняется последний запрос)"""
+        self._generation += 1
+        generation = self._generation
+        renderer = self.renderer
+        out_shape = (max(1, self.image_label.height()), max(1, self.image_label.width()))
+
+        def is_cancelled():
+            return generation != self._generation
+
+        def run():
+            for level in levels:
+                if is_cancelled():
+                    return
+                image = renderer.render(out_shape, level, is_cancelled)
+                if image is None:
+                    return
+                self._render_finished.emit(image, level, generation)
+
+        self._executor.submit(run)
+
+    def _on_render_finished(self, image: np.ndarray, level: int, generation: int):
+        """Отображение готового кадра (в GUI-потоке)"""
+        if generation != self._generation:
+            return
+
+        height, width, _ = image.shape
+        q_img = QImage(image.data, width, height, 3 * width, QImage.Format_RGB888)
+
+        mode = Qt.SmoothTransformation if level == 0 else Qt.FastTransformation
+        pixmap = QPixmap.fromImage(q_img).scaled(self.image_label.size(), Qt.KeepAspectRatio, mode)
+        self.image_label.setPixmap(pixmap)
+
+        status = "полное разрешение" if level == 0 else f"превью 1:{2 ** level}"
+        self.info_label.setText(f"3D ({self.preset_combo.currentText()}, {status})")
+
+    def _on_preset_changed(self, index):
+        """Смена передаточной функции"""
+        if self.renderer is not None:
+            self.renderer.set_preset(self.preset_combo.currentData())
+            self.request_render(progressive=True)
+
+    def _on_refine_timeout(self):
+        """Взаимодействие остановилось - уточняем изображение"""
+        if self.renderer is not None and self.isVisible():
+            self._start_worker([1, 0])
+
+    def mousePressEvent(self, event: QMouseEvent):
+        """Начало вращения"""
+        if event.button() == Qt.RightButton and self.renderer is not None:
+            self.is_rotating = True
+            self.last_mouse_pos = event.pos()
+            self._refine_timer.stop()
+            self.setCursor(Qt.SizeAllCursor)
+
+    def mouseMoveEvent(self, event: QMouseEvent):
+        """Вращение камеры: рендерим только превью"""
+        if self.is_rotating and self.last_mouse_pos:
+            delta = event.pos() - self.last_mouse_pos
+            self.last_mouse_pos = event.pos()
+            self.renderer.rotate(delta.x() * 0.01, delta.y() * 0.01)
+            self.request_render(progressive=False)
+
+    def mouseReleaseEvent(self, event: QMouseEvent):
+        """Конец вращения: через паузу уточняем изображение"""
+        if event.button() == Qt.RightButton and self.is_rotating:
+            self.is_rotating = False
+            self.setCursor(Qt.ArrowCursor)
+            self._refine_timer.start(self.REFINE_DELAY_MS)
+
+    def showEvent(self, event):
+        """Отложенный рендеринг при показе вкладки"""
+        super().showEvent(event)
+        if self._needs_render:
+            self.request_render(progressive=True)
+
+    def resizeEvent(self, event):
+        """Перерисовка при изменении размера (с паузой)"""
+        super().resizeEvent(event)
+        if self.renderer is not None:
+            self._refine_timer.start(self.REFINE_DELAY_MS)
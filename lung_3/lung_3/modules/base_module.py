@@ -4,29 +4,74 @@
 """
 
 from PyQt5.QtWidgets import QWidget
+from PyQt5.QtCore import pyqtSignal
 from abc import abstractmethod
-from typing import Dict, Any
+from concurrent.futures import wait
+from typing import Dict, Any, Optional
+
+from core.compute import CancellationToken, ComputeCancelled, ComputeJob, submit_compute
+
+
+# Атрибуты класса с метаданными -> ключи get_module_info()
+MODULE_METADATA_FIELDS = {
+    'MODULE_ID': 'id',
+    'MODULE_NAME': 'name',
+    'MODULE_VERSION': 'version',
+    'MODULE_DESCRIPTION': 'description',
+    'MODULE_REMOVABLE': 'removable',
+}
 
 
 class BaseModule(QWidget):
     """
     Базовый класс для всех модулей приложения
     
-    Каждый модуль должен наследоваться от этого класса и реализовать:
-    - get_module_info(): метаданные модуля
-    - initialize(): инициализация UI и логики
+    Каждый модуль должен наследоваться от этого класса и:
+    - задать метаданные атрибутами класса (MODULE_ID, MODULE_NAME, ...) -
+      они читаются загрузчиком без импорта и создания виджета;
+      старый способ - переопределить get_module_info();
+    - реализовать initialize(): инициализация UI и логики
+    
+    Тяжелые расчеты выполняются в фоне: модуль переопределяет
+    compute(data, token, progress) и вызывает run_compute(data),
+    результат приходит в on_processing_complete() в GUI-потоке.
+    
+    Значения атрибутов метаданных должны быть литералами.
     """
     
+    MODULE_ID: Optional[str] = None
+    MODULE_NAME: Optional[str] = None
+    MODULE_VERSION = '1.0.0'
+    MODULE_DESCRIPTION = ''
+    MODULE_REMOVABLE = True
+    
+    # Прогресс фонового расчета (доля 0..1)
+    compute_progress = pyqtSignal(float)
+    # Завершение расчета из рабочего потока: job, результат, ошибка
+    _compute_done = pyqtSignal(object, object, object)
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         self.logger = None
         self.config_manager = None
+        self.analysis_context = None
         self._initialized = False
+        self._compute_job: Optional[ComputeJob] = None
+        self._compute_done.connect(self._on_compute_done)
+        self.compute_progress.connect(self.on_compute_progress)
+    
+    @classmethod
+    def module_info(cls) -> Optional[Dict[str, Any]]:
+        """Метаданные из атрибутов класса (None, если MODULE_ID не задан)"""
+        if cls.MODULE_ID is None:
+            return None
+        info = {key: getattr(cls, attribute) for attribute, key in MODULE_METADATA_FIELDS.items()}
+        info['name'] = info['name'] or cls.MODULE_ID
+        return info
     
-    @abstractmethod
     def get_module_info(self) -> Dict[str, Any]:
         """
-        Возвращает метаданные модуля
+        Возвращает метаданные модуля (по умолчанию - из атрибутов класса)
         
         Returns:
             {
@@ -37,7 +82,7 @@ class BaseModule(QWidget):
                 'removable': True/False
             }
         """
-        pass
+        return self.module_info()
     
     @abstractmethod
     def initialize(self):
@@ -55,6 +100,13 @@ class BaseModule(QWidget):
         """Устанавливает менеджер конфигурации"""
         self.config_manager = config_manager
     
+    def set_analysis_context(self, analysis_context):
+        """
+        Устанавливает общий кэш производных данных (AnalysisContext):
+        гистограммы и маски текущей серии считаются один раз на все модули
+        """
+        self.analysis_context = analysis_context
+    
     def is_initialized(self) -> bool:
         """Проверяет, инициализирован ли модуль"""
         return self._initialized
@@ -66,6 +118,21 @@ class BaseModule(QWidget):
         """
         pass
     
+    def on_slice_range_changed(self, start_slice: int, end_slice: int):
+        """
+        Callback при изменении рабочего диапазона срезов
+        Переопределяется в дочерних классах при необходимости
+        """
+        pass
+    
+    def on_analysis_product_changed(self, name: str):
+        """
+        Callback при замене продукта общего контекста анализа той же серии
+        (например, 'lung_mask' после сегментации)
+        Переопределяется в дочерних классах при необходимости
+        """
+        pass
+    
     def on_processing_complete(self, result):
         """
         Callback при завершении обработки
@@ -73,9 +140,91 @@ class BaseModule(QWidget):
         """
         pass
     
+    # === ФОНОВЫЕ РАСЧЕТЫ ===
+    
+    def compute(self, data, token: CancellationToken, progress):
+        """
+        Расчет в рабочем потоке (переопределяется в дочерних классах)
+        
+        Не обращается к виджетам. Между этапами вызывает
+        progress(доля 0..1) - там же проверяется отмена.
+        
+        Returns:
+            Результат для on_processing_complete()
+        """
+        raise NotImplementedError
+    
+    def run_compute(self, data) -> ComputeJob:
+        """Запускает compute(data) в общем пуле (предыдущий расчет отменяется)"""
+        self.cancel_compute()
+        
+        job = submit_compute(self._run_compute_job, data, progress=self.compute_progress.emit)
+        self._compute_job = job
+        job.future.add_done_callback(lambda future: self._emit_compute_done(job, future))
+        return job
+    
+    def _run_compute_job(self, data, token, progress):
+        return self.compute(data, token, progress)
+    
+    def _emit_compute_done(self, job: ComputeJob, future):
+        """Передает результат в GUI-поток (вызывается из рабочего потока)"""
+        if future.cancelled() or job.is_cancelled:
+            return
+        error = future.exception()
+        self._compute_done.emit(job, None if error else future.result(), error)
+    
+    def _on_compute_done(self, job: ComputeJob, result, error):
+        """Результат актуального расчета - в on_processing_complete"""
+        if job is not self._compute_job or job.is_cancelled:
+            return
+        self._compute_job = None
+        
+        if isinstance(error, ComputeCancelled):
+            return
+        if error is not None:
+            self.on_compute_error(error)
+            return
+        self.on_processing_complete(result)
+    
+    def cancel_compute(self):
+        """Отменяет текущий фоновый расчет модуля"""
+        if self._compute_job is not None:
+            self._compute_job.cancel()
+            self._compute_job = None
+    
+    def is_computing(self) -> bool:
+        return self._compute_job is not None
+    
+    def wait_compute(self, timeout: float = None) -> bool:
+        """
+        Ждет завершения текущего фонового расчета (для сценариев без GUI)
+        
+        Результат придет в on_processing_complete() после обработки
+        событий Qt.
+        
+        Returns:
+            False, если расчет не завершился за timeout секунд
+        """
+        job = self._compute_job
+        if job is None:
+            return True
+        _, not_done = wait([job.future], timeout)
+        return not not_done
+    
+    def on_compute_progress(self, fraction: float):
+        """
+        Прогресс фонового расчета (в GUI-потоке)
+        Переопределяется в дочерних классах при необходимости
+        """
+        pass
+    
+    def on_compute_error(self, error: Exception):
+        """Ошибка фонового расчета (в GUI-потоке)"""
+        print(f"⚠️ Ошибка расчета модуля {self.MODULE_ID or type(self).__name__}: {error}")
+    
     def cleanup(self):
         """
         Очистка ресурсов модуля
         Переопределяется в дочерних классах при необходимости
         """
-        pass
+        self.cancel_compute()
@@ -0,0 +1,250 @@
+"""
+Модуль количественной денситометрии легких.
+Объем легких, LAA%-950/-910, 15-й перцентиль плотности и средняя
+плотность - для обоих легких, каждого легкого и верхней/средней/нижней
+зон. Считается по меткам легких (RIGHT_LUNG/LEFT_LUNG) из общего
+контекста анализа за один проход по объему (гистограммы по областям через bincount).
+"""
+
+from collections import OrderedDict
+
+from PyQt5.QtWidgets import (QVBoxLayout, QGroupBox, QLabel, QTableWidget,
+                             QTableWidgetItem, QHeaderView)
+from modules.base_module import BaseModule
+from core.hu_statistics import percentile_from_counts
+from core.lung_segmentation import RIGHT_LUNG, LEFT_LUNG
+import numpy as np
+
+
+# Диапазон гистограммы легочной ткани (значения вне - в крайние корзины)
+HU_LOW = -1024
+HU_HIGH = 1023
+BINS = HU_HIGH - HU_LOW + 1
+
+SIDES = ('right', 'left')
+ZONES = ('upper', 'middle', 'lower')
+
+# Порядок строк таблицы: (ключ результата, подпись)
+ROWS = [
+    ('total', "Оба легких"),
+    ('right', "Правое"),
+    ('left', "Левое"),
+] + [
+    (f'{side}_{zone}', f"{side_name}: {zone_name}")
+    for side, side_name in (('right', "Правое"), ('left', "Левое"))
+    for zone, zone_name in (('upper', "верхняя зона"), ('middle', "средняя зона"), ('lower', "нижняя зона"))
+]
+
+COLUMNS = ["Объем, л", "LAA-950, %", "LAA-910, %", "Perc15, HU", "MLD, HU"]
+
+CHUNK_SLICES = 16
+
+
+# Индекс SIDES по метке легкого
+SIDE_OF_LABEL = np.full(max(RIGHT_LUNG, LEFT_LUNG) + 1, -1)
+SIDE_OF_LABEL[RIGHT_LUNG] = SIDES.index('right')
+SIDE_OF_LABEL[LEFT_LUNG] = SIDES.index('left')
+
+
+def _zone_layout(labels: np.ndarray) -> np.ndarray:
+    """
+    Зона каждого среза: трети протяженности легких по срезам (срезы
+    отсортированы снизу вверх)
+
+    Returns:
+        zone_of_slice - индексы ZONES, -1 - вне легких
+    """
+    zone_of_slice = np.full(labels.shape[0], -1)
+    slices = np.flatnonzero(labels.any(axis=(1, 2)))
+    if slices.size:
+        first, last = slices[0], slices[-1]
+        position = (np.arange(first, last + 1) - first) / max(1, last - first + 1)
+        # Нижняя треть - lower (индекс 2), верхняя - upper (индекс 0)
+        zone_of_slice[first:last + 1] = 2 - np.minimum((position * 3).astype(int), 2)
+
+    return zone_of_slice
+
+
+def compute_lung_density(volume: np.ndarray, labels: np.ndarray, spacing: tuple,
+                         token=None, progress=None) -> dict:
+    """
+    Денситометрия по меткам легких за один проход по объему
+
+    Сторона вокселя - его метка (RIGHT_LUNG/LEFT_LUNG из сегментации),
+    а не положение относительно средней линии.
+
+    Args:
+        labels: Карта меток формы volume (0 - фон)
+        spacing: Размер вокселя (dz, dy, dx) в мм
+
+    Returns:
+        {ключ области: метрики} - ключи 'total', 'right', 'left', 'right_upper', ...
+    """
+    zone_of_slice = _zone_layout(labels)
+    regions = len(SIDES) * len(ZONES)
+
+    counts = np.zeros(regions * BINS, dtype=np.int64)
+    sums = np.zeros(regions)
+
+    depth = volume.shape[0]
+    for start in range(0, depth, CHUNK_SLICES):
+        if token is not None:
+            token.raise_if_cancelled()
+
+        block = labels[start:start + CHUNK_SLICES]
+        z, y, x = np.nonzero(block)
+        if z.size:
+            values = volume[start:start + CHUNK_SLICES][z, y, x]
+            region = SIDE_OF_LABEL[block[z, y, x]] * len(ZONES) + zone_of_slice[z + start]
+            bins = np.clip(np.rint(values), HU_LOW, HU_HIGH).astype(np.int64) - HU_LOW
+            counts += np.bincount(region * BINS + bins, minlength=counts.size)
+            sums += np.bincount(region, weights=values, minlength=regions)
+
+        if progress is not None:
+            progress(min(start + CHUNK_SLICES, depth) / depth)
+
+    counts = counts.reshape(len(SIDES), len(ZONES), BINS)
+    sums = sums.reshape(len(SIDES), len(ZONES))
+    voxel_litres = float(np.prod(spacing)) / 1e6
+
+    results = {'total': _metrics(counts.sum(axis=(0, 1)), sums.sum(), voxel_litres)}
+    for side_index, side in enumerate(SIDES):
+        results[side] = _metrics(counts[side_index].sum(axis=0), sums[side_index].sum(), voxel_litres)
+        for zone_index, zone in enumerate(ZONES):
+            results[f'{side}_{zone}'] = _metrics(counts[side_index, zone_index],
+                                                 sums[side_index, zone_index], voxel_litres)
+    return results
+
+
+def _metrics(counts: np.ndarray, total: float, voxel_litres: float) -> dict:
+    """Метрики области по ее гистограмме"""
+    count = int(counts.sum())
+    if count == 0:
+        return {'volume_l': 0.0, 'laa950': None, 'laa910': None, 'perc15': None, 'mld': None}
+
+    # Целые HU: "< -950" - корзины до -951 включительно
+    below_950 = int(counts[:-950 - HU_LOW].sum())
+    below_910 = int(counts[:-910 - HU_LOW].sum())
+    return {
+        'volume_l': count * voxel_litres,
+        'laa950': 100.0 * below_950 / count,
+        'laa910': 100.0 * below_910 / count,
+        'perc15': percentile_from_counts(counts, HU_LOW, 15),
+        'mld': total / count,
+    }
+
+
+class LungDensityModule(BaseModule):
+    """Модуль количественной оценки плотности легких"""
+
+    MODULE_ID = 'lung_density'
+    MODULE_NAME = 'Денситометрия легких'
+    MODULE_VERSION = '1.0.0'
+    MODULE_DESCRIPTION = 'Объем легких, LAA%-950/-910, Perc15 и средняя плотность по легким и зонам'
+    MODULE_REMOVABLE = True
+
+    # Сколько результатов (серия, версия меток) хранить
+    CACHE_SIZE = 4
+
+    def initialize(self):
+        """Инициализация UI модуля"""
+        layout = QVBoxLayout(self)
+
+        group = QGroupBox("Денситометрия легких")
+        group_layout = QVBoxLayout()
+
+        self.status_label = QLabel("Загрузите данные для расчета")
+        self.status_label.setStyleSheet("font-size: 10px; color: #888;")
+        group_layout.addWidget(self.status_label)
+
+        self.table = QTableWidget(len(ROWS), len(COLUMNS))
+        self.table.setHorizontalHeaderLabels(COLUMNS)
+        self.table.setVerticalHeaderLabels([title for _, title in ROWS])
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        group_layout.addWidget(self.table)
+
+        group.setLayout(group_layout)
+        layout.addWidget(group)
+
+        # {(серия, версия меток): результаты}
+        self._results = OrderedDict()
+        self._pending_key = None
+        self._data_loader = None
+
+        self._initialized = True
+
+    def on_data_loaded(self, data_loader):
+        """Расчет (или результат из кэша) для текущей серии и меток легких"""
+        self._data_loader = data_loader
+        self._update_results()
+
+    def on_analysis_product_changed(self, name: str):
+        """Новые метки легких (сегментация) - пересчет"""
+        if name == 'lung_labels' and self._data_loader is not None:
+            self._update_results()
+
+    def _update_results(self):
+        """Результат для (серия, версия меток): из кэша или фоновый расчет"""
+        data_loader = self._data_loader
+        volume = data_loader.get_volume()
+        if volume is None:
+            return
+
+        if self.analysis_context is None:
+            self.status_label.setText("Нет контекста анализа - расчет недоступен")
+            return
+
+        key = (self.analysis_context.series_uid, self.analysis_context.version('lung_labels'))
+        if key in self._results:
+            self._results.move_to_end(key)
+            self._display_results(self._results[key])
+            return
+
+        self._pending_key = key
+        self.status_label.setText("Расчет...")
+        self.run_compute((volume, data_loader.get_spacing()))
+
+    def compute(self, data, token, progress):
+        """Метки легких (из контекста) и денситометрия в рабочем потоке"""
+        volume, spacing = data
+        labels = self.analysis_context.get('lung_labels', token=token)
+        progress(0.1)
+        return compute_lung_density(volume, labels, spacing, token,
+                                    lambda fraction: progress(0.1 + 0.9 * fraction))
+
+    def on_compute_progress(self, fraction: float):
+        self.status_label.setText(f"Расчет... {fraction * 100:.0f}%")
+
+    def on_processing_complete(self, result):
+        """Результат расчета - в кэш и в таблицу"""
+        self._results[self._pending_key] = result
+        while len(self._results) > self.CACHE_SIZE:
+            self._results.popitem(last=False)
+
+        self._display_results(result)
+
+        if self.logger:
+            total = result['total']
+            self.logger.log_action("lung_density", volume_l=round(total['volume_l'], 3),
+                                   laa950=total['laa950'], perc15=total['perc15'])
+
+    def _display_results(self, results: dict):
+        """Заполняет таблицу метрик"""
+        for row, (key, _) in enumerate(ROWS):
+            metrics = results[key]
+            values = [
+                f"{metrics['volume_l']:.2f}",
+                self._format(metrics['laa950'], "{:.1f}"),
+                self._format(metrics['laa910'], "{:.1f}"),
+                self._format(metrics['perc15'], "{:.0f}"),
+                self._format(metrics['mld'], "{:.0f}"),
+            ]
+            for column, value in enumerate(values):
+                self.table.setItem(row, column, QTableWidgetItem(value))
+
+        self.status_label.setText("Готово")
+
+    @staticmethod
+    def _format(value, pattern: str) -> str:
+        return "—" if value is None else pattern.format(value)
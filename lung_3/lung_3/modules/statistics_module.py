@@ -5,21 +5,17 @@
 
 from PyQt5.QtWidgets import (QVBoxLayout, QLabel, QGroupBox, QTextEdit)
 from modules.base_module import BaseModule
-import numpy as np
+from core.hu_statistics import SliceAggregates, compute_slice_aggregates
 
 
 class StatisticsModule(BaseModule):
     """Модуль отображения статистики по исследованию"""
     
-    def get_module_info(self):
-        """Метаданные модуля"""
-        return {
-            'id': 'statistics',
-            'name': 'Статистика по исследованию',
-            'version': '1.0.0',
-            'description': 'Отображает статистическую информацию о загруженных данных',
-            'removable': True  # Может быть скрыт администратором
-        }
+    MODULE_ID = 'statistics'
+    MODULE_NAME = 'Статистика по исследованию'
+    MODULE_VERSION = '1.0.0'
+    MODULE_DESCRIPTION = 'Отображает статистическую информацию о загруженных данных'
+    MODULE_REMOVABLE = True  # Может быть скрыт администратором
     
     def initialize(self):
         """Инициализация UI модуля"""
@@ -39,6 +35,11 @@ class StatisticsModule(BaseModule):
         stats_group.setLayout(stats_layout)
         layout.addWidget(stats_group)
         
+        # Агрегаты по срезам текущей серии и рабочий диапазон
+        self._aggregates = None
+        self._metadata = {}
+        self._slice_range = None
+        
         self._initialized = True
     
     def on_data_loaded(self, data_loader):
@@ -49,24 +50,56 @@ class StatisticsModule(BaseModule):
         if volume is None:
             return
         
-        # Вычисление статистики
-        stats = self._calculate_statistics(volume, metadata)
+        self._aggregates = None
+        self._metadata = dict(metadata)
+        
+        # Вычисление агрегатов - в фоне, результат придет в on_processing_complete
+        self.stats_text.setPlainText("Вычисление статистики...")
+        self.run_compute(volume)
+    
+    def compute(self, volume, token, progress):
+        """Агрегаты по срезам в рабочем потоке (из общего кэша, если есть)"""
+        if self.analysis_context is not None and self.analysis_context.volume is volume:
+            return self.analysis_context.get('slice_aggregates', token=token, progress=progress)
+        return compute_slice_aggregates(volume, token, progress)
+    
+    def on_processing_complete(self, result):
+        """Агрегаты готовы - статистика по текущему диапазону срезов"""
+        self._aggregates = result
+        stats = self._update_statistics()
         
-        # Отображение статистики
+        # Один раз на рассчитанную серию (не на каждое изменение диапазона)
+        if self.logger:
+            self.logger.log_action("view_statistics", stats_summary=stats)
+    
+    def on_slice_range_changed(self, start_slice: int, end_slice: int):
+        """Статистика по новому диапазону срезов (из префиксных сумм, без прохода по объему)"""
+        self._slice_range = (start_slice, end_slice)
+        if self._aggregates is not None:
+            self._update_statistics()
+    
+    def _update_statistics(self) -> dict:
+        """Считает и отображает статистику по текущему диапазону срезов"""
+        start_slice, end_slice = self._slice_range or (0, self._aggregates.depth - 1)
+        stats = self._calculate_statistics(self._aggregates, start_slice, end_slice, self._metadata)
         self._display_statistics(stats)
+        return stats
     
-    def _calculate_statistics(self, volume: np.ndarray, metadata: dict) -> dict:
-        """Вычисляет статистику по объему данных"""
+    def _calculate_statistics(self, aggregates: SliceAggregates, start_slice: int, end_slice: int,
+                              metadata: dict) -> dict:
+        """Статистика срезов start_slice..end_slice за O(числа корзин гистограммы)"""
+        histogram = aggregates.range_histogram(start_slice, end_slice)
+        start_slice, end_slice = aggregates.clip_range(start_slice, end_slice)
+        
         stats = {
-            'shape': volume.shape,
-            'min_hu': float(np.min(volume)),
-            'max_hu': float(np.max(volume)),
-            'mean_hu': float(np.mean(volume)),
-            'std_hu': float(np.std(volume)),
-            'median_hu': float(np.median(volume)),
-            'total_voxels': volume.size,
-            **metadata
+            'shape': (end_slice - start_slice + 1,) + tuple(aggregates.slice_shape),
+            'start_slice': start_slice,
+            'end_slice': end_slice,
+            'total_slices': aggregates.depth,
+            **histogram.summary()
         }
+        stats['p5_hu'], stats['p95_hu'] = (float(value) for value in histogram.percentile([5, 95]))
+        stats.update(metadata)
         
         return stats
     
@@ -80,6 +113,7 @@ ID: {stats.get('patient_id', 'N/A')}<br>
 Модальность: {stats.get('modality', 'N/A')}<br>
 <br>
 <b>Параметры объема:</b><br>
+Срезы: {stats['start_slice']}–{stats['end_slice']} из {stats['total_slices']}<br>
 Размерность: {stats['shape'][0]} × {stats['shape'][1]} × {stats['shape'][2]}<br>
 Всего вокселей: {stats['total_voxels']:,}<br>
 <br>
@@ -89,9 +123,7 @@ ID: {stats.get('patient_id', 'N/A')}<br>
 Среднее: {stats['mean_hu']:.1f} HU<br>
 Медиана: {stats['median_hu']:.1f} HU<br>
 Стд. отклонение: {stats['std_hu']:.1f} HU<br>
+5-й / 95-й перцентиль: {stats['p5_hu']:.1f} / {stats['p95_hu']:.1f} HU<br>
 """
         
         self.stats_text.setHtml(text)
-        
-        if self.logger:
-            self.logger.log_action("view_statistics", stats_summary=stats)
\ No newline at end of file
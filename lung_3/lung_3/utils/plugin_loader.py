@@ -1,13 +1,17 @@
 """
 Динамический загрузчик модулей из директории modules/
-Автоматически обнаруживает классы, наследующие BaseModule
+Метаданные модулей читаются без импорта (атрибуты MODULE_* класса
+разбираются через ast) и кэшируются по времени изменения файла.
+Файл модуля импортируется только при создании экземпляра.
 """
 
+import ast
 import importlib
 import importlib.util
 import inspect
+import json
 from pathlib import Path
-from typing import Dict, Type, List
+from typing import Dict, Type, List, Optional
 import sys
 import os
 
@@ -15,6 +19,8 @@ import os
 class PluginLoader:
     """Загрузчик плагинов/модулей"""
     
+    CACHE_FILE_NAME = ".plugin_cache.json"
+    
     def __init__(self, modules_dir: str = "modules"):
         # Получаем абсолютный путь относительно текущей директории скрипта
         if os.path.isabs(modules_dir):
@@ -24,15 +30,19 @@ class PluginLoader:
             base_dir = Path(sys.argv[0]).parent if sys.argv[0] else Path.cwd()
             self.modules_dir = base_dir / modules_dir
         
+        # {module_id: метаданные + 'file', 'class_name'}
+        self.module_metadata: Dict[str, Dict] = {}
+        # Импортированные классы (заполняется по требованию)
         self.loaded_modules: Dict[str, Type] = {}
     
-    def discover_modules(self) -> Dict[str, Type]:
+    def discover_modules(self) -> Dict[str, Dict]:
         """
-        Обнаруживает все модули в директории modules/
+        Обнаруживает все модули в директории modules/ (без импорта)
         
         Returns:
-            Словарь {module_id: ModuleClass}
+            Словарь {module_id: метаданные}
         """
+        self.module_metadata.clear()
         self.loaded_modules.clear()
         
         print(f"Поиск модулей в: {self.modules_dir.absolute()}")
@@ -41,26 +51,127 @@ class PluginLoader:
             print(f"⚠️ Директория модулей не найдена: {self.modules_dir}")
             print(f"   Абсолютный путь: {self.modules_dir.absolute()}")
             print(f"   Текущая директория: {Path.cwd()}")
-            return self.loaded_modules
+            return self.module_metadata
         
         modules_path = str(self.modules_dir.parent.absolute())
         if modules_path not in sys.path:
             sys.path.insert(0, modules_path)
         
-        for file_path in self.modules_dir.glob("*_module.py"):
+        cache = self._load_cache()
+        new_cache = {}
+        
+        for file_path in sorted(self.modules_dir.glob("*_module.py")):
             if file_path.name.startswith("_"):
                 continue
             
             try:
-                self._load_module_from_file(file_path)
+                stat = file_path.stat()
+                entry = cache.get(file_path.name)
+                if entry is None or entry.get('mtime') != stat.st_mtime or entry.get('size') != stat.st_size:
+                    entry = {
+                        'mtime': stat.st_mtime,
+                        'size': stat.st_size,
+                        'modules': self._read_metadata(file_path),
+                    }
+                new_cache[file_path.name] = entry
+                
+                for info in entry['modules']:
+                    self.module_metadata[info['id']] = {**info, 'file': file_path.name}
+                    print(f"  ✓ Найден: {info.get('name', info['id'])}")
             except Exception as e:
                 print(f"⚠️ Ошибка загрузки модуля {file_path}: {e}")
         
-        print(f"✓ Загружено модулей: {len(self.loaded_modules)}")
-        return self.loaded_modules
+        if new_cache != cache:
+            self._save_cache(new_cache)
+        
+        print(f"✓ Загружено модулей: {len(self.module_metadata)}")
+        return self.module_metadata
+    
+    # === МЕТАДАННЫЕ ===
+    
+    def _cache_path(self) -> Path:
+        return self.modules_dir / self.CACHE_FILE_NAME
+    
+    def _load_cache(self) -> Dict:
+        """Кэш метаданных {файл: {'mtime', 'size', 'modules'}}"""
+        try:
+            with open(self._cache_path(), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return {}
+    
+    def _save_cache(self, cache: Dict):
+        try:
+            with open(self._cache_path(), 'w', encoding='utf-8') as f:
+                json.dump(cache, f, indent=2, ensure_ascii=False)
+        except Exception as e:
+            print(f"⚠️ Не удалось сохранить кэш модулей: {e}")
+    
+    def _read_metadata(self, file_path: Path) -> List[Dict]:
+        """
+        Метаданные модулей файла: атрибуты MODULE_* через ast, а для
+        модулей без них - старым способом (импорт и get_module_info)
+        """
+        modules = self._parse_declarative_metadata(file_path)
+        if modules:
+            return modules
+        return self._load_legacy_metadata(file_path)
+    
+    def _parse_declarative_metadata(self, file_path: Path) -> List[Dict]:
+        """Разбор атрибутов MODULE_* классов без выполнения кода"""
+        from modules.base_module import BaseModule, MODULE_METADATA_FIELDS
+        
+        tree = ast.parse(file_path.read_text(encoding='utf-8'), filename=str(file_path))
+        defaults = {key: getattr(BaseModule, attribute)
+                    for attribute, key in MODULE_METADATA_FIELDS.items()}
+        
+        modules = []
+        for node in tree.body:
+            if not isinstance(node, ast.ClassDef):
+                continue
+            
+            values = {}
+            for statement in node.body:
+                if isinstance(statement, ast.Assign):
+                    targets, value = statement.targets, statement.value
+                elif isinstance(statement, ast.AnnAssign) and statement.value is not None:
+                    targets, value = [statement.target], statement.value
+                else:
+                    continue
+                for target in targets:
+                    if isinstance(target, ast.Name) and target.id in MODULE_METADATA_FIELDS:
+                        try:
+                            values[MODULE_METADATA_FIELDS[target.id]] = ast.literal_eval(value)
+                        except ValueError:
+                            print(f"  ⚠️ {node.name}.{target.id}: значение должно быть литералом")
+            
+            if values.get('id'):
+                info = {**defaults, **values, 'class_name': node.name}
+                info['name'] = info['name'] or info['id']
+                modules.append(info)
+        
+        return modules
+    
+    def _load_legacy_metadata(self, file_path: Path) -> List[Dict]:
+        """Старый путь: импорт файла и вызов get_module_info() у экземпляра"""
+        modules = []
+        for name, obj in self._import_module_classes(file_path):
+            try:
+                temp_instance = obj()
+                info = dict(temp_instance.get_module_info())
+                temp_instance.deleteLater()
+                info.setdefault('id', name.lower())
+                info['class_name'] = name
+                modules.append(info)
+                self.loaded_modules[info['id']] = obj
+            except Exception as e:
+                print(f"  ⚠️ Ошибка инициализации {name}: {e}")
+        return modules
     
-    def _load_module_from_file(self, file_path: Path):
-        """Загружает модуль из файла"""
+    # === ИМПОРТ ===
+    
+    def _import_module_classes(self, file_path: Path) -> list:
+        """Импортирует файл и возвращает классы-наследники BaseModule"""
         module_name = f"modules.{file_path.stem}"
         
         try:
@@ -70,44 +181,39 @@ class PluginLoader:
             
             from modules.base_module import BaseModule
             
-            for name, obj in inspect.getmembers(module, inspect.isclass):
-                if issubclass(obj, BaseModule) and obj is not BaseModule:
-                    try:
-                        temp_instance = obj()
-                        info = temp_instance.get_module_info()
-                        module_id = info.get('id', name.lower())
-                        
-                        self.loaded_modules[module_id] = obj
-                        print(f"  ✓ Загружен: {info.get('name', name)}")
-                        
-                    except Exception as e:
-                        print(f"  ⚠️ Ошибка инициализации {name}: {e}")
+            return [(name, obj) for name, obj in inspect.getmembers(module, inspect.isclass)
+                    if issubclass(obj, BaseModule) and obj is not BaseModule]
         
         except Exception as e:
             print(f"⚠️ Ошибка импорта {file_path}: {e}")
+            return []
     
-    def get_module_class(self, module_id: str) -> Type:
-        """Возвращает класс модуля по ID"""
-        return self.loaded_modules.get(module_id)
+    def get_module_class(self, module_id: str) -> Optional[Type]:
+        """Возвращает класс модуля по ID (файл импортируется при первом обращении)"""
+        if module_id in self.loaded_modules:
+            return self.loaded_modules[module_id]
+        
+        metadata = self.module_metadata.get(module_id)
+        if metadata is None:
+            return None
+        
+        for name, obj in self._import_module_classes(self.modules_dir / metadata['file']):
+            if name == metadata['class_name']:
+                self.loaded_modules[module_id] = obj
+                return obj
+        
+        print(f"⚠️ Класс {metadata['class_name']} не найден в {metadata['file']}")
+        return None
     
     def get_available_modules(self) -> List[Dict]:
         """
-        Возвращает список метаданных всех доступных модулей
+        Возвращает список метаданных всех доступных модулей (без импорта)
         
         Returns:
             [{'id': '...', 'name': '...', 'description': '...', ...}, ...]
         """
-        modules_info = []
-        
-        for module_id, module_class in self.loaded_modules.items():
-            try:
-                temp_instance = module_class()
-                info = temp_instance.get_module_info()
-                modules_info.append(info)
-            except:
-                continue
-        
-        return modules_info
+        return [{key: value for key, value in metadata.items() if key not in ('file', 'class_name')}
+                for metadata in self.module_metadata.values()]
     
     def instantiate_module(self, module_id: str, parent=None):
         """
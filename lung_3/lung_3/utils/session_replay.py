@@ -0,0 +1,304 @@
+"""
+Воспроизведение сессий из журнала действий (нагрузочный сценарий).
+Действия реальной сессии повторяются без окна (Qt offscreen) на
+DICOMLoader, проекциях и модулях; для каждого типа действия считается
+задержка (p50/p95/max).
+
+Запуск:
+    python -m utils.session_replay logs/2025-10-23.jsonl /data/dicom
+    python -m utils.session_replay logs/archive/2025-10-23.jsonl.gz /data/dicom --session <id> --output report.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Без окна: платформа задается до импорта Qt
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+APP_DIR = Path(__file__).resolve().parent.parent
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
+
+from PyQt5.QtWidgets import QApplication
+
+from core.analysis_context import AnalysisContext
+from core.config_manager import ConfigManager
+from core.dicom_loader import DICOMLoader
+from core.logger import SESSION_RECORD, read_log_records
+from core.lung_segmentation import segment_lungs
+from core.perf import PerfMonitor, perf_monitor
+from gui.widgets.projection_manager import ProjectionManager
+from utils.plugin_loader import PluginLoader
+
+
+class SessionReplayer:
+    """
+    Повторяет действия журнала и замеряет время каждого
+
+    Обработчики действий - методы _replay_<action>; действия без
+    обработчика (например, perf_snapshot) пропускаются и учитываются
+    в отчете отдельно.
+    """
+
+    # Размер окна проекций при воспроизведении
+    VIEW_SIZE = (1000, 800)
+    # Максимальная пауза между действиями в режиме реального времени
+    MAX_PAUSE = 5.0
+
+    def __init__(self, dicom_dir, modules: List[str] = None, realtime: bool = False,
+                 config_path: str = None):
+        self.dicom_dir = Path(dicom_dir)
+        self.realtime = realtime
+        # Режимы обработки - для записей сегментации без параметров
+        self.processing_modes = self._load_processing_modes(config_path)
+
+        self.app = QApplication.instance() or QApplication(sys.argv[:1])
+        self.stats = PerfMonitor(window=100000)
+        self.skipped: Dict[str, int] = {}
+
+        # Рабочая область срезов (None - весь объем)
+        self.slice_range = None
+
+        self.loader = DICOMLoader()
+        self.analysis_context = AnalysisContext()
+        self.projection_manager = ProjectionManager()
+        self.projection_manager.set_dicom_loader(self.loader)
+        self.projection_manager.resize(*self.VIEW_SIZE)
+        self.projection_manager.show()
+
+        self.modules = self._create_modules(modules)
+        self.app.processEvents()
+
+        with self.stats.stage('replay.scan_directory'):
+            self.loader.scan_directory(self.dicom_dir, recursive=True)
+
+    @staticmethod
+    def _load_processing_modes(config_path: Optional[str]) -> list:
+        """Режимы из файла конфигурации (если его нет - режимы по умолчанию)"""
+        if config_path and Path(config_path).exists():
+            return ConfigManager(config_path).get_processing_modes()
+        return ConfigManager.DEFAULT_CONFIG["processing_modes"]
+
+    def _create_modules(self, module_ids: Optional[List[str]]) -> list:
+        """Создает модули (без логгера - воспроизведение не пишет в журнал)"""
+        plugin_loader = PluginLoader(str(APP_DIR / "modules"))
+        plugin_loader.discover_modules()
+
+        instances = []
+        for module_id in plugin_loader.module_metadata:
+            if module_ids is not None and module_id not in module_ids:
+                continue
+            module = plugin_loader.instantiate_module(module_id)
+            if module is not None:
+                module.set_analysis_context(self.analysis_context)
+                module.initialize()
+                instances.append(module)
+        return instances
+
+    # === ВОСПРОИЗВЕДЕНИЕ ===
+
+    def replay(self, records) -> dict:
+        """
+        Воспроизводит записи журнала
+
+        Returns:
+            Отчет {'actions': {тип: статистика}, 'render': {...}, 'skipped': {...}}
+        """
+        perf_monitor.reset()
+        previous_time = None
+
+        for record in records:
+            if record.get('record') == SESSION_RECORD or 'action' not in record:
+                continue
+
+            if self.realtime:
+                previous_time = self._wait(record, previous_time)
+
+            handler = getattr(self, f"_replay_{record['action']}", None)
+            if handler is None:
+                self.skipped[record['action']] = self.skipped.get(record['action'], 0) + 1
+                continue
+
+            handler(record)
+
+        return self.report()
+
+    def _wait(self, record: dict, previous_time: Optional[float]) -> Optional[float]:
+        """Пауза как в исходной сессии (не больше MAX_PAUSE)"""
+        try:
+            current = datetime.fromisoformat(record['timestamp']).timestamp()
+        except (KeyError, TypeError, ValueError):
+            return previous_time
+
+        if previous_time is not None:
+            time.sleep(min(max(0.0, current - previous_time), self.MAX_PAUSE))
+        return current
+
+    def _timed(self, action: str, func, *args):
+        """
+        Выполняет шаг с обработкой событий Qt и записывает задержку
+        (включая фоновые расчеты модулей, запущенные шагом)
+        """
+        with self.stats.stage(f'replay.{action}'):
+            func(*args)
+            for module in self.modules:
+                module.wait_compute()
+            self.app.processEvents()
+
+    def _replay_load_dicom(self, record: dict):
+        """Загрузка серии (серия из журнала или первая найденная локально)"""
+        series_uid = record.get('series_uid') or record.get('file')
+        if series_uid not in self.loader.series_dict:
+            if not self.loader.series_dict:
+                self.skipped['load_dicom'] = self.skipped.get('load_dicom', 0) + 1
+                return
+            series_uid = next(iter(self.loader.series_dict))
+
+        def load():
+            self.slice_range = None
+            if self.loader.load_series(series_uid):
+                self.projection_manager.update_views()
+                self.analysis_context.set_data_loader(self.loader)
+                for module in self.modules:
+                    module.on_data_loaded(self.loader)
+
+        self._timed('load_dicom', load)
+
+    def _replay_interaction_slice_change(self, record: dict):
+        """Смена среза (сводная запись - проход от start_slice до end_slice)"""
+        view = self.projection_manager.projections.get('axial')
+        if view is None or view.image_data is None:
+            return
+
+        if 'slice' in record:
+            slices = [record['slice']]
+        else:
+            start, end = record.get('start_slice', 0), record.get('end_slice', 0)
+            count = max(1, int(record.get('count', 1)))
+            step = (end - start) / max(1, count - 1)
+            slices = [int(round(start + step * i)) for i in range(count)]
+
+        last = view.max_slices - 1
+        for slice_index in slices:
+            self._timed('interaction_slice_change', view.set_slice, min(max(slice_index, 0), last))
+
+    def _replay_set_slice_range(self, record: dict):
+        """Рабочая область срезов - проекциям и модулям"""
+        start_slice, end_slice = int(record.get('start_slice', 0)), int(record.get('end_slice', 0))
+        self.slice_range = (start_slice, end_slice)
+
+        def apply():
+            self.projection_manager.set_slice_range(start_slice, end_slice)
+            for module in self.modules:
+                module.on_slice_range_changed(start_slice, end_slice)
+
+        self._timed('set_slice_range', apply)
+
+    def _replay_run_segmentation(self, record: dict):
+        """
+        Запуск сегментации: параметры и диапазон срезов из записи; в
+        записях без параметров режим ищется в конфигурации по id или имени
+        """
+        params = record.get('params')
+        if params is None:
+            mode = next((mode for mode in self.processing_modes
+                         if mode.get('id') == record.get('mode_id')
+                         or mode.get('name') == record.get('mode')), None)
+            if mode is None:
+                self.skipped['run_segmentation'] = self.skipped.get('run_segmentation', 0) + 1
+                return
+            params = mode.get('parameters', {})
+
+        slice_range = None
+        if record.get('start_slice') is not None and record.get('end_slice') is not None:
+            slice_range = (int(record['start_slice']), int(record['end_slice']))
+        self._segment('run_segmentation', params, slice_range)
+
+    def _replay_select_processing_mode(self, record: dict):
+        """Режим обработки: сегментация легких с параметрами режима на рабочей области"""
+        self._segment('select_processing_mode', record.get('params') or {})
+
+    def _segment(self, action: str, params: dict, slice_range: tuple = None):
+        """Сегментация легких (как в главном окне); новые метки - модулям"""
+        volume = self.loader.get_volume()
+        if volume is None:
+            self.skipped[action] = self.skipped.get(action, 0) + 1
+            return
+
+        start_slice, end_slice = slice_range or self.slice_range or (0, volume.shape[0] - 1)
+
+        def run():
+            labels = segment_lungs(volume, start_slice, end_slice,
+                                   threshold=params.get('threshold', -500),
+                                   smooth=params.get('smooth', True),
+                                   refine=params.get('refine', False))
+            self.analysis_context.put('lung_labels', labels)
+            self.analysis_context.put('lung_mask', labels > 0)
+            for module in self.modules:
+                module.on_analysis_product_changed('lung_labels')
+                module.on_analysis_product_changed('lung_mask')
+
+        self._timed(action, run)
+
+    def report(self) -> dict:
+        """Отчет: задержки по типам действий и этапам рендеринга"""
+        actions = {name[len('replay.'):]: stats for name, stats in self.stats.snapshot().items()}
+        return {
+            'actions': actions,
+            'render': perf_monitor.snapshot(),
+            'skipped': dict(self.skipped),
+        }
+
+
+def _print_report(report: dict):
+    """Вывод отчета таблицей"""
+    header = f"{'действие':<28}{'N':>8}{'p50, мс':>10}{'p95, мс':>10}{'max, мс':>10}"
+    for title, section in (("Действия", report['actions']), ("Этапы рендеринга", report['render'])):
+        print(f"\n{title}:")
+        print(header)
+        for name, stats in section.items():
+            print(f"{name:<28}{stats['count']:>8}{stats['p50_ms']:>10.1f}"
+                  f"{stats['p95_ms']:>10.1f}{stats['max_ms']:>10.1f}")
+
+    if report['skipped']:
+        skipped = ", ".join(f"{name} ({count})" for name, count in report['skipped'].items())
+        print(f"\nПропущено (нет обработчика или данных): {skipped}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Воспроизведение сессии из журнала действий")
+    parser.add_argument('log', help="Файл журнала (.jsonl, .json или архив .gz)")
+    parser.add_argument('dicom_dir', help="Папка с DICOM-данными")
+    parser.add_argument('--session', help="Воспроизвести только эту сессию")
+    parser.add_argument('--modules', help="ID модулей через запятую (по умолчанию - все)")
+    parser.add_argument('--realtime', action='store_true',
+                        help="Соблюдать паузы между действиями (до 5 с)")
+    parser.add_argument('--config', default="config.json",
+                        help="Файл конфигурации с режимами обработки (по умолчанию - config.json)")
+    parser.add_argument('--output', help="Сохранить отчет в JSON")
+    args = parser.parse_args(argv)
+
+    records = read_log_records(Path(args.log))
+    if args.session:
+        records = (record for record in records if record.get('session_id') == args.session)
+
+    modules = args.modules.split(",") if args.modules else None
+    replayer = SessionReplayer(args.dicom_dir, modules, args.realtime, args.config)
+    report = replayer.replay(records)
+
+    _print_report(report)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\n✓ Отчет сохранен: {args.output}")
+
+
+if __name__ == "__main__":
+    main()